@@ -0,0 +1,129 @@
+"""
+Load test for /predict with and without the request coalescer. For each
+mode a uvicorn server is started on the active model (app.db in this
+directory) and hammered by concurrent clients sending single-text
+requests; throughput and latency percentiles are reported.
+
+    python bench_coalesce.py --concurrency 1 16 64 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+WORDS = ("police shooting school storm flood evacuation wildfire earthquake officials said residents "
+         "hospital rescue damage county governor emergency injured suspect power outage shelter").split()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(port, coalesce, window_ms, max_batch):
+    env = dict(os.environ, PREDICT_COALESCE="1" if coalesce else "0", COALESCE_WINDOW_MS=str(window_ms),
+               COALESCE_MAX_BATCH=str(max_batch), TIMING_LOGS="0")
+    process = subprocess.Popen([sys.executable, "-m", "uvicorn", "main_api:app", "--port", str(port),
+                                "--log-level", "warning", "--no-access-log"],
+                               cwd=HERE, env=env, stdout=subprocess.DEVNULL)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("Server did not start")
+
+
+async def _post(reader, writer, body):
+    writer.write(b"POST /predict HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\n"
+                 b"Content-Length: %d\r\n\r\n%s" % (len(body), body))
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    length = 0
+    for line in head.split(b"\r\n"):
+        if line.lower().startswith(b"content-length:"):
+            length = int(line.split(b":", 1)[1])
+    await reader.readexactly(length)
+    return status
+
+
+async def load(port, concurrency, duration):
+    # A bare keep-alive HTTP/1.1 client: a full HTTP library in the same
+    # interpreter would cost more CPU than the server work being measured.
+    latencies, errors = [], 0
+    rng = random.Random(0)
+    bodies = [json.dumps({"text": " ".join(rng.choice(WORDS) for _ in range(40))}).encode() for _ in range(1000)]
+
+    async def client_loop(offset):
+        nonlocal errors
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        i = offset
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            status = await _post(reader, writer, bodies[i % len(bodies)])
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors += 1
+            i += concurrency
+        writer.close()
+
+    stop = time.perf_counter() + duration
+    started = time.perf_counter()
+    await asyncio.gather(*(client_loop(k) for k in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+
+    def pct(p):
+        return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000
+
+    return {"requests": len(latencies), "errors": errors, "rps": len(latencies) / elapsed,
+            "p50_ms": pct(50), "p95_ms": pct(95), "p99_ms": pct(99),
+            "mean_ms": statistics.mean(latencies) * 1000}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/predict load test with and without coalescing")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per run")
+    parser.add_argument("--window-ms", type=float, default=2)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--json", help="Write raw results to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'mode':>10} {'clients':>8} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for coalesce in (False, True):
+        port = free_port()
+        server = start_server(port, coalesce, args.window_ms, args.max_batch)
+        try:
+            asyncio.run(load(port, 4, 1))  # warm-up
+            for concurrency in args.concurrency:
+                row = asyncio.run(load(port, concurrency, args.duration))
+                row.update(coalesce=coalesce, concurrency=concurrency)
+                results.append(row)
+                mode = "coalesced" if coalesce else "direct"
+                print(f"{mode:>10} {concurrency:>8} {row['rps']:>8.0f} {row['p50_ms']:>8.2f} "
+                      f"{row['p95_ms']:>8.2f} {row['p99_ms']:>8.2f} {row['errors']:>7}")
+        finally:
+            server.terminate()
+            server.wait()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Near-duplicate index benchmark: indexing and lookup throughput at several
+corpus sizes, plus recall on lightly edited copies and false positives on
+unseen articles. Documents are synthetic (Zipf-distributed words from a
+large vocabulary, articles of a few hundred words), generated on the fly so
+the 1M-document run doesn't need the corpus in memory.
+
+    python bench_dedup.py --sizes 10000 1000000 --json dedup.json
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from dedup import NearDuplicateIndex
+
+
+class Corpus:
+    def __init__(self, vocabulary_size=50000, words=(200, 600), seed=0):
+        rng = np.random.default_rng(seed)
+        self.vocabulary = np.array([f"w{i}{rng.integers(1000)}" for i in range(vocabulary_size)])
+        weights = 1.0 / np.arange(1, vocabulary_size + 1) ** 1.1
+        self.cdf = np.cumsum(weights / weights.sum())
+        self.words = words
+        self.seed = seed
+
+    def word_ids(self, i):
+        rng = np.random.default_rng((self.seed, i))
+        n = rng.integers(*self.words)
+        return self.cdf.searchsorted(rng.random(n))
+
+    def article(self, i):
+        return " ".join(self.vocabulary[self.word_ids(i)])
+
+    def edited(self, i, fraction):
+        # A syndicated copy: `fraction` of the words replaced.
+        ids = self.word_ids(i)
+        rng = np.random.default_rng((self.seed, i, 1))
+        positions = rng.choice(len(ids), int(len(ids) * fraction), replace=False)
+        ids[positions] = rng.integers(len(self.vocabulary), size=len(positions))
+        return " ".join(self.vocabulary[ids])
+
+
+def run(n_docs, args):
+    corpus = Corpus(seed=args.seed)
+    index = NearDuplicateIndex()
+
+    start = time.perf_counter()
+    duplicates_added = 0
+    for i in range(n_docs):
+        duplicates_added += index.add(corpus.article(i), i) is not None
+    add_seconds = time.perf_counter() - start
+    # Text generation is part of that loop; time it alone to subtract it.
+    sample = min(n_docs, 2000)
+    start = time.perf_counter()
+    for i in range(sample):
+        corpus.article(i)
+    generate_per_doc = (time.perf_counter() - start) / sample
+    add_seconds -= generate_per_doc * n_docs
+
+    rng = np.random.default_rng(args.seed)
+    queries = rng.choice(n_docs, min(n_docs, args.queries), replace=False)
+    recall = {}
+    lookup_texts = []
+    for fraction in args.edits:
+        texts = [corpus.edited(int(i), fraction) for i in queries]
+        found = [index.lookup(text) for text in texts]
+        hits = sum(m is not None and index.label(m[0]) == int(i) for m, i in zip(found, queries))
+        recall[str(fraction)] = hits / len(queries)
+        lookup_texts.extend(texts)
+    unseen = [corpus.article(n_docs + j) for j in range(len(queries))]
+    lookup_texts.extend(unseen)
+
+    start = time.perf_counter()
+    matches = [index.lookup(text) for text in lookup_texts]
+    lookup_seconds = time.perf_counter() - start
+    false_positives = sum(m is not None for m in matches[-len(unseen):])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.dedup.npz")
+        start = time.perf_counter()
+        index.save(path)
+        save_seconds = time.perf_counter() - start
+        file_mib = os.path.getsize(path) / 1024 ** 2
+        start = time.perf_counter()
+        NearDuplicateIndex.load(path)
+        load_seconds = time.perf_counter() - start
+
+    return {
+        "n_docs": n_docs,
+        "add_docs_per_second": n_docs / add_seconds,
+        "add_us_per_doc": add_seconds / n_docs * 1e6,
+        "lookup_docs_per_second": len(lookup_texts) / lookup_seconds,
+        "lookup_us_per_doc": lookup_seconds / len(lookup_texts) * 1e6,
+        "duplicates_among_originals": duplicates_added,
+        "recall_by_edit_fraction": recall,
+        "false_positive_rate": false_positives / len(unseen),
+        "index_mib": index.nbytes() / 1024 ** 2,
+        "file_mib": file_mib,
+        "save_seconds": save_seconds,
+        "load_seconds": load_seconds,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Near-duplicate index throughput and accuracy")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 1000000])
+    parser.add_argument("--queries", type=int, default=2000, help="Edited copies looked up per edit fraction")
+    parser.add_argument("--edits", type=float, nargs="+", default=[0.01, 0.03, 0.05, 0.1])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    for n_docs in args.sizes:
+        row = run(n_docs, args)
+        results.append(row)
+        recall = " ".join(f"{k}:{v:.3f}" for k, v in row["recall_by_edit_fraction"].items())
+        print(f"{n_docs:>9} docs  add {row['add_docs_per_second']:>8.0f}/s ({row['add_us_per_doc']:.0f} us)  "
+              f"lookup {row['lookup_docs_per_second']:>8.0f}/s ({row['lookup_us_per_doc']:.0f} us)  "
+              f"index {row['index_mib']:.1f} MiB  file {row['file_mib']:.1f} MiB  load {row['load_seconds']:.3f} s")
+        print(f"{'':>15}recall {recall}  false positives {row['false_positive_rate']:.4f}  "
+              f"duplicates among originals {row['duplicates_among_originals']}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Compares HTML-to-text extraction engines over a saved corpus of pages:
+throughput, and agreement of each engine's output with the legacy bs4
+path. The corpus is either a page cache directory (its stored HTML) or a
+directory of .html files:
+
+    python bench_extract.py --corpus page_cache
+    python bench_extract.py --corpus saved_pages/ --engines bs4 fast content
+"""
+import argparse
+import gzip
+import json
+import os
+import statistics
+import time
+
+from extract import ENGINES
+
+
+def load_corpus(directory, limit=None):
+    pages = []
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            if name.endswith(".json.gz"):
+                with gzip.open(path, "rt", encoding="utf-8") as f:
+                    pages.append(json.load(f)["html"])
+            elif name.endswith((".html", ".htm")):
+                with open(path, encoding="utf-8", errors="replace") as f:
+                    pages.append(f.read())
+            if limit and len(pages) >= limit:
+                return pages
+    return pages
+
+
+def run_engine(engine, pages):
+    extract = ENGINES[engine]
+    texts = []
+    start = time.perf_counter()
+    for html in pages:
+        try:
+            texts.append(extract(html))
+        except Exception:
+            texts.append("")
+    return texts, time.perf_counter() - start
+
+
+def jaccard(a, b):
+    a, b = set(a.split()), set(b.split())
+    return len(a & b) / len(a | b) if a | b else 1.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTML extraction engine benchmark")
+    parser.add_argument("--corpus", required=True, help="Page cache directory or directory of .html files")
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES), choices=list(ENGINES))
+    parser.add_argument("--limit", type=int, help="Use at most this many pages")
+    parser.add_argument("--json", help="Write raw results to this JSON file")
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus, args.limit)
+    if not pages:
+        parser.error(f"No HTML pages found under {args.corpus}")
+    megabytes = sum(len(html.encode("utf-8")) for html in pages) / 1e6
+    print(f" Corpus: {len(pages)} pages, {megabytes:.1f} MB of HTML")
+
+    outputs, results = {}, {}
+    for engine in args.engines:
+        outputs[engine], seconds = run_engine(engine, pages)
+        results[engine] = {
+            "seconds": seconds,
+            "pages_per_second": len(pages) / seconds,
+            "mb_per_second": megabytes / seconds,
+            "mean_words": statistics.mean(len(t.split()) for t in outputs[engine]),
+        }
+
+    # Agreement with the legacy path: identical token streams, token-set overlap
+    # and how much of the legacy text each engine keeps.
+    if "bs4" in outputs:
+        reference = outputs["bs4"]
+        for engine in args.engines:
+            texts = outputs[engine]
+            results[engine]["identical_tokens"] = statistics.mean(
+                t.split() == r.split() for t, r in zip(texts, reference))
+            results[engine]["mean_jaccard_vs_bs4"] = statistics.mean(
+                jaccard(t, r) for t, r in zip(texts, reference))
+            results[engine]["words_kept_vs_bs4"] = (
+                sum(len(t.split()) for t in texts) / max(1, sum(len(r.split()) for r in reference)))
+
+    print(f"{'engine':>8} {'pages/s':>9} {'MB/s':>7} {'words':>7} {'identical':>10} {'jaccard':>8} {'kept':>6}")
+    for engine, r in results.items():
+        print(f"{engine:>8} {r['pages_per_second']:>9.0f} {r['mb_per_second']:>7.2f} {r['mean_words']:>7.0f} "
+              f"{r.get('identical_tokens', float('nan')):>10.3f} {r.get('mean_jaccard_vs_bs4', float('nan')):>8.3f} "
+              f"{r.get('words_kept_vs_bs4', float('nan')):>6.2f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
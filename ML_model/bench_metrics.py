@@ -0,0 +1,88 @@
+"""
+Measures what metrics and timing logs cost on the /predict path: the same
+requests are sent in-process with instrumentation on and off, interleaved
+in rounds so drift affects both modes equally. Run from the ML_model
+directory with a trained model (default: the committed models/svm_model.pkl):
+
+    python bench_metrics.py --requests 2000
+"""
+import argparse
+import contextlib
+import json
+import os
+import statistics
+import time
+
+from fastapi.testclient import TestClient
+
+import main_api
+import metrics
+from model_cache import load_serving_bundle
+
+SAMPLE_TEXT = "Police said the shooting suspect fled the high school before officers arrived."
+
+
+def set_instrumentation(enabled):
+    metrics.REGISTRY.enabled = enabled
+    metrics.TIMING_LOGS = enabled
+
+
+def run_round(client, n, enabled):
+    set_instrumentation(enabled)
+    latencies = []
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(n):
+            start = time.perf_counter()
+            client.post("/predict", json={"text": SAMPLE_TEXT})
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def instrumentation_cost(n=20000):
+    # Cost of the calls added per request, isolated from the request itself.
+    set_instrumentation(True)
+    stages = {"model_load": 1e-5, "vectorize": 1e-4, "svd": 1e-4, "score": 1e-4}
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        for _ in range(n):
+            main_api.record_predict_metrics("/predict", 1, 1, stages, 3e-4)
+            main_api.REQUESTS.inc(method="POST", path="/predict", status=200)
+            main_api.REQUEST_LATENCY.observe(3e-4, method="POST", path="/predict")
+        return (time.perf_counter() - start) / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Metrics overhead on /predict")
+    parser.add_argument("--model", default=os.path.join("models", "svm_model.pkl"))
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per mode")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--json", help="Write raw results to this JSON file")
+    args = parser.parse_args()
+
+    main_api.model_cache.activate(0, args.model, bundle=load_serving_bundle(args.model))
+    per_round = max(1, args.requests // args.rounds)
+    samples = {True: [], False: []}
+    with TestClient(main_api.app) as client:
+        run_round(client, 200, True)  # warm-up
+        for _ in range(args.rounds):
+            for enabled in (False, True):
+                samples[enabled].extend(run_round(client, per_round, enabled))
+
+    off, on = statistics.median(samples[False]), statistics.median(samples[True])
+    result = {
+        "requests_per_mode": len(samples[True]),
+        "median_ms_off": off * 1000,
+        "median_ms_on": on * 1000,
+        "median_overhead_ms": (on - off) * 1000,
+        "median_overhead_percent": (on - off) / off * 100,
+        "instrumentation_us_per_request": instrumentation_cost() * 1e6,
+    }
+    for key, value in result.items():
+        print(f"{key:>32}: {value:.3f}" if isinstance(value, float) else f"{key:>32}: {value}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Compares the exact RBF OneClassSVM ('svm') with the Nystroem + SGD
+approximation ('svm-approx') on synthetic document embeddings shaped like
+the pipeline's X_final (L2-normalized, 100 SVD components).
+
+    python bench_models.py --sizes 1000 5000 20000
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+from scipy.stats import spearmanr
+from sklearn.metrics import roc_auc_score
+
+from models import get_model
+
+N_FEATURES = 100
+
+
+def make_embeddings(rng, basis, n, noise=0.3):
+    X = rng.randn(n, basis.shape[0]) @ basis + noise * rng.randn(n, basis.shape[1])
+    return X / np.linalg.norm(X, axis=1, keepdims=True)
+
+
+def time_model(model_type, X_train, X_test):
+    model = get_model(model_type)
+    start = time.perf_counter()
+    model.fit(X_train)
+    fit_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    scores = model.decision_function(X_test)
+    predict_seconds = time.perf_counter() - start
+    return model, scores, fit_seconds, predict_seconds
+
+
+def run(n_train, n_test=2000, seed=0):
+    rng = np.random.RandomState(seed)
+    basis = rng.randn(10, N_FEATURES)
+    X_train = make_embeddings(rng, basis, n_train)
+    # Held-out inliers plus off-topic outliers (mostly noise).
+    X_test = np.vstack([make_embeddings(rng, basis, n_test), make_embeddings(rng, basis, n_test // 4, noise=3.0)])
+    y_test = np.r_[np.ones(n_test), np.zeros(n_test // 4)]
+
+    row = {"n_train": n_train, "n_test": len(X_test)}
+    scores = {}
+    for model_type in ["svm", "svm-approx"]:
+        model, scores[model_type], fit_seconds, predict_seconds = time_model(model_type, X_train, X_test)
+        row[model_type] = {
+            "fit_seconds": fit_seconds,
+            "predict_docs_per_second": len(X_test) / predict_seconds,
+            "auc_vs_outliers": roc_auc_score(y_test, scores[model_type]),
+        }
+        if model_type == "svm":
+            row[model_type]["support_vectors"] = int(model.support_vectors_.shape[0])
+
+    exact, approx = scores["svm"], scores["svm-approx"]
+    row["agreement"] = {
+        "spearman": float(spearmanr(exact, approx)[0]),
+        "label_agreement": float(np.mean((exact >= 0) == (approx >= 0))),
+    }
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exact vs approximate One-Class SVM benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--json", help="Write raw results to this JSON file")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'n_train':>8} {'model':>11} {'fit s':>8} {'pred docs/s':>12} {'AUC':>6}   agreement")
+    for n in args.sizes:
+        row = run(n)
+        results.append(row)
+        for model_type in ["svm", "svm-approx"]:
+            r = row[model_type]
+            agreement = ""
+            if model_type == "svm-approx":
+                agreement = (f"spearman={row['agreement']['spearman']:.3f} "
+                             f"labels={row['agreement']['label_agreement']:.3f}")
+            print(f"{n:>8} {model_type:>11} {r['fit_seconds']:>8.2f} {r['predict_docs_per_second']:>12.0f} "
+                  f"{r['auc_vs_outliers']:>6.3f}   {agreement}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
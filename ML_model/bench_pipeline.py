@@ -0,0 +1,293 @@
+"""
+End-to-end, offline benchmark of the training and serving pipeline. A
+frozen synthetic article corpus (same seed, same pages on every run) is
+served by a local HTTP server, and each stage is timed across corpus sizes:
+URL extraction, scraping (network and page cache), TF-IDF encoding, top-term
+selection, SVD, model fit per get_model type, cross-validation, and /predict
+single vs batch. Results are written as JSON so runs on different commits
+can be compared:
+
+    python bench_pipeline.py --sizes 200 1000 5000 --json base.json
+    python bench_pipeline.py --sizes 200 1000 5000 --json new.json --compare base.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import pickle
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+CRISIS_WORDS = ("shooting suspect police officers school evacuation flood storm hurricane wildfire earthquake "
+                "rescue injured killed victims emergency shelter damage governor outage explosion").split()
+FILLER_WORDS = ("the said on in a of to and was were with for by after county city residents officials "
+                "thursday monday report according local statement morning people area state federal").split()
+BOILERPLATE = ("<header><nav><a href='/'>Home</a> <a href='/news'>News</a> <a href='/weather'>Weather</a>"
+               "</nav></header>")
+FOOTER = "<footer><p>Copyright Local News Network. All rights reserved.</p><form><button>Subscribe</button></form></footer>"
+
+
+# --- Frozen corpus ---
+def make_article(i, seed=0):
+    rng = random.Random(seed * 1_000_003 + i)
+    topic = rng.sample(CRISIS_WORDS, 6)
+    paragraphs = []
+    for _ in range(rng.randint(3, 8)):
+        words = [rng.choice(topic) if rng.random() < 0.25 else rng.choice(FILLER_WORDS)
+                 for _ in range(rng.randint(30, 80))]
+        paragraphs.append("<p>" + " ".join(words).capitalize() + ".</p>")
+    title = " ".join(topic[:3]).title()
+    return (f"<html><head><title>{title}</title><script>var ads = [];</script></head><body>{BOILERPLATE}"
+            f"<article><h1>{title}</h1>{''.join(paragraphs)}</article>{FOOTER}</body></html>").encode("utf-8")
+
+
+class CorpusServer:
+    """Serves pre-rendered pages at /article/<i> from a background thread."""
+
+    def __init__(self, pages):
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                try:
+                    body = pages[int(self.path.rsplit("/", 1)[-1])]
+                except (ValueError, IndexError):
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def write_zip(path, urls):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("links.txt", "\n".join(urls) + "\n")
+    return path
+
+
+# --- Timing ---
+def timed(fn, repeats):
+    """Runs fn `repeats` times; returns the first result and every duration."""
+    result, runs = None, []
+    for i in range(repeats):
+        start = time.perf_counter()
+        value = fn()
+        runs.append(time.perf_counter() - start)
+        if i == 0:
+            result = value
+    return result, runs
+
+
+def stage(runs, items):
+    seconds = statistics.median(runs)
+    return {"seconds": seconds, "runs": runs, "items": items,
+            "items_per_second": items / seconds if seconds > 0 else None}
+
+
+@contextlib.contextmanager
+def quiet():
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        yield
+
+
+def predict_stages(bundle, texts, tmp, n_single, repeats):
+    # In-process ASGI requests against the real app, with the prediction
+    # cache off so every request goes through the full scoring path.
+    from fastapi.testclient import TestClient
+    import main_api
+    import metrics
+    from model_cache import load_serving_bundle
+    from prediction_cache import PredictionCache
+
+    model_path = os.path.join(tmp, "bench_model.pkl")
+    with open(model_path, "wb") as f:
+        pickle.dump(bundle, f)
+    main_api.model_cache.activate(-1, model_path, bundle=load_serving_bundle(model_path))
+    main_api.prediction_cache = PredictionCache(max_bytes=0)
+    metrics.TIMING_LOGS = False
+    client = TestClient(main_api.app)
+    single = texts[:n_single]
+
+    def run_single():
+        latencies = []
+        for text in single:
+            start = time.perf_counter()
+            response = client.post("/predict", json={"text": text})
+            latencies.append(time.perf_counter() - start)
+            response.raise_for_status()
+        return statistics.median(latencies)
+
+    def run_batch():
+        client.post("/predict/batch", json={"texts": texts}).raise_for_status()
+
+    with quiet():
+        p50, single_runs = timed(run_single, repeats)
+        _, batch_runs = timed(run_batch, repeats)
+    main_api.model_cache.clear()
+    return {
+        "predict_single": dict(stage(single_runs, len(single)), p50_ms=p50 * 1000),
+        "predict_batch": stage(batch_runs, len(texts)),
+    }
+
+
+def run(n_docs, args, tmp):
+    from evaluate import evaluate_model
+    from features import count_terms, encode_texts, features_from_counts, select_terms
+    from models import get_model
+    from page_cache import PageCache
+    from processor import extract_urls, scrape_urls
+    from training import normalize_vectors, reduce_dimensionality
+
+    stages = {}
+    pages = [make_article(i, args.seed) for i in range(n_docs)]
+    with CorpusServer(pages) as server, quiet():  # the scraper logs every URL
+        zip_path = write_zip(os.path.join(tmp, f"links_{n_docs}.zip"),
+                             [f"{server.base_url}/article/{i}" for i in range(n_docs)])
+        urls, runs = timed(lambda: extract_urls(zip_path), args.repeats)
+        stages["extract_urls"] = stage(runs, n_docs)
+
+        texts, runs = timed(lambda: scrape_urls(urls, cache=None, retries=0), args.repeats)
+        stages["scrape"] = stage(runs, n_docs)
+        if sum(1 for text in texts if text) != n_docs:
+            raise RuntimeError("Some corpus pages failed to scrape.")
+
+        cache = PageCache(os.path.join(tmp, f"pages_{n_docs}"))
+        scrape_urls(urls, cache=cache, retries=0)  # fill the cache
+        _, runs = timed(lambda: scrape_urls(urls, cache=cache, offline=True), args.repeats)
+        stages["scrape_cached"] = stage(runs, n_docs)
+
+    (X_tfidf, vectorizer), runs = timed(lambda: encode_texts(texts), args.repeats)
+    stages["encode_texts"] = stage(runs, n_docs)
+    (X, selected, top_terms), runs = timed(lambda: select_terms(X_tfidf, vectorizer, n_terms=300), args.repeats)
+    stages["select_terms"] = stage(runs, n_docs)
+    # What training actually runs: one counting pass, then TF-IDF and term selection.
+    _, runs = timed(lambda: features_from_counts(*count_terms(texts), n_terms=300), args.repeats)
+    stages["count_and_select_terms"] = stage(runs, n_docs)
+
+    n_components = min(100, X.shape[1] - 1)
+    (X_reduced, svd), runs = timed(lambda: reduce_dimensionality(X, n_components=n_components), args.repeats)
+    stages["reduce_dimensionality"] = stage(runs, n_docs)
+    X_final = normalize_vectors(X_reduced)
+
+    fitted = {}
+    for model_type in args.models:
+        fitted[model_type], runs = timed(lambda: get_model(model_type).fit(X_final), args.repeats)
+        stages[f"fit_{model_type}"] = stage(runs, n_docs)
+
+    model = fitted.get("svm") or get_model("svm").fit(X_final)
+    y_true = np.ones(n_docs)
+    _, runs = timed(lambda: evaluate_model(X_final, y_true, model, threshold=0), args.repeats)
+    stages["cross_validation_svm"] = stage(runs, n_docs)
+
+    bundle = {"model": model, "vectorizer": selected, "svd": svd, "top_terms": top_terms,
+              "threshold": 0.0, "classifier": "svm"}
+    stages.update(predict_stages(bundle, texts, tmp, min(n_docs, args.predict_requests), args.repeats))
+    return {"n_docs": n_docs, "stages": stages}
+
+
+# --- Metadata and comparison ---
+def environment():
+    import sklearn
+
+    def git(*cmd):
+        try:
+            return subprocess.run(["git", *cmd], cwd=HERE, capture_output=True, text=True, check=True).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    return {
+        "commit": git("rev-parse", "--short", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "sklearn": sklearn.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Prints per-stage timings against a baseline; returns the regressed (n_docs, stage) pairs."""
+    base = {(row["n_docs"], name): s["seconds"] for row in baseline["results"] for name, s in row["stages"].items()}
+    regressions = []
+    print(f"\nvs {baseline['environment'].get('commit')} (tolerance {tolerance:.0%})")
+    print(f"{'n_docs':>8} {'stage':>24} {'base s':>10} {'now s':>10} {'change':>8}")
+    for row in results:
+        for name, s in row["stages"].items():
+            before = base.get((row["n_docs"], name))
+            if not before:
+                continue
+            change = s["seconds"] / before - 1
+            flag = ""
+            if change > tolerance:
+                flag = "  REGRESSION"
+                regressions.append((row["n_docs"], name))
+            print(f"{row['n_docs']:>8} {name:>24} {before:>10.4f} {s['seconds']:>10.4f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline end-to-end pipeline benchmark")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[200, 1000, 5000])
+    parser.add_argument("--models", nargs="+", default=["svm", "svm-approx", "iforest"])
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per stage; the median is reported")
+    parser.add_argument("--predict-requests", type=int, default=200, help="Single /predict calls per run")
+    parser.add_argument("--seed", type=int, default=0, help="Corpus seed (keep fixed to compare commits)")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    parser.add_argument("--compare", help="Baseline JSON from an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Slowdown flagged as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    output = {"environment": environment(), "config": vars(args), "results": []}
+    with tempfile.TemporaryDirectory(prefix="bench_pipeline_") as tmp:
+        for n_docs in args.sizes:
+            row = run(n_docs, args, tmp)
+            output["results"].append(row)
+            print(f"\n{n_docs} documents")
+            for name, s in row["stages"].items():
+                rate = f"{s['items_per_second']:>12.1f}/s" if s["items_per_second"] else ""
+                print(f"  {name:>24} {s['seconds']:>10.4f} s {rate}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(output, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(output["results"], json.load(f), args.tolerance)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
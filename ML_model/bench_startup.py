@@ -0,0 +1,69 @@
+"""
+Cold-start benchmark for the API: import time, startup (schema + active
+model preload) and first-prediction latency, each measured in a fresh
+interpreter. Run from the ML_model directory:
+
+    python bench_startup.py --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PROBE = r"""
+import asyncio, json, sys, time
+t0 = time.perf_counter()
+import main_api
+t1 = time.perf_counter()
+
+async def run():
+    async with main_api.lifespan(main_api.app):
+        t2 = time.perf_counter()
+        await main_api.predict(main_api.PredictRequest(text=sys.argv[1]))
+        t3 = time.perf_counter()
+        return t2, t3
+
+t2, t3 = asyncio.run(run())
+heavy = ["sklearn", "scipy", "bs4", "requests", "matplotlib"]
+print(json.dumps({
+    "import_seconds": t1 - t0,
+    "startup_seconds": t2 - t1,
+    "first_predict_seconds": t3 - t2,
+    "heavy_modules_loaded": [m for m in heavy if m in sys.modules],
+}))
+"""
+
+SAMPLE_TEXT = "Police said the shooting suspect fled the high school before officers arrived."
+
+
+def run_probe(text):
+    start = os.times().elapsed
+    out = subprocess.run([sys.executable, "-c", PROBE, text], capture_output=True, text=True, check=True,
+                         cwd=os.path.dirname(os.path.abspath(__file__)))
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    result["process_seconds"] = os.times().elapsed - start
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure API cold-start latency")
+    parser.add_argument("--runs", type=int, default=5, help="Number of fresh interpreters to launch")
+    parser.add_argument("--json", action="store_true", help="Print raw JSON results")
+    args = parser.parse_args()
+
+    runs = [run_probe(SAMPLE_TEXT) for _ in range(args.runs)]
+    if args.json:
+        print(json.dumps(runs, indent=2))
+        return
+
+    for key in ["import_seconds", "startup_seconds", "first_predict_seconds", "process_seconds"]:
+        values = [r[key] for r in runs]
+        print(f"{key:>22}: median {statistics.median(values) * 1000:8.1f} ms | "
+              f"min {min(values) * 1000:8.1f} ms | max {max(values) * 1000:8.1f} ms")
+    print(f"{'heavy modules loaded':>22}: {runs[-1]['heavy_modules_loaded'] or 'none'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Multi-worker serving benchmark: for each serving format and worker count
+`serve.py --workers N` is started on a throwaway registry, loaded with
+concurrent /predict clients, and each worker's memory is read from
+/proc/<pid>/smaps. PSS splits shared pages between the processes mapping
+them, so summed PSS is what the workers really cost together. Linux only.
+
+    python bench_workers.py --workers 1 2 4 8 --duration 10
+    python bench_workers.py --synthetic-svs 100000   # a model large enough to matter
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from bench_coalesce import HERE, WORDS, free_port, load
+from compiled import FORMAT_VERSION, write_aligned_npz
+from registry import ModelRegistry
+
+
+def synthetic_model(path, n_svs, n_terms=5000, n_components=100, seed=0):
+    # Same layout as compiled.export_bundle, with random weights: scores are
+    # meaningless but the memory footprint and per-request work are real.
+    rng = np.random.default_rng(seed)
+    terms = sorted(set(WORDS) | {f"term{i}" for i in range(n_terms - len(set(WORDS)))})
+    centers = rng.standard_normal((n_svs, n_components))
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+    arrays = {
+        "format_version": np.array(FORMAT_VERSION),
+        "kind": np.array("ocsvm-rbf"),
+        "terms": np.array(terms, dtype=str),
+        "projection": rng.standard_normal((len(terms), n_components)),
+        "support_vectors": centers,
+        "dual_coef": np.full(n_svs, 1.0 / n_svs),
+        "sv_sq_norms": np.einsum("ij,ij->i", centers, centers),
+        "intercept": np.array(-0.5),
+        "gamma": np.array(1.0 / n_components),
+        "threshold": np.array(0.0),
+    }
+    write_aligned_npz(path, arrays)
+    return path
+
+
+def start_server(port, workers, serving_format, database):
+    env = dict(os.environ, DATABASE=database, SERVING_FORMAT=serving_format, TIMING_LOGS="0",
+               PREDICTION_CACHE_MAX_BYTES="0", PREDICT_COALESCE="0")
+    process = subprocess.Popen([sys.executable, "serve.py", "--host", "127.0.0.1", "--port", str(port),
+                                "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+                               cwd=HERE, env=env, stdout=subprocess.DEVNULL)
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        pids = worker_pids(process.pid, workers)
+        if len(pids) == workers and all(registry_opened(pid, database) for pid in pids):
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=1).close()
+                return process
+            except OSError:
+                pass
+        time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("Workers did not start")
+
+
+def worker_pids(parent, workers):
+    if workers == 1:
+        return [parent]  # serve.py runs a single worker in-process
+    children = []
+    for task in os.listdir(f"/proc/{parent}/task"):
+        with open(f"/proc/{parent}/task/{task}/children") as f:
+            children.extend(int(pid) for pid in f.read().split())
+    workers = []
+    for pid in children:
+        try:
+            with open(f"/proc/{pid}/cmdline", "rb") as f:
+                if b"spawn_main" in f.read():  # not the multiprocessing resource tracker
+                    workers.append(pid)
+        except FileNotFoundError:
+            pass
+    return workers
+
+
+def registry_opened(pid, database):
+    # A worker is ready once its lifespan has opened the registry database.
+    try:
+        return any(os.path.realpath(os.path.join(f"/proc/{pid}/fd", fd)) == database
+                   for fd in os.listdir(f"/proc/{pid}/fd"))
+    except OSError:
+        return False
+
+
+def memory(pid, model_path):
+    """Whole-process and model-file RSS/PSS in MiB, from /proc/<pid>/smaps."""
+    totals = {"rss": 0, "pss": 0, "model_rss": 0, "model_pss": 0}
+    mapping = None
+    with open(f"/proc/{pid}/smaps") as f:
+        for line in f:
+            fields = line.split()
+            if "-" in fields[0] and not fields[0].endswith(":"):
+                mapping = fields[5] if len(fields) > 5 else ""
+            elif fields[0] in ("Rss:", "Pss:"):
+                key = fields[0][:-1].lower()
+                totals[key] += int(fields[1])
+                if mapping == model_path:
+                    totals["model_" + key] += int(fields[1])
+    return {key: kb / 1024 for key, kb in totals.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory and throughput across uvicorn worker counts")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--formats", nargs="+", default=["mmap", "copy"], choices=["mmap", "copy", "pickle"])
+    parser.add_argument("--model", default=os.path.join(HERE, "models", "svm_model.pkl"))
+    parser.add_argument("--synthetic-svs", type=int, default=0,
+                        help="Serve a generated compiled model with this many support vectors instead")
+    parser.add_argument("--clients-per-worker", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=10, help="Seconds of load per run")
+    parser.add_argument("--json", help="Write raw results to this JSON file")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_workers_")
+    if args.synthetic_svs:
+        model_file = synthetic_model(os.path.join(tmp, "synthetic.npz"), args.synthetic_svs)
+        args.formats = [f for f in args.formats if f != "pickle"]
+    else:
+        model_file = os.path.abspath(args.model)
+    database = os.path.join(tmp, "app.db")
+    registry = ModelRegistry(database)
+    registry.migrate()
+    registry.register("bench_model", "svm", model_file)
+    registry.close()
+    mapped_file = os.path.splitext(model_file)[0] + ".npz"
+    print(f"model: {mapped_file} ({os.path.getsize(mapped_file) / 1024 ** 2:.1f} MiB), {os.cpu_count()} CPUs")
+
+    results = []
+    print(f"{'format':>7} {'workers':>8} {'rps':>8} {'p50 ms':>8} {'p99 ms':>8} {'RSS/wkr':>8} "
+          f"{'PSS/wkr':>8} {'model RSS':>10} {'model PSS':>10} {'PSS total':>10}")
+    for serving_format in args.formats:
+        for workers in args.workers:
+            port = free_port()
+            server = start_server(port, workers, serving_format, database)
+            try:
+                asyncio.run(load(port, workers, 1))  # warm-up: every worker scores at least once
+                row = asyncio.run(load(port, workers * args.clients_per_worker, args.duration))
+                usage = [memory(pid, mapped_file) for pid in worker_pids(server.pid, workers)]
+            finally:
+                server.terminate()
+                server.wait()
+            row.update(format=serving_format, workers=workers, memory_mib=usage)
+            for key in ("rss", "pss", "model_rss", "model_pss"):
+                row[f"{key}_mib_per_worker"] = sum(u[key] for u in usage) / len(usage)
+            row["pss_mib_total"] = sum(u["pss"] for u in usage)
+            results.append(row)
+            print(f"{serving_format:>7} {workers:>8} {row['rps']:>8.0f} {row['p50_ms']:>8.2f} "
+                  f"{row['p99_ms']:>8.2f} {row['rss_mib_per_worker']:>8.1f} {row['pss_mib_per_worker']:>8.1f} "
+                  f"{row['model_rss_mib_per_worker']:>10.1f} {row['model_pss_mib_per_worker']:>10.1f} "
+                  f"{row['pss_mib_total']:>10.1f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,294 @@
+"""
+Offline bulk scoring: scores a large file of pre-scraped texts or URLs with
+a saved model, sharded across a process pool. Each shard is written to its
+own part file under the output directory as soon as it is done (under a
+temporary name, renamed when complete), so a crashed or interrupted run
+resumes by skipping the shards whose part files already exist.
+
+    python bulk_score.py articles.jsonl out/ --workers 4
+    python bulk_score.py urls.txt out/ --model models/svm_model.pkl --offline
+
+Input is JSONL (one object per line with "text" or "url", and optionally
+"id"), a text file of one URL per line, or Parquet with the same columns
+(needs pyarrow). Output lines carry the id, prediction and score, or an
+error for URLs that could not be scraped.
+"""
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from inference import label, score_matrix
+from model_cache import load_serving_bundle
+from registry import DATABASE, SCHEMA_VERSION, ModelRegistry, file_checksum
+
+# Records per shard: one part file, one unit of resumable work.
+BULK_SHARD_SIZE = int(os.environ.get("BULK_SHARD_SIZE", 5000))
+MANIFEST = "manifest.json"
+
+
+# --- Input ---
+def iter_records(path, input_format=None):
+    """Yields {"id", "text" or "url"} dicts; ids default to the record's position."""
+    input_format = input_format or _detect_format(path)
+    if input_format == "parquet":
+        rows = _iter_parquet(path)
+    else:
+        rows = _iter_lines(path, input_format)
+    for position, row in enumerate(rows):
+        record = {"id": row.get("id", position)}
+        if row.get("text") is not None:
+            record["text"] = row["text"]
+        elif row.get("url"):
+            record["url"] = row["url"]
+        else:
+            raise ValueError(f"Record {position} has neither text nor url.")
+        yield record
+
+
+def _detect_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    return {".jsonl": "jsonl", ".ndjson": "jsonl", ".parquet": "parquet"}.get(extension, "urls")
+
+
+def _iter_lines(path, input_format):
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            yield json.loads(line) if input_format == "jsonl" else {"url": line}
+
+
+def _iter_parquet(path):
+    import pyarrow.parquet as pq  # optional: only Parquet input needs it
+
+    for batch in pq.ParquetFile(path).iter_batches(columns=None):
+        yield from batch.to_pylist()
+
+
+def iter_shards(records, shard_size):
+    shard = []
+    for record in records:
+        shard.append(record)
+        if len(shard) == shard_size:
+            yield shard
+            shard = []
+    if shard:
+        yield shard
+
+
+# --- Workers ---
+_bundle = None
+
+
+def _init_worker(model_file):
+    # One model load per worker; the compiled artifact is memory-mapped, so
+    # the weights are shared between workers through the page cache.
+    global _bundle
+    _bundle = load_serving_bundle(model_file)
+
+
+def score_shard(shard_index, records, part_path, cache_dir=None, offline=False, verbose=False):
+    """Scores one shard into part_path. Returns (shard index, counts, stage seconds, scrape outcomes)."""
+    from processor import ScrapeStats, scrape_urls
+    from page_cache import PageCache
+
+    stages = {}
+    start = time.perf_counter()
+    texts = [record.get("text") for record in records]
+    url_positions = [i for i, record in enumerate(records) if "url" in record]
+    stats = ScrapeStats()
+    if url_positions:
+        cache = PageCache(cache_dir) if cache_dir else None
+        with contextlib.ExitStack() as stack:
+            if not verbose:  # the scraper logs every URL
+                stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, "w"))))
+            scraped = scrape_urls([records[i]["url"] for i in url_positions], cache=cache, offline=offline,
+                                  stats=stats)
+        for i, text in zip(url_positions, scraped):
+            texts[i] = text
+        stages["scrape"] = time.perf_counter() - start
+
+    scored = [i for i, text in enumerate(texts) if text]
+    scores = score_matrix(_bundle, [texts[i] for i in scored], stages) if scored else []
+    threshold = float(_bundle.get("threshold", 0))
+
+    start = time.perf_counter()
+    lines = [None] * len(records)
+    for i, score in zip(scored, scores):
+        lines[i] = {"status": "ok", "prediction": label(score, threshold), "score": float(score)}
+    tmp_path = part_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for record, line in zip(records, lines):
+            head = {"id": record["id"]}
+            if "url" in record:
+                head["url"] = record["url"]
+            if line is None:
+                line = {"status": "error", "error": "scrape_failed" if "url" in record else "empty_text"}
+            f.write(json.dumps(dict(head, **line)) + "\n")
+    os.replace(tmp_path, part_path)
+    stages["write"] = time.perf_counter() - start
+    counts = {"documents": len(records), "scored": len(scored), "errors": len(records) - len(scored)}
+    return shard_index, counts, stages, stats.as_dict()
+
+
+# --- Checkpointing ---
+def part_path(output_dir, shard_index):
+    return os.path.join(output_dir, f"part-{shard_index:05d}.jsonl")
+
+
+def open_output(output_dir, manifest):
+    """
+    Creates the output directory or checks that it belongs to the same run
+    (input, model and shard size), so resumed parts line up with the input.
+    Returns the indexes of shards already completed.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST)
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            previous = json.load(f)
+        for key in ("input", "input_bytes", "model_checksum", "shard_size"):
+            if previous.get(key) != manifest[key]:
+                raise ValueError(f"{output_dir} holds a run with a different {key}; use a new output directory.")
+    else:
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+
+    done = set()
+    for name in os.listdir(output_dir):
+        if name.endswith(".tmp"):
+            os.remove(os.path.join(output_dir, name))  # a shard interrupted mid-write
+        elif name.startswith("part-") and name.endswith(".jsonl"):
+            done.add(int(name[len("part-"):-len(".jsonl")]))
+    return done
+
+
+def resolve_model(model_file=None, database=DATABASE):
+    # Defaults to the model the registry marks active. The registry is only
+    # read: schema changes are left to the API, not a batch tool.
+    if model_file is not None:
+        return os.path.abspath(model_file)
+    if not os.path.exists(database):
+        raise ValueError(f"No model given and there is no registry at {database}.")
+    registry = ModelRegistry(database, readonly=True)
+    try:
+        if registry.schema_version() < SCHEMA_VERSION:
+            raise ValueError(f"The registry at {database} predates this version; start the API once to "
+                             "migrate it, or pass --model.")
+        active = registry.active()
+    finally:
+        registry.close()
+    if active is None:
+        raise ValueError("No model given and the registry has no active model.")
+    return active["file_path"]
+
+
+# --- Driver ---
+def bulk_score(input_path, output_dir, model_file=None, workers=None, shard_size=BULK_SHARD_SIZE,
+               input_format=None, cache_dir=None, offline=False, verbose=False):
+    model_file = resolve_model(model_file)
+    manifest = {
+        "input": os.path.abspath(input_path),
+        "input_bytes": os.path.getsize(input_path),
+        "model_file": model_file,
+        "model_checksum": file_checksum(model_file),
+        "shard_size": shard_size,
+    }
+    done = open_output(output_dir, manifest)
+    workers = workers or os.cpu_count() or 1
+
+    start = time.perf_counter()
+    totals = {"documents": 0, "scored": 0, "errors": 0, "shards": 0, "skipped_shards": 0}
+    stages = {"read": 0.0}
+    outcomes = {}
+
+    def collect(future):
+        _, counts, shard_stages, shard_outcomes = future.result()
+        totals["shards"] += 1
+        for key, value in counts.items():
+            totals[key] += value
+        for stage, seconds in shard_stages.items():
+            stages[stage] = stages.get(stage, 0.0) + seconds
+        for domain_outcomes in shard_outcomes.values():
+            for outcome, count in domain_outcomes.items():
+                outcomes[outcome] = outcomes.get(outcome, 0) + count
+        print(f" {totals['shards']} shards, {totals['documents']} documents "
+              f"({totals['documents'] / (time.perf_counter() - start):.0f}/s)")
+
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker,
+                             initargs=(model_file,)) as executor:
+        pending = set()
+        read_start = time.perf_counter()
+        for shard_index, shard in enumerate(iter_shards(iter_records(input_path, input_format), shard_size)):
+            if shard_index in done:
+                totals["skipped_shards"] += 1
+                continue
+            stages["read"] += time.perf_counter() - read_start
+            # Bounded in flight, so the input is never held in memory whole.
+            while len(pending) >= 2 * workers:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    collect(future)
+            pending.add(executor.submit(score_shard, shard_index, shard, part_path(output_dir, shard_index),
+                                        cache_dir=cache_dir, offline=offline, verbose=verbose))
+            read_start = time.perf_counter()
+        for future in wait(pending).done:
+            collect(future)
+
+    seconds = time.perf_counter() - start
+    return dict(totals, seconds=seconds, documents_per_second=totals["documents"] / seconds if seconds else None,
+                stage_seconds=stages, scrape_outcomes=outcomes, model_file=model_file)
+
+
+def print_report(report):
+    print(f"\n Scored {report['documents']} documents in {report['seconds']:.1f} s "
+          f"({report['documents_per_second'] or 0:.0f} docs/s); {report['errors']} errors, "
+          f"{report['skipped_shards']} shards already done")
+    print(" Stage seconds (summed across workers):")
+    for stage, seconds in report["stage_seconds"].items():
+        print(f"{stage:>12} {seconds:>10.3f}")
+    if report["scrape_outcomes"]:
+        print(" Scrape outcomes: " + ", ".join(f"{k}={v}" for k, v in sorted(report["scrape_outcomes"].items())))
+
+
+def main():
+    from page_cache import PAGE_CACHE_DIR
+
+    parser = argparse.ArgumentParser(description="Score a large file of texts or URLs with a saved model")
+    parser.add_argument("input", help="JSONL with text/url (and optional id), a URL list, or Parquet")
+    parser.add_argument("output_dir", help="Directory for part files; rerun with the same one to resume")
+    parser.add_argument("--model", help="Saved model bundle (.pkl); defaults to the registry's active model")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: all cores)")
+    parser.add_argument("--shard-size", type=int, default=BULK_SHARD_SIZE, help="Records per part file")
+    parser.add_argument("--format", choices=["jsonl", "urls", "parquet"], help="Input format (default: by extension)")
+    parser.add_argument("--cache-dir", default=PAGE_CACHE_DIR, help="Directory for cached pages")
+    parser.add_argument("--no-cache", action="store_true", help="Always fetch pages, bypassing the cache")
+    parser.add_argument("--offline", action="store_true", help="Use only cached pages; never hit the network")
+    parser.add_argument("--verbose", action="store_true", help="Log every scraped URL")
+    parser.add_argument("--json", help="Also write the run report to this JSON file")
+    args = parser.parse_args()
+    if args.offline and args.no_cache:
+        parser.error("--offline requires the page cache")
+
+    try:
+        report = bulk_score(args.input, args.output_dir, model_file=args.model, workers=args.workers,
+                            shard_size=args.shard_size, input_format=args.format,
+                            cache_dir=None if args.no_cache else args.cache_dir, offline=args.offline,
+                            verbose=args.verbose)
+    except ValueError as e:
+        sys.exit(f" {e}")
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
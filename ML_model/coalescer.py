@@ -0,0 +1,65 @@
+import asyncio
+import os
+
+# Off by default: set PREDICT_COALESCE=1 to batch concurrent /predict calls.
+PREDICT_COALESCE = os.environ.get("PREDICT_COALESCE", "0") == "1"
+# How long the first request of a batch waits for company, and the batch cap.
+COALESCE_WINDOW_MS = float(os.environ.get("COALESCE_WINDOW_MS", 2))
+COALESCE_MAX_BATCH = int(os.environ.get("COALESCE_MAX_BATCH", 64))
+
+
+class Coalescer:
+    """
+    Gathers concurrent single-item requests into batches. When no batch is
+    being scored an item is dispatched at once; otherwise items queue for
+    at most `window` seconds (or until max_batch arrive). batch_fn(items)
+    runs once per batch in a worker thread and each caller receives its
+    own entry of the returned list. If batch_fn raises, every caller in
+    that batch gets the exception.
+    """
+
+    def __init__(self, batch_fn, window=COALESCE_WINDOW_MS / 1000, max_batch=COALESCE_MAX_BATCH):
+        self.batch_fn = batch_fn
+        self.window = max(0.0, window)
+        self.max_batch = max(1, max_batch)
+        self._loop = None
+        self._pending = []
+        self._timer = None
+        self._tasks = set()
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # A new event loop (e.g. a fresh test client) starts from a clean slate.
+            self._loop, self._pending, self._timer = loop, [], None
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch or not self._tasks:
+            # Idle scorer: go now; requests arriving meanwhile form the next batch.
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = self._loop.create_task(self._run(batch))
+            self._tasks.add(task)  # keep a reference until the batch finishes
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        items = [item for item, _ in batch]
+        try:
+            results = await asyncio.to_thread(self.batch_fn, items)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,240 @@
+import io
+import re
+import struct
+import sys
+import zipfile
+
+import numpy as np
+
+# Version 2 dropped the term hash table; version 1 files still load, their
+# table is ignored.
+FORMAT_VERSION = 2
+_READABLE_VERSIONS = (1, 2)
+# Payload alignment of exported arrays, and the zip extra field id used to pad to it.
+ALIGNMENT = 64
+_PADDING_FIELD_ID = 0xD935
+
+# Same tokenization as TfidfVectorizer's defaults (lowercase, 2+ word chars).
+TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+
+
+def _rbf_expansion(model):
+    """
+    Returns (centers, weights, intercept, gamma) such that the model's decision
+    function is exp(-gamma * ||x - centers||^2) @ weights + intercept.
+    """
+    if getattr(model, "kernel", None) == "rbf" and hasattr(model, "dual_coef_"):
+        # OneClassSVM: support vectors and their dual coefficients.
+        return model.support_vectors_, model.dual_coef_.ravel(), float(model.intercept_[0]), float(model._gamma)
+    sampler, svm = getattr(model, "sampler_", None), getattr(model, "svm_", None)
+    if sampler is not None and svm is not None and sampler.kernel == "rbf":
+        # models.ApproxOneClassSVM: Nystroem landmarks with the linear SVM folded
+        # through the Nystroem normalization.
+        weights = sampler.normalization_.T @ svm.coef_.ravel()
+        return sampler.components_, weights, -float(svm.offset_[0]), float(sampler.gamma)
+    raise ValueError(f"Cannot compile model of type {type(model).__name__}; "
+                     "only RBF One-Class SVM models are supported.")
+
+
+# Everything the compiled tokenizer and projection reproduce. Any other value
+# would make the compiled scores silently differ from the vectorizer's.
+_VECTORIZER_DEFAULTS = {
+    "analyzer": "word",
+    "tokenizer": None,
+    "preprocessor": None,
+    "token_pattern": TOKEN_PATTERN.pattern,
+    "lowercase": True,
+    "strip_accents": None,
+    "stop_words": None,
+    "ngram_range": (1, 1),
+    "binary": False,
+    "use_idf": True,
+    "sublinear_tf": False,
+    "norm": "l2",
+}
+
+
+def export_bundle(bundle, path):
+    """Writes the bundle's inference path to `path` (.npz). Returns the path."""
+    model = bundle["model"]
+    vectorizer = bundle["vectorizer"]
+    svd = bundle["svd"]
+
+    centers, weights, intercept, gamma = _rbf_expansion(model)
+    changed = [name for name, default in _VECTORIZER_DEFAULTS.items() if getattr(vectorizer, name, default) != default]
+    if changed:
+        raise ValueError("Cannot compile vectorizer: only default word-unigram TF-IDF settings are supported "
+                         f"(non-default {', '.join(changed)}).")
+
+    terms = [None] * len(vectorizer.vocabulary_)
+    for term, index in vectorizer.vocabulary_.items():
+        terms[index] = term
+
+    # The TF-IDF row norm only rescales the SVD output, which gets L2-normalized
+    # again, so IDF weights and SVD components fold into a single projection.
+    projection = vectorizer.idf_[:, None] * svd.components_.T
+    arrays = {
+        "format_version": np.array(FORMAT_VERSION),
+        "kind": np.array("ocsvm-rbf"),
+        "terms": np.array(terms, dtype=str),
+        "projection": np.ascontiguousarray(projection, dtype=np.float64),
+        "support_vectors": np.ascontiguousarray(centers, dtype=np.float64),
+        "dual_coef": np.ascontiguousarray(weights, dtype=np.float64),
+        # Precomputed so worker processes share it through the mapping too.
+        "sv_sq_norms": np.einsum("ij,ij->i", centers, centers).astype(np.float64),
+        "intercept": np.array(intercept),
+        "gamma": np.array(gamma),
+        "threshold": np.array(float(bundle.get("threshold", 0))),
+    }
+    write_aligned_npz(path, arrays)
+    return path
+
+
+def write_aligned_npz(path, arrays):
+    """
+    np.savez-compatible archive whose array payloads start on 64-byte
+    boundaries. np.savez leaves them wherever the zip headers end, and
+    numpy won't hand unaligned memory-mapped arrays to BLAS.
+    """
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED, allowZip64=True) as archive:
+        for name, array in arrays.items():
+            buffer = io.BytesIO()
+            np.lib.format.write_array(buffer, np.asanyarray(array), allow_pickle=False)
+            info = zipfile.ZipInfo(f"{name}.npy", date_time=(1980, 1, 1, 0, 0, 0))
+            info.compress_type = zipfile.ZIP_STORED
+            # The .npy header is already padded to 64 bytes; pad the zip local
+            # header with an extra field so it ends on a boundary too.
+            header_end = archive.fp.tell() + 30 + len(info.filename.encode("utf-8")) + 4
+            padding = -header_end % ALIGNMENT
+            info.extra = struct.pack("<HH", _PADDING_FIELD_ID, padding) + b"\0" * padding
+            archive.writestr(info, buffer.getvalue())
+
+
+def _mmap_npz(path):
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as f:
+        for info in archive.infolist():
+            name = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            if info.compress_type != zipfile.ZIP_STORED:
+                arrays[name] = np.load(archive.open(info))
+                continue
+            # Skip the zip local file header to reach the .npy payload.
+            f.seek(info.header_offset)
+            header = f.read(30)
+            name_len, extra_len = struct.unpack("<HH", header[26:30])
+            f.seek(info.header_offset + 30 + name_len + extra_len)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            if dtype.hasobject:
+                raise ValueError(f"Array {name!r} has object dtype and cannot be memory-mapped.")
+            if len(shape) == 0 or 0 in shape:
+                arrays[name] = np.fromfile(f, dtype=dtype, count=int(np.prod(shape))).reshape(shape)
+                continue
+            if f.tell() % dtype.alignment:
+                # Exported before payloads were aligned: a private copy keeps BLAS usable.
+                arrays[name] = np.fromfile(f, dtype=dtype, count=int(np.prod(shape))).reshape(
+                    shape, order="F" if fortran_order else "C")
+                continue
+            arrays[name] = np.memmap(path, dtype=dtype, mode="r", offset=f.tell(), shape=shape,
+                                     order="F" if fortran_order else "C")
+    return arrays
+
+
+def load_arrays(path, mmap=True):
+    if mmap:
+        return _mmap_npz(path)
+    with np.load(path, allow_pickle=False) as data:
+        return {name: data[name] for name in data.files}
+
+
+class CompiledScorer:
+    """
+    Scores raw texts from an exported .npz without importing scikit-learn.
+    Arrays are memory-mapped by default, so processes loading the same file
+    share its pages: uvicorn workers hold one copy of the weights between
+    them in the page cache instead of one each.
+    """
+
+    def __init__(self, arrays, path=None):
+        version = int(arrays["format_version"])
+        if version not in _READABLE_VERSIONS:
+            raise ValueError(f"Unsupported compiled model version {version} (expected {FORMAT_VERSION}).")
+        self.path = path
+        self.kind = str(arrays["kind"])
+        self.terms = arrays["terms"]
+        self.projection = arrays["projection"]
+        self.support_vectors = arrays["support_vectors"]
+        self.dual_coef = arrays["dual_coef"]
+        self.intercept = float(arrays["intercept"])
+        self.gamma = float(arrays["gamma"])
+        self.threshold = float(arrays["threshold"])
+        self._sv_sq_norms = arrays.get("sv_sq_norms")
+        if self._sv_sq_norms is None:  # exported before the norms were stored
+            self._sv_sq_norms = np.einsum("ij,ij->i", self.support_vectors, self.support_vectors)
+        # Token lookups go through a dict built once per load; it is faster from
+        # Python than probing a hash table stored in the file.
+        self._term_index = {term: index for index, term in enumerate(self.terms.tolist())}
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        return cls(load_arrays(path, mmap=mmap), path=path)
+
+    def __getitem__(self, key):
+        # Lets code written against pickled bundles read the threshold.
+        if key == "threshold":
+            return self.threshold
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def lookup(self, term):
+        return self._term_index.get(term, -1)
+
+    def counts(self, texts):
+        """Term counts as a sparse CSR matrix, one row per text."""
+        import scipy.sparse as sp
+
+        get = self._term_index.get
+        indices, indptr = [], [0]
+        for text in texts:
+            indices.extend(index for index in map(get, TOKEN_PATTERN.findall(text.lower())) if index is not None)
+            indptr.append(len(indices))
+        X = sp.csr_matrix((np.ones(len(indices)), np.array(indices, dtype=np.int32), np.array(indptr)),
+                          shape=(len(texts), len(self.terms)))
+        X.sum_duplicates()
+        return X
+
+    def project(self, X):
+        # Folded TF-IDF weighting + SVD, then the final L2 normalization.
+        Z = np.asarray(X @ self.projection)
+        norms = np.linalg.norm(Z, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return Z / norms
+
+    def features(self, texts):
+        return self.project(self.counts(texts))
+
+    def decision_function(self, Z):
+        sq_dist = (np.einsum("ij,ij->i", Z, Z)[:, None] + self._sv_sq_norms[None, :]
+                   - 2 * Z @ self.support_vectors.T)
+        np.maximum(sq_dist, 0, out=sq_dist)
+        return np.exp(-self.gamma * sq_dist) @ self.dual_coef + self.intercept
+
+    def score_texts(self, texts):
+        return self.decision_function(self.features(texts))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python compiled.py <model.pkl> <output.npz>")
+        sys.exit(1)
+    from model_cache import load_bundle
+    export_bundle(load_bundle(sys.argv[1]), sys.argv[2])
+    print(f" Saved compiled model to {sys.argv[2]}")
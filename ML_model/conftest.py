@@ -0,0 +1,66 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+
+class ArticleHandler(BaseHTTPRequestHandler):
+    # Shared across requests; reset by the fixture.
+    state = {}
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        state = self.state
+        with state["lock"]:
+            state["in_flight"] += 1
+            state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+            state["hits"][self.path] = state["hits"].get(self.path, 0) + 1
+            hits = state["hits"][self.path]
+        try:
+            if self.path.startswith("/flaky") and hits < 3:
+                self.send_response(503)
+                self.end_headers()
+                return
+            if self.path.startswith("/redirect"):
+                self.send_response(302)
+                self.send_header("Location", "http://169.254.169.254/latest/meta-data/")
+                self.end_headers()
+                return
+            if self.path.startswith("/missing"):
+                self.send_response(404)
+                self.end_headers()
+                return
+            if self.path.startswith("/etag"):
+                if self.headers.get("If-None-Match") == '"v1"':
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+            if self.path.startswith("/slow"):
+                time.sleep(0.3)
+            else:
+                time.sleep(0.05)
+            name = self.path.strip("/")
+            body = f"<html><head><title>{name}</title></head><body><p>Article {name} body</p></body></html>"
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html")
+            if self.path.startswith("/etag"):
+                self.send_header("ETag", '"v1"')
+            self.end_headers()
+            self.wfile.write(body.encode())
+        finally:
+            with state["lock"]:
+                state["in_flight"] -= 1
+
+
+@pytest.fixture
+def server():
+    ArticleHandler.state = {"lock": threading.Lock(), "in_flight": 0, "max_in_flight": 0, "hits": {}}
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), ArticleHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}", ArticleHandler.state
+    httpd.shutdown()
+    httpd.server_close()
@@ -0,0 +1,233 @@
+import os
+import string
+
+import numpy as np
+
+# Estimated Jaccard similarity of word shingles above which two articles
+# count as copies of the same story.
+DEDUP_THRESHOLD = float(os.environ.get("DEDUP_THRESHOLD", 0.7))
+# 64 MinHash values in 16 LSH bands of 4: a pair with similarity s becomes a
+# candidate with probability 1 - (1 - s^4)^16, about 0.988 at the 0.7
+# threshold and > 0.999 from 0.8 up (lightly edited copies are well above
+# that), against 0.64 at 0.5 and 0.12 at 0.3. Candidates are then checked
+# against the threshold on the full signatures.
+NUM_PERM = 64
+BANDS = 16
+SHINGLE_SIZE = 3
+# Index entries held in dicts before they are merged into sorted arrays.
+FREEZE_EVERY = 50000
+
+_MAX_TOKEN_CHARS = 32
+_WORD_BYTES = np.zeros(256, dtype=bool)
+_WORD_BYTES[[ord(c) for c in string.ascii_lowercase + string.ascii_uppercase + string.digits + "_"]] = True
+_WORD_BYTES[128:] = True
+
+
+class MinHasher:
+    """
+    MinHash signatures of word shingles. Everything after lowercasing is
+    vectorized with numpy: tokens are hashed straight from the UTF-8
+    bytes, combined into shingles and permuted by multiply-shift hashing,
+    all in uint64 arithmetic that wraps.
+    """
+
+    def __init__(self, num_perm=NUM_PERM, shingle_size=SHINGLE_SIZE, seed=0):
+        rng = np.random.default_rng(seed)
+        odd = lambda n: rng.integers(1, 2 ** 63, size=n, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self._char_mult = odd(_MAX_TOKEN_CHARS)
+        self._position_mult = odd(shingle_size)
+        self._a = odd(num_perm)
+        self._b = rng.integers(0, 2 ** 63, size=num_perm, dtype=np.uint64)
+
+    def token_hashes(self, text):
+        # Runs of 2+ word bytes are tokens (ASCII letters, digits, "_" and any
+        # non-ASCII byte), hashed as sum(byte * multiplier[position]) without
+        # building a Python string per token.
+        data = np.frombuffer(text.lower().encode("utf-8"), dtype=np.uint8)
+        word = _WORD_BYTES[data]
+        edges = np.flatnonzero(np.diff(np.concatenate(([False], word, [False])).view(np.int8)))
+        starts, ends = edges[::2], edges[1::2]
+        if not starts.size:
+            return np.empty(0, dtype=np.uint64)
+        run_start = np.zeros(len(data), dtype=np.int64)
+        run_start[starts] = starts
+        positions = np.arange(len(data)) - np.maximum.accumulate(run_start)
+        contrib = data.astype(np.uint64) * self._char_mult[np.minimum(positions, _MAX_TOKEN_CHARS - 1)]
+        contrib[~word] = 0
+        hashes = np.add.reduceat(contrib, starts)
+        return hashes[ends - starts >= 2]
+
+    def shingles(self, text):
+        token_hashes = self.token_hashes(text)
+        if not token_hashes.size:
+            return token_hashes
+        k = min(self.shingle_size, len(token_hashes))
+        m = len(token_hashes) - k + 1
+        shingles = np.zeros(m, dtype=np.uint64)
+        for j in range(k):
+            shingles += token_hashes[j:j + m] * self._position_mult[j]
+        return shingles
+
+    def signature(self, text):
+        """uint32[num_perm], or None for texts without any words."""
+        shingles = self.shingles(text)
+        if shingles.size == 0:
+            return None
+        hashed = np.multiply.outer(self._a, shingles)
+        hashed += self._b[:, None]
+        hashed >>= np.uint64(32)
+        return hashed.min(axis=1).astype(np.uint32)
+
+
+class NearDuplicateIndex:
+    """
+    MinHash/LSH index of documents for near-duplicate detection. add()
+    indexes a text unless it nearly duplicates one already indexed, so
+    feeding a corpus through it keeps one copy of each story. lookup()
+    only queries, for flagging already-seen stories at predict time.
+
+    LSH band keys go to per-band dicts as they arrive and are merged into
+    sorted numpy arrays every FREEZE_EVERY documents, which keeps large
+    indexes compact. Candidates are confirmed by signature agreement.
+    """
+
+    def __init__(self, threshold=DEDUP_THRESHOLD, num_perm=NUM_PERM, bands=BANDS, shingle_size=SHINGLE_SIZE, seed=0):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands.")
+        self.threshold = threshold
+        self.bands = bands
+        self.seed = seed
+        self.hasher = MinHasher(num_perm, shingle_size, seed)
+        self._row_mult = np.random.default_rng(seed + 1).integers(
+            1, 2 ** 63, size=num_perm // bands, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+        self._signatures = np.empty((0, num_perm), dtype=np.uint32)
+        self._n = 0
+        self.labels = []
+        self._frozen = [(np.empty(0, dtype=np.uint64), np.empty(0, dtype=np.int64)) for _ in range(bands)]
+        self._delta = [{} for _ in range(bands)]
+
+    def __len__(self):
+        return self._n
+
+    def _band_keys(self, signature):
+        # Kept as uint64 scalars: a Python int above 2**63 would make
+        # searchsorted convert the whole frozen array on every call.
+        rows = signature.reshape(self.bands, -1).astype(np.uint64)
+        return list((rows * self._row_mult).sum(axis=1, dtype=np.uint64))
+
+    def _match(self, signature, keys):
+        candidates = set()
+        for band, key in enumerate(keys):
+            frozen_keys, frozen_ids = self._frozen[band]
+            if len(frozen_keys):
+                lo = frozen_keys.searchsorted(key, "left")
+                hi = frozen_keys.searchsorted(key, "right")
+                candidates.update(frozen_ids[lo:hi].tolist())
+            doc_id = self._delta[band].get(key)
+            if doc_id is not None:
+                candidates.add(doc_id)
+        if not candidates:
+            return None
+        ids = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        similarity = (self._signatures[ids] == signature).mean(axis=1)
+        best = int(similarity.argmax())
+        if similarity[best] < self.threshold:
+            return None
+        return int(ids[best]), float(similarity[best])
+
+    def lookup(self, text):
+        """(doc id, estimated similarity) of the closest indexed near-duplicate, or None."""
+        signature = self.hasher.signature(text)
+        if signature is None or self._n == 0:
+            return None
+        return self._match(signature, self._band_keys(signature))
+
+    def add(self, text, label=None):
+        """
+        Indexes text unless it nearly duplicates an indexed document, in
+        which case that match is returned as (doc id, similarity). Returns
+        None when the text was added (or has no words to compare).
+        """
+        signature = self.hasher.signature(text)
+        if signature is None:
+            return None
+        keys = self._band_keys(signature)
+        match = self._match(signature, keys) if self._n else None
+        if match is not None:
+            return match
+
+        if self._n == len(self._signatures):
+            grown = np.empty((max(1024, 2 * self._n), self._signatures.shape[1]), dtype=np.uint32)
+            grown[:self._n] = self._signatures[:self._n]
+            self._signatures = grown
+        doc_id = self._n
+        self._signatures[doc_id] = signature
+        self._n += 1
+        self.labels.append(label)
+        for band, key in enumerate(keys):
+            self._delta[band].setdefault(key, doc_id)
+        if len(self._delta[0]) >= FREEZE_EVERY:
+            self._freeze()
+        return None
+
+    def label(self, doc_id):
+        return self.labels[doc_id]
+
+    def _freeze(self):
+        for band, delta in enumerate(self._delta):
+            if not delta:
+                continue
+            keys = np.concatenate([self._frozen[band][0], np.fromiter(delta.keys(), dtype=np.uint64, count=len(delta))])
+            ids = np.concatenate([self._frozen[band][1], np.fromiter(delta.values(), dtype=np.int64, count=len(delta))])
+            order = keys.argsort(kind="stable")
+            self._frozen[band] = (keys[order], ids[order])
+            self._delta[band] = {}
+
+    def nbytes(self):
+        self._freeze()
+        return (self._signatures[:self._n].nbytes + sum(k.nbytes + i.nbytes for k, i in self._frozen))
+
+    def save(self, path):
+        """Writes the index as an aligned .npz, so it can be memory-mapped back."""
+        from compiled import write_aligned_npz
+
+        self._freeze()
+        labels = ["" if label is None else str(label) for label in self.labels]
+        encoded = [label.encode("utf-8") for label in labels]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(label) for label in encoded], out=offsets[1:])
+        band_sizes = np.array([len(keys) for keys, _ in self._frozen], dtype=np.int64)
+        write_aligned_npz(path, {
+            "params": np.array([self.threshold, self.hasher.num_perm, self.bands, self.hasher.shingle_size,
+                                self.seed], dtype=np.float64),
+            "signatures": self._signatures[:self._n],
+            "band_sizes": band_sizes,
+            "band_keys": np.concatenate([keys for keys, _ in self._frozen]),
+            "band_ids": np.concatenate([ids for _, ids in self._frozen]),
+            "labels": np.frombuffer(b"".join(encoded), dtype=np.uint8),
+            "label_offsets": offsets,
+        })
+        return path
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        from compiled import load_arrays
+
+        arrays = load_arrays(path, mmap=mmap)
+        threshold, num_perm, bands, shingle_size, seed = arrays["params"].tolist()
+        index = cls(threshold, int(num_perm), int(bands), int(shingle_size), int(seed))
+        index._signatures = arrays["signatures"]
+        index._n = len(index._signatures)
+        ends = np.cumsum(arrays["band_sizes"])
+        starts = ends - arrays["band_sizes"]
+        index._frozen = [(arrays["band_keys"][s:e], arrays["band_ids"][s:e]) for s, e in zip(starts, ends)]
+        blob, offsets = bytes(arrays["labels"]), arrays["label_offsets"].tolist()
+        index.labels = [blob[offsets[i]:offsets[i + 1]].decode("utf-8") or None for i in range(index._n)]
+        return index
+
+
+def dedup_path(model_file):
+    # The index is saved next to the model it was built for.
+    return os.path.splitext(model_file)[0] + ".dedup.npz"
@@ -1,59 +1,103 @@
-import zipfile
 import os
-import requests
-from bs4 import BeautifulSoup
-import re 
-from sklearn.feature_extraction.text import TfidfVectorizer
+import time
+import numpy as np
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.model_selection import KFold, ParameterGrid
+from sklearn.metrics import precision_score, recall_score, f1_score
 
+from models import get_model
 
-def extract_urls(zip_path, extract_dir="temp_urls"):
-    os.makedirs(extract_dir, exist_ok=True)
-    urls = []
-    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-        zip_ref.extractall(extract_dir)
+# Parallel workers for fold fitting (-1 = all cores).
+CV_JOBS = int(os.environ.get("CV_JOBS", -1))
 
-    for file in os.listdir(extract_dir):
-        with open(os.path.join(extract_dir, file), 'r') as f:
-            urls.extend([line.strip() for line in f if line.strip()])
-    return urls
+# Threshold offsets (in standard deviations below the mean training score) and
+# hyperparameters tried by calibrate() when none are given.
+DEFAULT_ALPHAS = [0, 1, 2, 3, 4, 6, 8]
+DEFAULT_PARAM_GRIDS = {
+    "svm": {"nu": [0.1, 0.3, 0.5], "gamma": ["scale", 0.5, 2.0]},
+    "iforest": {"contamination": [0.1, 0.3, "auto"]},
+}
 
 
-def clean_text(text):
-
-    text = re.sub(r'\s+', ' ', text)                      # Collapse multiple spaces
-    text = re.sub(r'[^a-zA-Z0-9.,!?;:()\'" ]', '', text)   # Remove unecessary symbols
-    text = text.strip()
-    return text
-
-
-def scrape_url(url):
-    print(f" Scraping URL: {url}")
-    headers = {
-        'User-Agent': 'Mozilla/5.0'
-                      'Chrome/119.0.0.0'
-    }
-
+def _decision_scores(model, X):
     try:
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        title = soup.title.string.strip()
-        print(f" Scraped: {title}")
-
-        text = soup.get_text(separator=' ', strip=True)
-        return clean_text(text)
-
-    except Exception as e:
-        print(f" Failed to scrape {url}: {e}")
-        return ""
-
-
-def scrape_urls(urls):
-    return [scrape_url(url) for url in urls]
+        return model.decision_function(X)
+    except AttributeError:
+        return model.score_samples(X)
+
+def _fit_and_score(model, X, train_idx, test_idx):
+    # Fits a fresh copy so folds can run in parallel without sharing state.
+    start = time.perf_counter()
+    fitted = clone(model).fit(X[train_idx])
+    scores = _decision_scores(fitted, X[test_idx])
+    return scores, time.perf_counter() - start
+
+def _fold_metrics(y_test, scores, threshold):
+    preds = np.where(scores >= threshold, 1, 0)
+    return {
+        "precision": precision_score(y_test, preds, zero_division=0),
+        "recall": recall_score(y_test, preds, zero_division=0),
+        "f1": f1_score(y_test, preds, zero_division=0)
+    }
 
 
-def encode_texts(texts):
-    vectorizer = TfidfVectorizer(max_features=5000)
-    X = vectorizer.fit_transform(texts)
-    return X, vectorizer
\ No newline at end of file
+# --- Evaluation Function Using a Provided Threshold ---
+def evaluate_model(X, y_true, model, k=5, threshold=0, n_jobs=CV_JOBS):
+    kf = KFold(n_splits=k, shuffle=True, random_state=42)
+    splits = list(kf.split(X))
+    outputs = Parallel(n_jobs=n_jobs)(
+        delayed(_fit_and_score)(model, X, train_idx, test_idx) for train_idx, test_idx in splits
+    )
+    return [_fold_metrics(y_true[test_idx], scores, threshold)
+            for (_, test_idx), (scores, _) in zip(splits, outputs)]
+
+
+# --- Threshold and Hyperparameter Calibration ---
+def calibrate(X, y_true, model_type='svm', alphas=None, param_grid=None, k=5, n_jobs=CV_JOBS):
+    """
+    Sweeps hyperparameter configurations and threshold alphas over an already
+    computed feature matrix. Every full fit and fold fit for every configuration
+    runs in one parallel batch; thresholds are then applied to the cached scores,
+    so each alpha costs no extra fitting. Returns one row per (config, alpha).
+    """
+    alphas = DEFAULT_ALPHAS if alphas is None else alphas
+    if param_grid is None:
+        param_grid = DEFAULT_PARAM_GRIDS.get(model_type, {})
+    configs = list(ParameterGrid(param_grid))
+    splits = list(KFold(n_splits=k, shuffle=True, random_state=42).split(X))
+    all_idx = np.arange(X.shape[0])
+
+    # Task 0 of each config is the full fit (scored on the training data itself).
+    tasks = []
+    for params in configs:
+        model = get_model(model_type, **params)
+        tasks.append((model, all_idx, all_idx))
+        tasks.extend((model, train_idx, test_idx) for train_idx, test_idx in splits)
+    outputs = Parallel(n_jobs=n_jobs)(
+        delayed(_fit_and_score)(model, X, train_idx, test_idx) for model, train_idx, test_idx in tasks
+    )
+
+    table = []
+    per_config = k + 1
+    for i, params in enumerate(configs):
+        config_outputs = outputs[i * per_config:(i + 1) * per_config]
+        training_scores, full_fit_seconds = config_outputs[0]
+        fold_outputs = config_outputs[1:]
+        fold_seconds = [seconds for _, seconds in fold_outputs]
+        for alpha in alphas:
+            threshold = np.mean(training_scores) - alpha * np.std(training_scores)
+            folds = [_fold_metrics(y_true[test_idx], scores, threshold)
+                     for (_, test_idx), (scores, _) in zip(splits, fold_outputs)]
+            table.append({
+                "model_type": model_type,
+                "params": params,
+                "alpha": alpha,
+                "threshold": float(threshold),
+                "precision": float(np.mean([f["precision"] for f in folds])),
+                "recall": float(np.mean([f["recall"] for f in folds])),
+                "f1": float(np.mean([f["f1"] for f in folds])),
+                "full_fit_seconds": full_fit_seconds,
+                "mean_fold_seconds": float(np.mean(fold_seconds)),
+            })
+    return table
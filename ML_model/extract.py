@@ -0,0 +1,137 @@
+import os
+import re
+from html.parser import HTMLParser
+
+# Engine used by scrape_url: "content" (default), "fast" or "bs4" (legacy).
+EXTRACT_ENGINE = os.environ.get("EXTRACT_ENGINE", "content")
+
+# Subtrees that never contribute text; bs4's get_text skips these as well.
+SKIP_TAGS = {"script", "style"}
+# Page chrome and non-prose markup dropped by the content engine.
+BOILERPLATE_TAGS = {"nav", "header", "footer", "aside", "form", "button", "select", "iframe",
+                    "noscript", "template", "svg"}
+# Elements whose text is taken as the main content when a page has them.
+CONTENT_TAGS = {"article", "main"}
+
+_ALLOWED = set("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789.,!?;:()'\" ")
+
+
+def clean_text(text):
+
+    text = re.sub(r'\s+', ' ', text)                      # Collapse multiple spaces
+    text = re.sub(r'[^a-zA-Z0-9.,!?;:()\'" ]', '', text)   # Remove unecessary symbols
+    text = text.strip()
+    return text
+
+
+class _CleanTable(dict):
+    # str.translate table built lazily per code point: whitespace becomes a
+    # space and anything clean_text would strip maps to None (deleted).
+    def __missing__(self, codepoint):
+        ch = chr(codepoint)
+        value = " " if ch.isspace() else (ch if ch in _ALLOWED else None)
+        self[codepoint] = value
+        return value
+
+_CLEAN_TABLE = _CleanTable()
+
+
+def clean_chunks(chunks):
+    """
+    Joins text chunks and applies clean_text's filtering in a single
+    translate pass. Tokens come out identical; runs of spaces left behind
+    by removed symbols are collapsed as well.
+    """
+    return " ".join(" ".join(chunks).translate(_CLEAN_TABLE).split())
+
+
+class _TextExtractor(HTMLParser):
+    """Streaming tokenizer that keeps text outside skipped subtrees."""
+
+    def __init__(self, skip_tags, content_tags=()):
+        super().__init__(convert_charrefs=True)
+        self.skip_tags = skip_tags
+        self.content_tags = content_tags
+        self.title = []
+        self.chunks = []
+        self.content_chunks = []
+        self._skip_depth = 0
+        self._content_depth = 0
+        self._in_title = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "title":
+            self._in_title = True
+        elif tag in self.skip_tags:
+            self._skip_depth += 1
+        elif tag in self.content_tags:
+            self._content_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+        elif tag in self.skip_tags:
+            if self._skip_depth:
+                self._skip_depth -= 1
+        elif tag in self.content_tags:
+            if self._content_depth:
+                self._content_depth -= 1
+
+    def handle_startendtag(self, tag, attrs):
+        # Self-closing tags (<br/>, <img/>) never open a subtree.
+        pass
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title.append(data)
+        elif not self._skip_depth:
+            self.chunks.append(data)
+            if self._content_depth:
+                self.content_chunks.append(data)
+
+
+def _parse(html, skip_tags, content_tags=()):
+    parser = _TextExtractor(skip_tags, content_tags)
+    parser.feed(html)
+    parser.close()
+    return parser
+
+
+def extract_fast(html):
+    # Same text as the bs4 engine (title plus all visible text), without building a DOM.
+    parser = _parse(html, SKIP_TAGS)
+    return clean_chunks(parser.title + parser.chunks)
+
+
+def extract_content(html):
+    """
+    Main-content extraction: navigation, headers, footers, sidebars and
+    forms are dropped, and if the page marks up an <article> or <main>
+    only the text inside it is kept (after the title).
+    """
+    parser = _parse(html, SKIP_TAGS | BOILERPLATE_TAGS, CONTENT_TAGS)
+    chunks = parser.content_chunks or parser.chunks
+    return clean_chunks(parser.title + chunks)
+
+
+def extract_bs4(html):
+    # Legacy path: full DOM with html.parser, get_text, then clean_text.
+    from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    soup.title.string.strip()  # pages without a <title> were always rejected here
+    return clean_text(soup.get_text(separator=' ', strip=True))
+
+
+ENGINES = {
+    "content": extract_content,
+    "fast": extract_fast,
+    "bs4": extract_bs4,
+}
+
+
+def extract_text(html, engine=None):
+    engine = engine or EXTRACT_ENGINE
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown extraction engine: {engine}")
+    return ENGINES[engine](html)
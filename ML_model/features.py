@@ -0,0 +1,83 @@
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer, TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+
+def encode_texts(texts, max_features=5000):
+    vectorizer = TfidfVectorizer(max_features=max_features, stop_words='english', lowercase=True)
+    X = vectorizer.fit_transform(texts)
+    return X, vectorizer
+
+def encode_texts_with_selected_terms(texts, top_terms):
+    vectorizer = TfidfVectorizer(vocabulary=top_terms, lowercase=True)
+    X = vectorizer.fit_transform(texts)
+    return X, vectorizer
+
+def term_means(X_tfidf):
+    return np.asarray(X_tfidf.mean(axis=0)).ravel()
+
+def top_term_indices(X_tfidf, n_terms=100, means=None):
+    # Same order as means.argsort()[::-1][:n_terms], where the higher index
+    # wins a tie, but only the top n get sorted: np.partition finds the n-th
+    # largest mean in linear time, and ties at that boundary go to the
+    # highest indices so the cut is deterministic.
+    means = term_means(X_tfidf) if means is None else means
+    n_terms = min(n_terms, len(means))
+    if n_terms <= 0:
+        return np.empty(0, dtype=np.intp)
+    boundary = np.partition(means, len(means) - n_terms)[len(means) - n_terms]
+    above = np.flatnonzero(means > boundary)
+    tied = np.flatnonzero(means == boundary)[::-1][:n_terms - len(above)]
+    top = np.concatenate([above, tied])
+    return top[np.lexsort((-top, -means[top]))]
+
+def select_terms(X_tfidf, vectorizer, n_terms=300):
+    """
+    Derives the top-term TF-IDF matrix from an already fitted full matrix.
+
+    Document frequencies (and so IDF weights) of the kept terms don't depend
+    on the rest of the vocabulary, so slicing their columns and L2-normalizing
+    each row again gives the same matrix as refitting a vectorizer restricted
+    to those terms, without tokenizing the corpus a second time.
+    """
+    top_indices = top_term_indices(X_tfidf, n_terms)
+    terms = vectorizer.get_feature_names_out()
+    top_terms = [terms[i] for i in top_indices]
+
+    X = normalize(X_tfidf[:, top_indices], norm='l2')
+    return X, selected_vectorizer(top_terms, vectorizer.idf_[top_indices]), top_terms
+
+def selected_vectorizer(terms, idf):
+    # Inference-time transformer equivalent to encode_texts_with_selected_terms.
+    vectorizer = TfidfVectorizer(vocabulary=list(terms), lowercase=True)
+    vectorizer.idf_ = np.asarray(idf)
+    return vectorizer
+
+def count_terms(texts, max_features=5000):
+    # Accepts any iterable, so a stream of scraped texts is tokenized as it arrives.
+    counter = CountVectorizer(max_features=max_features, stop_words='english', lowercase=True)
+    counts = counter.fit_transform(texts)
+    return counts, counter
+
+def features_from_counts(counts, counter, n_terms=300, return_counts=False):
+    # CountVectorizer + TfidfTransformer is exactly what encode_texts' TfidfVectorizer does.
+    tfidf = TfidfTransformer().fit(counts)
+    X_raw = tfidf.transform(counts)
+
+    top_indices = top_term_indices(X_raw, n_terms)
+    terms = counter.get_feature_names_out()
+    top_terms = [terms[i] for i in top_indices]
+    X = normalize(X_raw[:, top_indices], norm='l2')
+    vectorizer = selected_vectorizer(top_terms, tfidf.idf_[top_indices])
+    if return_counts:
+        return X, vectorizer, top_terms, counts[:, top_indices].tocsr()
+    return X, vectorizer, top_terms
+
+def fit_features(texts, max_features=5000, n_terms=300, return_counts=False):
+    """
+    Single tokenization pass: fit the full vocabulary once, then slice out the
+    top terms. With return_counts=True the raw term counts of the kept terms
+    are returned too, so the corpus can later be re-weighted without the texts.
+    """
+    counts, counter = count_terms(texts, max_features)
+    return features_from_counts(counts, counter, n_terms, return_counts)
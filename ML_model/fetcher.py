@@ -0,0 +1,116 @@
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0'
+                  'Chrome/119.0.0.0'
+}
+
+# Status codes worth retrying; everything else in 4xx fails immediately.
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class GuardedSession(requests.Session):
+    """
+    Session that passes every outgoing URL through guard(url) before
+    connecting. Redirects are followed through send() too, so each hop is
+    checked, not just the URL first requested.
+    """
+
+    def __init__(self, guard):
+        super().__init__()
+        self.guard = guard
+
+    def send(self, request, **kwargs):
+        self.guard(request.url)
+        return super().send(request, **kwargs)
+
+
+class Fetcher:
+    """
+    Concurrent HTTP fetcher backed by one pooled requests.Session.
+    Global parallelism is bounded by max_workers and each host by per_host;
+    transient failures are retried with exponential backoff. An optional
+    guard(url) may raise to refuse a URL (or a redirect to one).
+    """
+
+    def __init__(self, max_workers=16, per_host=4, retries=2, backoff=0.5, timeout=10, headers=None, guard=None):
+        self.max_workers = max(1, max_workers)
+        self.per_host = max(1, per_host)
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self.timeout = timeout
+
+        self.session = GuardedSession(guard) if guard is not None else requests.Session()
+        self.session.headers.update(headers or DEFAULT_HEADERS)
+        adapter = HTTPAdapter(pool_connections=self.max_workers, pool_maxsize=self.max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._host_slots = defaultdict(lambda: threading.BoundedSemaphore(self.per_host))
+        self._host_lock = threading.Lock()
+
+    def _slot(self, url):
+        host = urlsplit(url).netloc.lower()
+        with self._host_lock:
+            return self._host_slots[host]
+
+    def _sleep_before_retry(self, attempt):
+        delay = self.backoff * (2 ** attempt)
+        time.sleep(delay + random.uniform(0, delay / 2))
+
+    def get(self, url, headers=None):
+        last_error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self._sleep_before_retry(attempt - 1)
+            try:
+                with self._slot(url):
+                    response = self.session.get(url, headers=headers, timeout=self.timeout)
+                if response.status_code in RETRY_STATUSES and attempt < self.retries:
+                    last_error = requests.HTTPError(f"{response.status_code} for url: {url}", response=response)
+                    continue
+                return response
+            except (requests.ConnectionError, requests.Timeout) as e:
+                last_error = e
+        raise last_error
+
+    def imap(self, fn, urls, max_in_flight=None):
+        """
+        Lazily applies fn(url) across urls concurrently, yielding results in
+        input order. At most max_in_flight calls (default 4x max_workers) are
+        queued, so a long iterable is consumed only as results are taken.
+        """
+        max_in_flight = max(1, max_in_flight or 4 * self.max_workers)
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            try:
+                for url in urls:
+                    pending.append(executor.submit(fn, url))
+                    if len(pending) >= max_in_flight:
+                        yield pending.popleft().result()
+                while pending:
+                    yield pending.popleft().result()
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def map(self, fn, urls):
+        """Applies fn(url) across urls concurrently, returning results in input order."""
+        return list(self.imap(fn, urls))
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,295 @@
+import copy
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.base import clone
+from sklearn.feature_extraction.text import CountVectorizer
+from sklearn.preprocessing import normalize
+
+from processor import ScrapeStats, iter_urls, scrape_urls
+from page_cache import PageCache, PAGE_CACHE_DIR
+from features import encode_texts, selected_vectorizer, top_term_indices
+from training import MODEL_DIR, StageClock, normalize_vectors, save_bundle
+from model_cache import load_bundle
+from dedup import NearDuplicateIndex, dedup_path
+from visualizations import plot_stats
+
+# A full rebuild is recommended once any of these limits is crossed.
+MAX_OOV_RATE = 0.6              # share of new (non stop word) tokens outside the vocabulary
+MAX_ENERGY_DROP = 0.15          # drop in TF-IDF energy captured by the SVD subspace
+MIN_SUBSPACE_OVERLAP = 0.8      # mean squared cosine between old and new SVD subspaces
+MAX_DELTA_FRACTION = 0.5        # new documents relative to the stored corpus
+
+VOCABULARY_MODES = ("fixed", "extend")
+
+
+def _idf(counts):
+    # Same smoothed IDF as TfidfTransformer's defaults.
+    n_docs = counts.shape[0]
+    df = np.asarray((counts > 0).sum(axis=0)).ravel()
+    return np.log((1 + n_docs) / (1 + df)) + 1
+
+
+def _tfidf(counts, idf):
+    return normalize(sp.csr_matrix(counts.multiply(idf[None, :])), norm='l2')
+
+
+def _captured_energy(X, components):
+    total = X.multiply(X).sum()
+    if total == 0:
+        return 0.0
+    projected = X @ components.T
+    return float(np.sum(projected ** 2) / total)
+
+
+def _oov_rate(texts, terms):
+    analyzer = CountVectorizer(stop_words='english', lowercase=True).build_analyzer()
+    vocabulary = set(terms)
+    total = known = 0
+    for text in texts:
+        tokens = analyzer(text)
+        total += len(tokens)
+        known += sum(1 for token in tokens if token in vocabulary)
+    return 1.0 - known / total if total else 0.0
+
+
+def _extend_terms(new_texts, terms, n_new_terms):
+    # Top TF-IDF terms of the delta that the current vocabulary lacks.
+    if not any(new_texts) or n_new_terms <= 0:
+        return []
+    X_new, vectorizer_new = encode_texts(new_texts)
+    known = set(terms)
+    candidates = vectorizer_new.get_feature_names_out()
+    indices = top_term_indices(X_new, X_new.shape[1])
+    return [candidates[i] for i in indices if candidates[i] not in known][:n_new_terms]
+
+
+def update_bundle(bundle, new_texts, vocabulary="fixed", n_new_terms=50):
+    """
+    Folds new documents into a trained bundle without revisiting the old ones.
+
+    The stored raw term counts are extended with the new documents' counts,
+    so IDF weights are recomputed exactly over the whole corpus. The SVD
+    basis is updated from a k-row factor of the old documents plus the new
+    rows (a Brand-style low-rank update) instead of refactorizing the full
+    matrix, and the detector is refitted on the re-projected stored features.
+
+    The update is approximate: the old documents, reweighted with the new
+    IDF, enter only through their projection onto the old k-dimensional
+    basis, so whatever of them falls outside it is lost. It matches a fresh
+    TruncatedSVD of the whole matrix when that residual is small; the drift
+    report flags when it no longer is.
+
+    vocabulary="extend" appends up to n_new_terms frequent new terms. Old
+    documents count as zero for those terms because their text isn't kept.
+    """
+    if "counts" not in bundle:
+        raise ValueError("Model has no stored feature matrix; run a full retrain first.")
+    if vocabulary not in VOCABULARY_MODES:
+        raise ValueError(f"Unsupported vocabulary mode: {vocabulary}")
+
+    terms = list(bundle["top_terms"])
+    old_counts = sp.csr_matrix(bundle["counts"])
+    svd = bundle["svd"]
+    old_components = svd.components_
+
+    added_terms = _extend_terms(new_texts, terms, n_new_terms) if vocabulary == "extend" else []
+    terms = terms + added_terms
+    if added_terms:
+        old_counts = sp.hstack([old_counts, sp.csr_matrix((old_counts.shape[0], len(added_terms)))]).tocsr()
+        old_components = np.hstack([old_components, np.zeros((old_components.shape[0], len(added_terms)))])
+
+    new_counts = CountVectorizer(vocabulary=terms, lowercase=True).transform(new_texts)
+    counts = sp.vstack([old_counts, new_counts]).tocsr()
+    idf = _idf(counts)
+    X_all = _tfidf(counts, idf)
+    X_old, X_new = X_all[:old_counts.shape[0]], X_all[old_counts.shape[0]:]
+
+    # Low-rank update: stack a k-row factor of the old documents with the new
+    # rows and re-factorize. S * V summarizes the old rows as weighted with
+    # the old IDF, so the factor is rebuilt from the old rows as weighted
+    # (and L2-normalized) with the new IDF, projected onto the old basis:
+    # F = L^1/2 W^T V, where W L W^T is the eigendecomposition of B^T B and
+    # B = X_old V^T, so that F^T F = (X_old V^T V)^T (X_old V^T V).
+    k = old_components.shape[0]
+    B = np.asarray(X_old @ old_components.T)
+    eigenvalues, W = np.linalg.eigh(B.T @ B)
+    old_factor = np.sqrt(np.clip(eigenvalues, 0, None))[:, None] * (W.T @ old_components)
+    stacked = np.vstack([old_factor, X_new.toarray()])
+    _, singular_values, vt = np.linalg.svd(stacked, full_matrices=False)
+    new_svd = copy.deepcopy(svd)
+    new_svd.components_ = vt[:k]
+    new_svd.singular_values_ = singular_values[:k]
+    new_svd.n_features_in_ = len(terms)
+
+    X_final = normalize_vectors(X_all @ new_svd.components_.T)
+    model = clone(bundle["model"]).fit(X_final)
+    training_scores = model.decision_function(X_final)
+    alpha = bundle.get("alpha", 6)
+    threshold = np.mean(training_scores) - alpha * np.std(training_scores)
+
+    old_energy = _captured_energy(X_old, old_components)
+    new_energy = _captured_energy(X_new, old_components)
+    overlap = float(np.sum((old_components @ new_svd.components_.T) ** 2) / k)
+    drift = {
+        "oov_rate": _oov_rate(new_texts, bundle["top_terms"]),
+        "energy_captured_old_docs": old_energy,
+        "energy_captured_new_docs": new_energy,
+        "subspace_overlap": overlap,
+        "delta_fraction": new_counts.shape[0] / max(1, old_counts.shape[0]),
+        "added_terms": added_terms,
+    }
+    reasons = []
+    if drift["oov_rate"] > MAX_OOV_RATE:
+        reasons.append("many new tokens fall outside the vocabulary")
+    if old_energy - new_energy > MAX_ENERGY_DROP:
+        reasons.append("new documents are poorly represented by the SVD subspace")
+    if overlap < MIN_SUBSPACE_OVERLAP:
+        reasons.append("the SVD subspace rotated substantially")
+    if drift["delta_fraction"] > MAX_DELTA_FRACTION:
+        reasons.append("the delta is large relative to the stored corpus")
+    drift["full_rebuild_recommended"] = bool(reasons)
+    drift["reasons"] = reasons
+
+    updated = dict(bundle)
+    updated.update({
+        "model": model,
+        "vectorizer": selected_vectorizer(terms, idf),
+        "svd": new_svd,
+        "top_terms": terms,
+        "threshold": threshold,
+        "counts": counts,
+        # Incremental updates skip cross-validation, so there are no fold scores to plot.
+        "plot_stats": plot_stats(X_all, terms, training_scores, threshold=threshold),
+    })
+    return updated, drift
+
+
+def _estimate_full_retrain(bundle, n_total, scrape_seconds_per_doc):
+    # Scale the original run's per-document stage costs up to the combined corpus.
+    stats = bundle.get("training_stats") or {}
+    n_original = max(1, stats.get("n_documents", 0))
+    estimate = 0.0
+    for stage, seconds in (stats.get("stage_seconds") or {}).items():
+        if stage == "calibrating":
+            continue
+        if stage == "scraping" and scrape_seconds_per_doc is not None:
+            estimate += scrape_seconds_per_doc * n_total
+        else:
+            estimate += seconds / n_original * n_total
+    return estimate
+
+
+def update_from_zip(zip_path, base_model_file, offline=False, cache_dir=PAGE_CACHE_DIR, model_dir=MODEL_DIR,
+                    vocabulary="fixed", n_new_terms=50, dedup=True, progress=None):
+    """
+    Incremental counterpart of training.train_from_zip: only URLs that aren't
+    already in the base model's corpus are scraped and processed. With
+    dedup, new articles that nearly duplicate the corpus (or each other)
+    are dropped, using the base model's saved MinHash index.
+    """
+    progress = StageClock(progress)
+    start = time.perf_counter()
+
+    progress("extracting")
+    bundle = load_bundle(base_model_file)
+    known_urls = set(bundle.get("urls", [])) | set(bundle.get("duplicate_urls", []))
+    new_urls = [url for url in iter_urls(zip_path) if url not in known_urls]
+    if not new_urls:
+        raise ValueError("No new URLs in the provided ZIP file.")
+
+    progress("scraping", done=0, total=len(new_urls))
+    cache = PageCache(cache_dir) if cache_dir else None
+    scrape_stats = ScrapeStats()
+    texts = scrape_urls(new_urls, cache=cache, offline=offline, stats=scrape_stats,
+                        progress=lambda done, total: progress("scraping", done=done, total=total))
+
+    index = None
+    duplicate_urls = []
+    dedup_seconds = 0.0
+    # "corpus" when new articles were checked against the base model's index,
+    # "batch" when it has none (its texts aren't kept to rebuild one), so only
+    # duplicates within the new articles were found.
+    dedup_scope = None
+    if dedup:
+        dedup_start = time.perf_counter()
+        base_index = dedup_path(base_model_file)
+        if os.path.exists(base_index):
+            # Loaded into memory rather than mapped: new documents get appended.
+            index = NearDuplicateIndex.load(base_index, mmap=False)
+            dedup_scope = "corpus"
+        else:
+            print(f" {base_model_file} has no near-duplicate index; "
+                  "only duplicates among the new articles are dropped")
+            index = NearDuplicateIndex()
+            dedup_scope = "batch"
+        kept_urls, kept_texts = [], []
+        for url, text in zip(new_urls, texts):
+            if index.add(text, url) is None:
+                kept_urls.append(url)
+                kept_texts.append(text)
+            else:
+                duplicate_urls.append(url)
+        new_urls, texts = kept_urls, kept_texts
+        dedup_seconds = time.perf_counter() - dedup_start
+        if not new_urls:
+            raise ValueError("Every new URL nearly duplicates an article the model already has.")
+
+    progress("updating")
+    updated, drift = update_bundle(bundle, texts, vocabulary=vocabulary, n_new_terms=n_new_terms)
+    updated["urls"] = list(bundle.get("urls", [])) + new_urls
+    updated["duplicate_urls"] = list(bundle.get("duplicate_urls", [])) + duplicate_urls
+
+    progress("saving")
+    classifier = bundle.get("classifier", "svm")
+    stage_seconds = progress.stop()
+    n_total = updated["counts"].shape[0]
+    updated["training_stats"] = dict(bundle.get("training_stats") or {}, n_documents=n_total)
+    updated["feature_config"] = dict(bundle.get("feature_config") or {}, n_terms=len(updated["top_terms"]),
+                                     vocabulary=vocabulary)
+    model_filename, compiled_filename = save_bundle(updated, classifier, model_dir)
+    # An index of the new articles alone would make check_duplicate miss the
+    # base corpus, so the new model only gets one if the base model had one.
+    dedup_filename = index.save(dedup_path(model_filename)) if dedup_scope == "corpus" else None
+
+    elapsed = time.perf_counter() - start
+    scrape_per_doc = stage_seconds.get("scraping", 0.0) / len(new_urls)
+    estimated_full = _estimate_full_retrain(bundle, n_total, scrape_per_doc)
+    return {
+        "classifier": classifier,
+        "model_file": model_filename,
+        "compiled_file": compiled_filename,
+        "training_date": datetime.now().isoformat(),
+        "incremental": True,
+        "base_model_file": base_model_file,
+        "n_new_documents": len(new_urls),
+        "n_documents": n_total,
+        "n_duplicates": len(duplicate_urls),
+        "dedup_scope": dedup_scope,
+        "dedup_seconds": dedup_seconds,
+        "dedup_file": dedup_filename,
+        "threshold": float(updated["threshold"]),
+        "stage_seconds": stage_seconds,
+        "seconds": elapsed,
+        "estimated_full_retrain_seconds": estimated_full,
+        "estimated_seconds_saved": max(0.0, estimated_full - elapsed),
+        "drift": drift,
+        "feature_config": updated["feature_config"],
+        "plot_stats": updated["plot_stats"],
+        "scrape_stats": scrape_stats.as_dict(),
+    }
+
+
+def update_job(zip_path, base_model_file, offline=False, vocabulary="fixed", dedup=True, visualize=False,
+               progress=None):
+    # Entry point for background jobs: the uploaded ZIP is ours to clean up.
+    try:
+        result = update_from_zip(zip_path, base_model_file, offline=offline, vocabulary=vocabulary,
+                                 dedup=dedup, progress=progress)
+        return dict(result, visualize=visualize)
+    finally:
+        if os.path.exists(zip_path):
+            os.remove(zip_path)
@@ -0,0 +1,73 @@
+import time
+import numpy as np
+
+# Rows scored per vectorize/SVD/decision pass; bounds peak memory on huge batches.
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def decision_scores(model, X):
+    try:
+        return model.decision_function(X)
+    except AttributeError:
+        return model.score_samples(X)
+
+
+def l2_normalize(X):
+    norms = np.linalg.norm(X, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return X / norms
+
+
+def _lap(timings, stage, start):
+    now = time.perf_counter()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + now - start
+    return now
+
+
+def score_matrix(bundle, texts, timings=None):
+    """
+    Decision scores for texts. If a timings dict is given, seconds spent in
+    the vectorize, svd and score stages are added to it.
+    """
+    start = time.perf_counter()
+    # Compiled artifacts (compiled.CompiledScorer) carry their own scoring path.
+    if hasattr(bundle, "score_texts"):
+        X = bundle.counts(texts)
+        start = _lap(timings, "vectorize", start)
+        Z = bundle.project(X)
+        start = _lap(timings, "svd", start)
+        scores = bundle.decision_function(Z)
+        _lap(timings, "score", start)
+        return scores
+
+    X_text = bundle["vectorizer"].transform(texts)
+    start = _lap(timings, "vectorize", start)
+    X_final = l2_normalize(bundle["svd"].transform(X_text))
+    start = _lap(timings, "svd", start)
+    scores = decision_scores(bundle["model"], X_final)
+    _lap(timings, "score", start)
+    return scores
+
+
+def score_texts(bundle, texts, chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Scores a list of texts in vectorized chunks.
+    Returns (scores, timings) where timings has one entry per chunk,
+    including its per-stage breakdown.
+    """
+    chunk_size = max(1, chunk_size)
+    scores = np.empty(len(texts), dtype=float)
+    timings = []
+    for start in range(0, len(texts), chunk_size):
+        chunk = texts[start:start + chunk_size]
+        stages = {}
+        t0 = time.perf_counter()
+        scores[start:start + len(chunk)] = score_matrix(bundle, chunk, stages)
+        timings.append({"start": start, "size": len(chunk), "seconds": time.perf_counter() - t0,
+                        "stages": stages})
+    return scores, timings
+
+
+def label(score, threshold):
+    return "Crisis Event" if score >= threshold else "Non-Crisis Event"
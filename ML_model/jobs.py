@@ -0,0 +1,251 @@
+import importlib
+import multiprocessing
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+# Progress within a stage is written to the job store at most this often.
+JOB_PROGRESS_INTERVAL = float(os.environ.get("JOB_PROGRESS_INTERVAL", 1.0))
+_UNFINISHED = ("queued", "running")
+
+
+def _resolve(target):
+    # "module:function" targets are imported in the worker, keeping the
+    # caller's process free of the job's dependencies.
+    if isinstance(target, str):
+        module_name, _, attr = target.partition(":")
+        return getattr(importlib.import_module(module_name), attr)
+    return target
+
+
+def _run_job(job_id, events, target, args, kwargs):
+    # Runs inside the worker process; progress travels back over the managed queue.
+    fn = _resolve(target)
+
+    def progress(stage, **info):
+        events.put((job_id, "progress", {"stage": stage, "info": info, "time": time.time()}))
+
+    return fn(*args, progress=progress, **kwargs)
+
+
+class JobManager:
+    """
+    Runs long jobs (training) in a process pool so their CPU work never
+    blocks the API's event loop. Workers report stage progress through a
+    managed queue; a drain thread folds it into per-job records that can
+    be polled while the job runs. With a store (the model registry), the
+    records are also written to its jobs table, so any API worker process
+    can answer for a job another one started.
+    """
+
+    def __init__(self, max_workers=1, on_complete=None, store=None):
+        self.max_workers = max(1, max_workers)
+        self.on_complete = on_complete
+        self.store = store
+        self._jobs = {}
+        self._futures = {}
+        self._job_executors = {}  # job id -> the pool it was submitted to
+        self._saved_at = {}
+        self._lock = threading.Lock()
+        self._executor = None
+        self._manager = None
+        self._events = None
+        self._drain_thread = None
+
+    def _new_executor(self):
+        return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def _start(self):
+        # Spawned lazily so importing the API doesn't fork helper processes.
+        if self._executor is not None:
+            return
+        ctx = multiprocessing.get_context("spawn")
+        self._manager = ctx.Manager()
+        self._events = self._manager.Queue()
+        self._executor = self._new_executor()
+        self._drain_thread = threading.Thread(target=self._drain, args=(self._events,), daemon=True)
+        self._drain_thread.start()
+
+    def _replace_executor(self, broken):
+        # A worker that dies (killed for memory, a crash in native code) breaks
+        # the whole pool: every job in it fails and it refuses new work, so the
+        # next job gets a fresh pool. Called with the lock held.
+        if self._executor is broken:
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._executor = self._new_executor()
+
+    def _save(self, snapshot):
+        if self.store is None:
+            return
+        try:
+            self.store.save_job(snapshot)
+        except Exception:
+            traceback.print_exc()
+        self._saved_at[snapshot["id"]] = time.time()
+
+    def submit(self, target, *args, **kwargs):
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "status": "queued",
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "stage": None,
+            "progress": {},
+            "stages": [],
+            "result": None,
+            "error": None,
+        }
+        # Stored before the job can report progress, so the row always exists.
+        self._save(job)
+        with self._lock:
+            self._start()
+            self._jobs[job_id] = job
+            try:
+                future = self._executor.submit(_run_job, job_id, self._events, target, args, kwargs)
+            except BrokenProcessPool:
+                self._replace_executor(self._executor)
+                future = self._executor.submit(_run_job, job_id, self._events, target, args, kwargs)
+            self._job_executors[job_id] = self._executor
+        future.add_done_callback(lambda f: self._on_done(job_id, f))
+        return job_id
+
+    def _on_done(self, job_id, future):
+        # The worker's progress events were queued before it returned, so pushing
+        # the completion marker through the same queue keeps them in order.
+        with self._lock:
+            self._futures[job_id] = future
+            events = self._events
+        if events is not None:
+            try:
+                events.put((job_id, "done", {"time": time.time()}))
+                return
+            except (EOFError, OSError):
+                pass
+        # No queue to go through (shut down, or the manager process died).
+        self._complete(job_id, time.time())
+
+    def _drain(self, events):
+        while True:
+            try:
+                job_id, kind, payload = events.get()
+            except (EOFError, OSError):
+                return
+            if job_id is None:
+                return
+            if kind == "progress":
+                self._record_progress(job_id, payload)
+            elif kind == "done":
+                self._complete(job_id, payload["time"])
+
+    def _close_stage(self, job, now):
+        if job["stages"] and job["stages"][-1]["finished_at"] is None:
+            stage = job["stages"][-1]
+            stage["finished_at"] = now
+            stage["seconds"] = now - stage["started_at"]
+
+    def _snapshot(self, job):
+        snapshot = dict(job)
+        snapshot["stages"] = [dict(s) for s in job["stages"]]
+        return snapshot
+
+    def _record_progress(self, job_id, payload):
+        stage, info, now = payload["stage"], payload["info"], payload["time"]
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            changed = job["status"] == "queued" or stage != job["stage"]
+            if job["status"] == "queued":
+                job["status"] = "running"
+                job["started_at"] = now
+            if stage != job["stage"]:
+                self._close_stage(job, now)
+                job["stages"].append({"name": stage, "started_at": now, "finished_at": None, "seconds": None})
+                job["stage"] = stage
+            job["progress"] = info
+            snapshot = self._snapshot(job)
+        # Stage changes are stored at once; progress within a stage is throttled.
+        if changed or time.time() - self._saved_at.get(job_id, 0.0) >= JOB_PROGRESS_INTERVAL:
+            self._save(snapshot)
+
+    def _complete(self, job_id, now):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            future = self._futures.pop(job_id, None)
+            executor = self._job_executors.pop(job_id, None)
+        if job is None or future is None or job["status"] not in _UNFINISHED:
+            return
+        try:
+            result = future.result()
+            if self.on_complete is not None:
+                result = self.on_complete(result) or result
+            status, error = "completed", None
+        except BrokenProcessPool as e:
+            with self._lock:
+                self._replace_executor(executor)
+            result, status, error = None, "failed", f"Worker process died: {e}"
+        except Exception as e:
+            traceback.print_exc()
+            result, status, error = None, "failed", str(e)
+        with self._lock:
+            finished = self._snapshot(job)
+        self._close_stage(finished, now)
+        finished.update(status=status, result=result, error=error, stage=None, finished_at=time.time())
+        # Stored first, so a job never reads as finished here but running elsewhere.
+        self._save(finished)
+        self._saved_at.pop(job_id, None)
+        with self._lock:
+            self._jobs[job_id] = finished
+
+    def _with_elapsed(self, snapshot):
+        if snapshot["started_at"] is not None:
+            end = snapshot["finished_at"] or time.time()
+            snapshot["elapsed_seconds"] = end - snapshot["started_at"]
+        return snapshot
+
+    def get(self, job_id):
+        # Jobs this process runs have the freshest progress in memory;
+        # anything else comes from the store.
+        with self._lock:
+            job = self._jobs.get(job_id)
+            snapshot = self._snapshot(job) if job is not None else None
+        if snapshot is None and self.store is not None:
+            snapshot = self.store.get_job(job_id)
+        return self._with_elapsed(snapshot) if snapshot is not None else None
+
+    def list(self):
+        if self.store is None:
+            with self._lock:
+                job_ids = list(self._jobs)
+            return [self.get(job_id) for job_id in job_ids]
+        jobs = self.store.list_jobs()
+        with self._lock:
+            local = {job["id"]: self._snapshot(self._jobs[job["id"]]) for job in jobs if job["id"] in self._jobs}
+        return [self._with_elapsed(local.get(job["id"], job)) for job in jobs]
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is None:
+                return
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._events.put((None, None, None))
+            self._manager.shutdown()
+            self._executor = None
+            self._events = None
+            # Nothing will finish these now; don't leave them "running" for other workers.
+            now = time.time()
+            unfinished = []
+            for job in self._jobs.values():
+                if job["status"] in _UNFINISHED:
+                    self._close_stage(job, now)
+                    job.update(status="failed", error="The server shut down before the job finished.",
+                               stage=None, finished_at=now)
+                    unfinished.append(self._snapshot(job))
+        for snapshot in unfinished:
+            self._save(snapshot)
@@ -2,44 +2,43 @@ import argparse
 import os
 import numpy as np
 from processor import extract_urls, scrape_urls
-from models import get_model
-from evaluate import evaluate_model
-from visualizations import plot_fold_scores, plot_decision_scores, plot_tfidf_term_importance, get_top_terms_by_tfidf
-from sklearn.decomposition import TruncatedSVD
-from sklearn.preprocessing import Normalizer
-from sklearn.feature_extraction.text import TfidfVectorizer
+from page_cache import PageCache, PAGE_CACHE_DIR
+from models import get_model, MODEL_TYPES
+from evaluate import evaluate_model, calibrate
+from visualizations import plot_stats, save_plots
+from inference import decision_scores
+from features import encode_texts, select_terms
+from training import reduce_dimensionality, normalize_vectors
+from dedup import NearDuplicateIndex
 
-def reduce_dimensionality(X, n_components=100):
-    svd = TruncatedSVD(n_components=n_components, random_state=42)
-    return svd.fit_transform(X), svd
+def print_calibration(table):
+    print("\n Calibration Results:")
+    print(f"{'params':<36} {'alpha':>5} {'threshold':>10} {'prec':>5} {'rec':>5} {'f1':>5} {'fit s':>7}")
+    for row in table:
+        params = ", ".join(f"{k}={v}" for k, v in row["params"].items()) or "defaults"
+        print(f"{params:<36} {row['alpha']:>5} {row['threshold']:>10.4f} {row['precision']:>5.2f} "
+              f"{row['recall']:>5.2f} {row['f1']:>5.2f} {row['full_fit_seconds']:>7.3f}")
 
-def normalize_vectors(X):
-    normalizer = Normalizer(norm='l2')
-    return normalizer.fit_transform(X)
-
-def encode_texts(texts):
-    vectorizer = TfidfVectorizer(max_features=5000, stop_words='english', lowercase=True)
-    X = vectorizer.fit_transform(texts)
-    return X, vectorizer
-
-def encode_texts_with_selected_terms(texts, top_terms):
-    vectorizer = TfidfVectorizer(vocabulary=top_terms, lowercase=True)
-    X = vectorizer.fit_transform(texts)
-    return X, vectorizer
-
-def run_pipeline(zip_path, model_type='svm', visualize=False):
+def run_pipeline(zip_path, model_type='svm', visualize=False, cache_dir=PAGE_CACHE_DIR, offline=False,
+                 run_calibration=False, dedup=True):
     print(f" Extracting URLs from {zip_path}...")
     urls = extract_urls(zip_path)
     print(f" Found {len(urls)} URLs. Scraping content...")
-    texts = scrape_urls(urls)
+    cache = PageCache(cache_dir) if cache_dir else None
+    texts = scrape_urls(urls, cache=cache, offline=offline)
+
+    if dedup:
+        # Same near-duplicate filter as training.train_from_zip, so both train on the same corpus.
+        index = NearDuplicateIndex()
+        texts = [text for url, text in zip(urls, texts) if index.add(text, url) is None]
+        print(f" Dropped {len(urls) - len(texts)} near-duplicate articles.")
 
     print(f" Encoding scraped data...")
     X_raw, vectorizer_full = encode_texts(texts)
     print(f" Initial TF-IDF shape: {X_raw.shape}")
 
-    # Automatically select top TF-IDF terms and re-vectorize
-    top_terms = get_top_terms_by_tfidf(X_raw, vectorizer_full, n_terms=300)
-    X, vectorizer = encode_texts_with_selected_terms(texts, top_terms)
+    # Automatically select top TF-IDF terms by slicing the fitted matrix
+    X, vectorizer, top_terms = select_terms(X_raw, vectorizer_full, n_terms=300)
     print(f" Filtered TF-IDF shape: {X.shape}")
 
     X_reduced, _ = reduce_dimensionality(X, n_components=100)
@@ -55,18 +54,29 @@ def run_pipeline(zip_path, model_type='svm', visualize=False):
     for i, score in enumerate(results):
         print(f"Fold {i+1} | Precision: {score['precision']:.2f}, Recall: {score['recall']:.2f}, F1: {score['f1']:.2f}")
 
+    if run_calibration:
+        print_calibration(calibrate(X_final, y_true, model_type=model_type))
+
     if visualize:
         print("\n Generating Visualizations...")
-        plot_fold_scores(results)
         model.fit(X_final)
-        plot_decision_scores(model, X_final)
-        plot_tfidf_term_importance(X, vectorizer, n_terms=30)
+        save_plots(plot_stats(X, top_terms, decision_scores(model, X_final), fold_results=results))
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="OCC Web Classifier")
     parser.add_argument("zip_path", help="Path to ZIP file containing seed URLs")
-    parser.add_argument("--model", choices=["svm", "iforest"], default="svm", help="Model type (svm or iforest)")
+    parser.add_argument("--model", choices=MODEL_TYPES, default="svm",
+                        help="Model type (svm, iforest, or svm-approx for large corpora)")
     parser.add_argument("--visualize", action="store_true", help="Enable visualizations")
+    parser.add_argument("--cache-dir", default=PAGE_CACHE_DIR, help="Directory for cached pages")
+    parser.add_argument("--no-cache", action="store_true", help="Always fetch pages, bypassing the cache")
+    parser.add_argument("--offline", action="store_true", help="Use only cached pages; never hit the network")
+    parser.add_argument("--calibrate", action="store_true", help="Sweep thresholds and hyperparameters in parallel")
+    parser.add_argument("--no-dedup", action="store_true", help="Keep near-duplicate articles (syndicated copies)")
     args = parser.parse_args()
+    if args.offline and args.no_cache:
+        parser.error("--offline requires the page cache")
 
-    run_pipeline(args.zip_path, args.model, args.visualize)
\ No newline at end of file
+    run_pipeline(args.zip_path, args.model, args.visualize,
+                 cache_dir=None if args.no_cache else args.cache_dir, offline=args.offline,
+                 run_calibration=args.calibrate, dedup=not args.no_dedup)
\ No newline at end of file
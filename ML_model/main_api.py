@@ -1,81 +1,325 @@
+import asyncio
+import json
+import multiprocessing
 import os
-import sqlite3
-import pickle
-from datetime import datetime
-import numpy as np
-import uvicorn
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from urllib.parse import urlsplit
 from fastapi import FastAPI, HTTPException, File, UploadFile, Form
 from fastapi.middleware.cors import CORSMiddleware  # <-- Add this import
-from pydantic import BaseModel
-from sklearn.model_selection import KFold
-from sklearn.metrics import precision_score, recall_score, f1_score
-from sklearn.decomposition import TruncatedSVD
-from sklearn.preprocessing import Normalizer
-from sklearn.feature_extraction.text import TfidfVectorizer
-
-# Import helper functions and model creator from your modules.
-from processor import extract_urls, scrape_urls
-from models import get_model
-from visualizations import get_top_terms_by_tfidf
-
-# --- Updated Evaluation Function Using a Provided Threshold ---
-def evaluate_model(X, y_true, model, k=5, threshold=0):
-    kf = KFold(n_splits=k, shuffle=True, random_state=42)
-    results = []
-    for train_idx, test_idx in kf.split(X):
-        model.fit(X[train_idx])
-        scores = model.decision_function(X[test_idx])
-        preds = np.where(scores >= threshold, 1, 0)
-        y_test = y_true[test_idx]
-        results.append({
-            "precision": precision_score(y_test, preds, zero_division=0),
-            "recall": recall_score(y_test, preds, zero_division=0),
-            "f1": f1_score(y_test, preds, zero_division=0)
-        })
-    return results
-
-# --- Text Processing Functions ---
-def reduce_dimensionality(X, n_components=100):
-    svd = TruncatedSVD(n_components=n_components, random_state=42)
-    X_reduced = svd.fit_transform(X)
-    return X_reduced, svd
-
-def normalize_vectors(X):
-    normalizer = Normalizer(norm='l2')
-    return normalizer.fit_transform(X)
-
-def encode_texts(texts):
-    vectorizer = TfidfVectorizer(max_features=5000, stop_words='english', lowercase=True)
-    X = vectorizer.fit_transform(texts)
-    return X, vectorizer
-
-def encode_texts_with_selected_terms(texts, top_terms):
-    vectorizer = TfidfVectorizer(vocabulary=top_terms, lowercase=True)
-    X = vectorizer.fit_transform(texts)
-    return X, vectorizer
-
-# --- Database and Model Storage Setup ---
-DATABASE = "app.db"
-MODEL_DIR = "models"
-os.makedirs(MODEL_DIR, exist_ok=True)
-
-def init_db():
-    conn = sqlite3.connect(DATABASE)
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS models (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT,
-                    model_type TEXT,
-                    file_path TEXT,
-                    training_date TEXT
-                )''')
-    conn.commit()
-    conn.close()
-
-init_db()
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional, Union
+
+# Import helper functions from your modules.
+# Only what serving needs is imported here: training, scraping and plotting
+# dependencies are loaded by the training worker process, never by the API.
+from model_cache import ModelCache, load_serving_bundle
+from registry import ModelRegistry
+from inference import DEFAULT_CHUNK_SIZE, label, score_matrix, score_texts
+from jobs import JobManager
+from coalescer import Coalescer, PREDICT_COALESCE
+from prediction_cache import PredictionCache
+from url_scraper import UrlScraper
+from dedup import NearDuplicateIndex, dedup_path
+from visualizations import PLOT_KINDS, render_plot_file
+from metrics import REGISTRY, CONTENT_TYPE, DURATION_BUCKETS, MetricsMiddleware, log_event
+
+# --- Model Registry ---
+# Versions, metrics and the active model live in SQLite (WAL mode, shared by
+# all uvicorn workers); each worker polls the active id every
+# MODEL_REFRESH_SECONDS to follow activations made by the others.
+registry = ModelRegistry()
+MODEL_REFRESH_SECONDS = float(os.environ.get("MODEL_REFRESH_SECONDS", 2))
+
+# --- In-process Model Cache ---
+# The active bundle stays resident so /predict never touches SQLite or disk;
+# a few recent versions are kept around for quick switching.
+MODEL_CACHE_SIZE = int(os.environ.get("MODEL_CACHE_SIZE", 3))
+model_cache = ModelCache(max_size=MODEL_CACHE_SIZE, loader=load_serving_bundle)
+
+# --- Metrics ---
+# Exposed at GET /metrics in the Prometheus text format.
+REQUESTS = REGISTRY.counter("http_requests_total", "HTTP requests by route and status.",
+                            ["method", "path", "status"])
+REQUEST_LATENCY = REGISTRY.histogram("http_request_duration_seconds", "HTTP request latency by route.",
+                                     ["method", "path"])
+PREDICT_STAGE_LATENCY = REGISTRY.histogram("predict_stage_seconds",
+                                           "Prediction latency by stage (model_load, vectorize, svd, score).",
+                                           ["endpoint", "stage"])
+PREDICT_TEXTS = REGISTRY.counter("predict_texts_total", "Texts scored.", ["endpoint"])
+COALESCED_BATCH_SIZE = REGISTRY.histogram("predict_coalesced_batch_size", "Requests per coalesced /predict batch.",
+                                          buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+API_ERRORS = REGISTRY.counter("api_errors_total", "Requests that failed with a 500, by exception type.",
+                              ["endpoint", "exception"])
+TRAINING_STAGE_LATENCY = REGISTRY.histogram("training_stage_seconds", "Duration of completed training stages.",
+                                            ["stage"], buckets=DURATION_BUCKETS)
+SCRAPE_PAGES = REGISTRY.counter("scrape_pages_total", "Scrape outcomes per domain (training jobs and /predict/urls).",
+                                ["domain", "outcome"])
+for _key in ["hits", "misses", "loads", "evictions", "load_seconds"]:
+    REGISTRY.callback(f"model_cache_{_key}_total", f"Model cache {_key.replace('_', ' ')}.",
+                      lambda key=_key: model_cache.stats()[key], kind="counter")
+REGISTRY.callback("model_cache_entries", "Models resident in the cache.",
+                  lambda: len(model_cache.stats()["cached_model_ids"]))
+REGISTRY.callback("model_cache_active_model_id", "Id of the model serving predictions (-1 if none).",
+                  lambda: model_cache.stats()["active_model_id"] or -1)
+
+# Domains beyond this many are folded into domain="other" to bound label cardinality.
+MAX_SCRAPE_DOMAINS = int(os.environ.get("MAX_SCRAPE_DOMAINS", 1000))
+_scrape_domains = set()
+
+def record_scrape_outcome(domain, outcome, count=1):
+    if domain not in _scrape_domains:
+        if len(_scrape_domains) >= MAX_SCRAPE_DOMAINS:
+            domain = "other"
+        else:
+            _scrape_domains.add(domain)
+    SCRAPE_PAGES.inc(count, domain=domain, outcome=outcome)
+
+def record_training_metrics(result):
+    for stage, seconds in (result.get("stage_seconds") or {}).items():
+        TRAINING_STAGE_LATENCY.observe(seconds, stage=stage)
+    for domain, outcomes in (result.get("scrape_stats") or {}).items():
+        for outcome, count in outcomes.items():
+            record_scrape_outcome(domain, outcome, count)
+    log_event("training", model_file=result["model_file"], n_documents=result.get("n_documents"),
+              stage_seconds=result.get("stage_seconds"))
+
+def record_predict_metrics(endpoint, model_id, n_texts, stages, total_seconds):
+    for stage, seconds in stages.items():
+        PREDICT_STAGE_LATENCY.observe(seconds, endpoint=endpoint, stage=stage)
+    PREDICT_TEXTS.inc(n_texts, endpoint=endpoint)
+    log_event("predict", endpoint=endpoint, model_id=model_id, n_texts=n_texts,
+              total_seconds=total_seconds, stage_seconds=stages)
+
+def record_error(endpoint, error):
+    API_ERRORS.inc(endpoint=endpoint, exception=type(error).__name__)
+    log_event("error", endpoint=endpoint, exception=type(error).__name__, detail=str(error))
+
+# --- Prediction Cache ---
+# Scores of recently seen texts for the active model; cleared on model swaps.
+prediction_cache = PredictionCache()
+for _key in ["hits", "misses", "evictions", "expired"]:
+    REGISTRY.callback(f"prediction_cache_{_key}_total", f"Prediction cache {_key}.",
+                      lambda key=_key: prediction_cache.stats()[key], kind="counter")
+REGISTRY.callback("prediction_cache_hit_rate", "Prediction cache hits / lookups since startup.",
+                  lambda: prediction_cache.stats()["hit_rate"])
+REGISTRY.callback("prediction_cache_entries", "Scores held in the prediction cache.",
+                  lambda: prediction_cache.stats()["entries"])
+REGISTRY.callback("prediction_cache_bytes", "Estimated memory held by the prediction cache.",
+                  lambda: prediction_cache.stats()["bytes"])
+
+_registry_active_id = None  # last active id this worker saw in the registry
+_swap_lock = threading.Lock()
+
+def swap_model(model_id, model_file):
+    # Hot-swap into the cache; the load happens here, off the predict path.
+    global _registry_active_id
+    with _swap_lock:
+        model_cache.activate(model_id, model_file)
+        prediction_cache.clear()
+        _registry_active_id = model_id
+
+def sync_active_model():
+    # Picks up activations, rollbacks and new models registered by other workers.
+    model_id = registry.active_id()
+    if model_id is None or model_id == _registry_active_id:
+        return
+    model = registry.get(model_id)
+    swap_model(model_id, model["file_path"])
+    log_event("model_swap", model_id=model_id, source="registry")
+
+def get_active_model():
+    active = model_cache.active()
+    if active is not None:
+        return active
+    # First request after startup: load whatever the registry marks active.
+    sync_active_model()
+    return model_cache.active()
+
+async def watch_registry():
+    while True:
+        await asyncio.sleep(MODEL_REFRESH_SECONDS)
+        try:
+            await asyncio.to_thread(sync_active_model)
+        except Exception as e:
+            record_error("registry", e)
+
+def register_model(result):
+    # Runs in the API process once a training job finishes.
+    classifier = result["classifier"]
+    model_filename = result["model_file"]
+    metrics = {key: result[key] for key in ["cross_validation_results", "calibration", "alpha", "stage_seconds",
+                                            "drift", "n_new_documents", "estimated_seconds_saved", "n_duplicates",
+                                            "dedup_scope", "plot_stats"]
+               if result.get(key) is not None}
+    model_id = registry.register(f"{classifier}_model", classifier, model_filename,
+                                 training_date=result["training_date"], threshold=result.get("threshold"),
+                                 metrics=metrics, feature_config=result.get("feature_config"),
+                                 compiled_file=result.get("compiled_file"), n_documents=result.get("n_documents"))
+    swap_model(model_id, model_filename)
+    record_training_metrics(result)
+    if result.get("visualize"):
+        prerender_plots(registry.get(model_id))
+    return dict(result, model_id=model_id)
+
+# --- Near-Duplicate Index ---
+# Training saves a MinHash index of its corpus next to the model; it is
+# memory-mapped on first use to flag texts the model has already seen.
+@lru_cache(maxsize=MODEL_CACHE_SIZE)
+def get_dedup_index(model_id):
+    model = registry.get(model_id)
+    path = dedup_path(model["file_path"]) if model is not None else None
+    if path is None or not os.path.exists(path):
+        return None
+    return NearDuplicateIndex.load(path)
+
+def find_duplicate(index, text):
+    match = index.lookup(text)
+    if match is None:
+        return None
+    doc_id, similarity = match
+    return {"url": index.label(doc_id), "similarity": similarity}
+
+def find_duplicates(index, texts):
+    return [find_duplicate(index, text) for text in texts]
+
+def active_dedup_index(model_id):
+    index = get_dedup_index(model_id)
+    if index is None:
+        raise HTTPException(status_code=404, detail="The active model has no near-duplicate index.")
+    return index
+
+# --- Plots ---
+# Drawn on request from the statistics training stored in the registry, in a
+# worker process (matplotlib is never imported here), and cached as PNGs
+# next to the model file.
+PLOT_WORKERS = int(os.environ.get("PLOT_WORKERS", 1))
+_plot_executor = None
+_plot_renders = {}  # PNG path -> in-flight render, so concurrent requests share one
+_plot_lock = threading.Lock()
+
+def plot_path(model_file, kind):
+    return os.path.splitext(model_file)[0] + f".{kind}.png"
+
+def render_plot(model, kind):
+    global _plot_executor
+    path = plot_path(model["file_path"], kind)
+    with _plot_lock:
+        future = _plot_renders.get(path)
+        if future is None:
+            if _plot_executor is None:
+                _plot_executor = ProcessPoolExecutor(max_workers=PLOT_WORKERS,
+                                                     mp_context=multiprocessing.get_context("spawn"))
+            future = _plot_executor.submit(render_plot_file, model["metrics"]["plot_stats"], kind, path)
+            _plot_renders[path] = future
+            future.add_done_callback(lambda _: _plot_renders.pop(path, None))
+    return future
+
+def prerender_plots(model):
+    # /train with visualize=True: render in the background once the model is registered.
+    stats = (model["metrics"] or {}).get("plot_stats")
+    for kind in PLOT_KINDS:
+        if stats and stats.get(kind) and not os.path.exists(plot_path(model["file_path"], kind)):
+            render_plot(model, kind)
+
+# --- Background Training Jobs ---
+# Training runs in a separate process so /predict keeps its latency meanwhile.
+TRAIN_WORKERS = int(os.environ.get("TRAIN_WORKERS", 1))
+# Job rows live in the registry database, so any worker can answer /jobs/{id}.
+job_manager = JobManager(max_workers=TRAIN_WORKERS, on_complete=register_model, store=registry)
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# --- Request Coalescing ---
+def score_coalesced(texts):
+    # Runs in a worker thread once per coalesced batch of /predict texts.
+    start = time.perf_counter()
+    active = get_active_model()
+    if active is None:
+        raise HTTPException(status_code=404, detail="No trained model found.")
+    stages = {"model_load": time.perf_counter() - start}
+
+    model_id, data = active
+    threshold = data.get("threshold", 0)
+    scores = score_matrix(data, texts, stages)
+    record_predict_metrics("/predict", model_id, len(texts), stages, time.perf_counter() - start)
+    COALESCED_BATCH_SIZE.observe(len(texts))
+    for text, score in zip(texts, scores):
+        prediction_cache.put(prediction_cache.key(model_id, text), score)
+    return [(score, threshold) for score in scores]
+
+predict_coalescer = Coalescer(score_coalesced) if PREDICT_COALESCE else None
+
+# --- Predict by URL ---
+# Pages are fetched with the training scraper's extraction and page cache.
+MAX_PREDICT_URLS = int(os.environ.get("MAX_PREDICT_URLS", 1000))
+url_scraper = UrlScraper()
+
+def score_text(model_id, data, text, endpoint):
+    # Single text through the prediction cache, then the full pipeline on a miss.
+    cache_key = prediction_cache.key(model_id, text)
+    score = prediction_cache.get(cache_key)
+    if score is None:
+        stages = {}
+        start = time.perf_counter()
+        score = score_matrix(data, [text], stages)[0]
+        record_predict_metrics(endpoint, model_id, 1, stages, time.perf_counter() - start)
+        prediction_cache.put(cache_key, score)
+    return float(score)
+
+async def stream_url_predictions(urls, model_id, data, offline):
+    threshold = float(data.get("threshold", 0))
+    valid = []
+    for url in urls:
+        normalized = url_scraper.normalize(url)
+        if normalized is None:
+            yield json.dumps({"url": url, "status": "error", "error": "invalid_url"}) + "\n"
+        elif normalized not in valid:
+            valid.append(normalized)
+
+    async for url, text, outcome, seconds in url_scraper.as_completed(valid, offline=offline):
+        record_scrape_outcome(urlsplit(url).netloc, outcome)
+        if not text:
+            line = {"url": url, "status": "error", "error": outcome, "seconds": seconds}
+        else:
+            try:
+                score = score_text(model_id, data, text, "/predict/urls")
+            except Exception as e:
+                record_error("/predict/urls", e)
+                line = {"url": url, "status": "error", "error": str(e), "seconds": seconds}
+            else:
+                line = {"url": url, "status": "ok", "source": outcome, "model_id": model_id,
+                        "prediction": label(score, threshold), "score": score, "threshold": threshold,
+                        "seconds": seconds}
+        yield json.dumps(line) + "\n"
 
 # --- FastAPI Setup ---
-app = FastAPI(title="Crisis Events One-class Text Classification API")
+@asynccontextmanager
+async def lifespan(app):
+    # Create or migrate the schema and load the active model before serving
+    # traffic, so the first /predict doesn't pay for it.
+    registry.migrate()
+    try:
+        get_active_model()
+    except Exception as e:
+        # A missing or corrupt artifact mustn't keep the API down: /train and
+        # /models/{id}/activate are how it gets fixed. /predict reports the
+        # error per request until then.
+        print(f" Could not load the active model at startup: {e}")
+        record_error("startup", e)
+    watcher = asyncio.create_task(watch_registry())
+    yield
+    watcher.cancel()
+    job_manager.shutdown()
+    if _plot_executor is not None:
+        _plot_executor.shutdown(cancel_futures=True)
+    url_scraper.close()
+
+app = FastAPI(title="Crisis Events One-class Text Classification API", lifespan=lifespan)
 
 # Enable CORS so the browser can call from a different origin.
 app.add_middleware(
@@ -85,128 +329,287 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(MetricsMiddleware, requests=REQUESTS, latency=REQUEST_LATENCY)
 
 # Use the field "classifier" (instead of model_type) to avoid name conflicts.
 # For prediction, we continue to use JSON payload.
 class PredictRequest(BaseModel):
     text: str
+    check_duplicate: bool = False
+
+# Texts per /predict/batch request; larger batches get a 422 rather than
+# tying up a worker thread for as long as the client likes.
+MAX_BATCH_TEXTS = int(os.environ.get("MAX_BATCH_TEXTS", 10000))
+
+class PredictBatchRequest(BaseModel):
+    texts: List[str] = Field(..., max_length=MAX_BATCH_TEXTS)
+    ids: Optional[List[Union[str, int]]] = None
+    chunk_size: int = Field(DEFAULT_CHUNK_SIZE, ge=1, le=10000)
+    check_duplicates: bool = False
+
+class PredictUrlsRequest(BaseModel):
+    urls: List[str] = Field(..., min_length=1, max_length=MAX_PREDICT_URLS)
+    offline: bool = False
+
+# Checked before a job is queued, so a typo is a 422 now rather than a job
+# failing minutes later in a worker. Spelled out here, not imported from
+# models/incremental, so the API process never imports scikit-learn;
+# test_jobs.py checks that the lists agree.
+TRAIN_CLASSIFIERS = ("svm", "iforest", "svm-approx")
+VOCABULARY_MODES = ("fixed", "extend")
 
-# Modified training endpoint to accept a file upload.
-@app.post("/train")
+# Training endpoint accepts a file upload and queues a background job.
+@app.post("/train", status_code=202)
 async def train_model(
     zip_file: UploadFile = File(...),
     classifier: str = Form("svm"),
-    visualize: bool = Form(False)
+    visualize: bool = Form(False),
+    offline: bool = Form(False),
+    alpha: float = Form(6),
+    calibrate: bool = Form(False),
+    incremental: bool = Form(False),
+    vocabulary: str = Form("fixed"),
+    dedup: bool = Form(True)
 ):
+    if classifier not in TRAIN_CLASSIFIERS:
+        raise HTTPException(status_code=422, detail=f"classifier must be one of: {', '.join(TRAIN_CLASSIFIERS)}.")
+    if vocabulary not in VOCABULARY_MODES:
+        raise HTTPException(status_code=422, detail=f"vocabulary must be one of: {', '.join(VOCABULARY_MODES)}.")
+    base_model_file = None
+    if incremental:
+        # Incremental updates start from the active model's stored feature matrix.
+        active = get_active_model()
+        model = registry.get(active[0]) if active is not None else None
+        base_model_file = model["file_path"] if model is not None else None
+        if base_model_file is None:
+            raise HTTPException(status_code=400, detail="Incremental training needs an existing model.")
     try:
-        # Save the uploaded ZIP file temporarily.
-        zip_path = f"temp_{zip_file.filename}"
+        # Save the uploaded ZIP file under a unique name; the job removes it when done.
+        zip_path = f"temp_{uuid.uuid4().hex}_{os.path.basename(zip_file.filename or 'upload.zip')}"
+        # Copied in chunks so large archives are never held in memory whole.
         with open(zip_path, "wb") as f:
-            f.write(await zip_file.read())
-        
-        # 1. Extract URLs and scrape text content.
-        urls = extract_urls(zip_path)
-        if not urls:
-            raise HTTPException(status_code=400, detail="No URLs extracted from the provided ZIP file.")
-        texts = scrape_urls(urls)
-        
-        # 2. Encode texts with full TF-IDF, then select top terms.
-        X_raw, vectorizer_full = encode_texts(texts)
-        top_terms = get_top_terms_by_tfidf(X_raw, vectorizer_full, n_terms=300)
-        X, vectorizer = encode_texts_with_selected_terms(texts, top_terms)
-        
-        # 3. Reduce dimensionality and normalize.
-        X_reduced, svd = reduce_dimensionality(X, n_components=100)
-        X_final = normalize_vectors(X_reduced)
-
-        # 4. All training data are inliers.
-        y_true = np.ones(X.shape[0])
-        
-        # 5. Initialize the model.
-        model = get_model(classifier)
-        
-        # 6. Train on full data and compute decision scores.
-        model.fit(X_final)
-        training_scores = model.decision_function(X_final)
-        
-        # --- Adjust threshold using a tunable alpha parameter.
-        alpha = 6  # Increase alpha to lower the threshold (make it more negative).
-        threshold = np.mean(training_scores) - alpha * np.std(training_scores)
-
-        # 7. Evaluate the model using this threshold.
-        results = evaluate_model(X_final, y_true, model, threshold=threshold)
-
-        # 8. Save model and text processing objects (including threshold) to disk.
-        model_filename = os.path.join(MODEL_DIR, f"{classifier}_model.pkl")
-        with open(model_filename, "wb") as f:
-            pickle.dump({
-                "model": model,
-                "vectorizer": vectorizer,
-                "svd": svd,
-                "top_terms": top_terms,
-                "threshold": threshold
-            }, f)
-
-        # 9. Save model info in SQLite.
-        conn = sqlite3.connect(DATABASE)
-        c = conn.cursor()
-        training_date = datetime.now().isoformat()
-        c.execute("INSERT INTO models (name, model_type, file_path, training_date) VALUES (?, ?, ?, ?)",
-                  (f"{classifier}_model", classifier, model_filename, training_date))
-        conn.commit()
-        conn.close()
-
-        # Optionally, remove the temporary file after processing.
-        os.remove(zip_path)
+            while chunk := await zip_file.read(UPLOAD_CHUNK_SIZE):
+                f.write(chunk)
 
+        if incremental:
+            job_id = job_manager.submit("incremental:update_job", zip_path, base_model_file,
+                                        offline=offline, vocabulary=vocabulary, dedup=dedup, visualize=visualize)
+        else:
+            job_id = job_manager.submit("training:train_job", zip_path, classifier=classifier, offline=offline,
+                                        alpha=alpha, calibrate=calibrate, dedup=dedup, visualize=visualize)
         return {
-            "message": "Model trained and saved successfully.",
-            "cross_validation_results": results,
-            "threshold": threshold
+            "message": "Training job queued.",
+            "job_id": job_id,
+            "status_url": f"/jobs/{job_id}"
         }
     except Exception as e:
+        record_error("/train", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/jobs")
+def list_jobs():
+    return job_manager.list()
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found.")
+    return job
+
 @app.post("/predict")
 async def predict(request: PredictRequest):
     text = request.text
     try:
-        # Load the most recent model.
-        conn = sqlite3.connect(DATABASE)
-        c = conn.cursor()
-        c.execute("SELECT file_path FROM models ORDER BY id DESC LIMIT 1")
-        row = c.fetchone()
-        conn.close()
-        if row is None:
+        # Use the active model from the in-process cache.
+        start = time.perf_counter()
+        active = get_active_model()
+        if active is None:
             raise HTTPException(status_code=404, detail="No trained model found.")
+        stages = {"model_load": time.perf_counter() - start}
 
-        model_file = row[0]
-        with open(model_file, "rb") as f:
-            data = pickle.load(f)
-        model = data["model"]
-        vectorizer = data["vectorizer"]
-        svd = data["svd"]
+        model_id, data = active
         threshold = data.get("threshold", 0)
+        index = active_dedup_index(model_id) if request.check_duplicate else None
 
-        # Process the input text using the saved vectorizer and SVD transformer.
-        X_text = vectorizer.transform([text])
-        X_reduced = svd.transform(X_text)
-        normalizer = Normalizer(norm='l2')
-        X_final = normalizer.fit_transform(X_reduced)
+        # Resubmitted texts are answered from the prediction cache, before vectorizing.
+        cache_key = prediction_cache.key(model_id, text)
+        score = prediction_cache.get(cache_key)
+        if score is None and predict_coalescer is not None:
+            # Concurrent calls share one vectorize/SVD/decision pass.
+            score, threshold = await predict_coalescer.submit(text)
+        elif score is None:
+            # Process the input text using the saved vectorizer and SVD transformer.
+            score = score_matrix(data, [text], stages)[0]
+            record_predict_metrics("/predict", model_id, 1, stages, time.perf_counter() - start)
+            prediction_cache.put(cache_key, score)
 
-        try:
-            score = model.decision_function(X_final)[0]
-        except AttributeError:
-            score = model.score_samples(X_final)[0]
+        prediction = label(score, threshold)
+        response = {"prediction": prediction, "score": score, "threshold": threshold}
+        if index is not None:
+            response["duplicate"] = find_duplicate(index, text)
+        return response
+    except HTTPException:
+        raise
+    except Exception as e:
+        record_error("/predict", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/predict/batch")
+async def predict_batch(request: PredictBatchRequest):
+    if request.ids is not None and len(request.ids) != len(request.texts):
+        raise HTTPException(status_code=422, detail="ids must have the same length as texts.")
+    try:
+        start = time.perf_counter()
+        active = get_active_model()
+        if active is None:
+            raise HTTPException(status_code=404, detail="No trained model found.")
+        stages = {"model_load": time.perf_counter() - start}
 
-        prediction = "Crisis Event" if score >= threshold else "Non-Crisis Event"
-        return {"prediction": prediction, "score": score, "threshold": threshold}
+        model_id, data = active
+        threshold = data.get("threshold", 0)
+        index = active_dedup_index(model_id) if request.check_duplicates else None
+
+        # Cached and repeated texts are scored once; the rest go through one
+        # vectorize/SVD/decision pass per chunk instead of per text.
+        scores = [None] * len(request.texts)
+        pending = {}  # cache key -> positions of that text in the request
+        for i, text in enumerate(request.texts):
+            key = prediction_cache.key(model_id, text)
+            if key in pending:
+                pending[key].append(i)
+                continue
+            cached = prediction_cache.get(key)
+            if cached is None:
+                pending[key] = [i]
+            else:
+                scores[i] = cached
+        pending = list(pending.items())
+        # Scored in a worker thread so other requests keep being served meanwhile.
+        new_scores, timings = await asyncio.to_thread(score_texts, data,
+                                                      [request.texts[positions[0]] for _, positions in pending],
+                                                      chunk_size=request.chunk_size)
+        for (key, positions), score in zip(pending, new_scores):
+            prediction_cache.put(key, score)
+            for i in positions:
+                scores[i] = score
+        elapsed = time.perf_counter() - start
+        for chunk in timings:
+            for stage, seconds in chunk["stages"].items():
+                stages[stage] = stages.get(stage, 0.0) + seconds
+        record_predict_metrics("/predict/batch", model_id, len(pending), stages, elapsed)
+
+        ids = request.ids if request.ids is not None else list(range(len(request.texts)))
+        predictions = [
+            {"id": item_id, "prediction": label(score, threshold), "score": float(score)}
+            for item_id, score in zip(ids, scores)
+        ]
+        if index is not None:
+            # MinHash lookups are CPU work; a large batch mustn't stall the event loop.
+            duplicates = await asyncio.to_thread(find_duplicates, index, request.texts)
+            for prediction, duplicate in zip(predictions, duplicates):
+                prediction["duplicate"] = duplicate
+        return {
+            "model_id": model_id,
+            "threshold": float(threshold),
+            "predictions": predictions,
+            "scored": len(pending),
+            "timings": {"total_seconds": elapsed, "chunks": timings}
+        }
+    except HTTPException:
+        raise
     except Exception as e:
+        record_error("/predict/batch", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/predict/urls")
+async def predict_urls(request: PredictUrlsRequest):
+    """
+    Fetches, extracts and scores each URL server-side and streams one JSON
+    object per line (NDJSON) as soon as that URL is done, so a slow host
+    doesn't hold back the others. Duplicate URLs are scored once.
+    """
+    active = get_active_model()
+    if active is None:
+        raise HTTPException(status_code=404, detail="No trained model found.")
+    model_id, data = active
+    return StreamingResponse(stream_url_predictions(request.urls, model_id, data, request.offline),
+                             media_type="application/x-ndjson")
+
+@app.get("/models/cache")
+def model_cache_stats():
+    return model_cache.stats()
+
+@app.get("/models")
+def list_models(limit: int = 100, offset: int = 0):
+    return registry.list(limit=limit, offset=offset)
+
+@app.get("/models/{model_id}")
+def get_model(model_id: int):
+    model = registry.get(model_id)
+    if model is None:
+        raise HTTPException(status_code=404, detail="Model not found.")
+    return model
+
+@app.get("/models/{model_id}/plots/{kind}")
+async def get_model_plot(model_id: int, kind: str):
+    """PNG plot for a model version: fold_scores, decision_scores or term_importance."""
+    if kind not in PLOT_KINDS:
+        raise HTTPException(status_code=404, detail=f"Unknown plot; expected one of {', '.join(PLOT_KINDS)}.")
+    model = registry.get(model_id)
+    if model is None:
+        raise HTTPException(status_code=404, detail="Model not found.")
+    if not (model["metrics"] or {}).get("plot_stats", {}).get(kind):
+        raise HTTPException(status_code=404, detail="No statistics recorded for this plot.")
+    path = plot_path(model["file_path"], kind)
+    if not os.path.exists(path):
+        try:
+            await asyncio.wrap_future(render_plot(model, kind))
+        except Exception as e:
+            record_error("/models/plots", e)
+            raise HTTPException(status_code=500, detail=str(e))
+    return FileResponse(path, media_type="image/png")
+
+def activate_model(model):
+    # Load first so a broken artifact never becomes the registry's active model.
+    if not registry.verify(model["id"]):
+        raise HTTPException(status_code=409, detail="Model artifact is missing or fails its checksum.")
+    model_cache.get(model["id"], model["file_path"])
+    return model
+
+@app.post("/models/rollback")
+def rollback_model():
+    """Reactivates the previously active version without retraining."""
+    target = registry.rollback_target()
+    if target is None:
+        raise HTTPException(status_code=409, detail="No earlier model to roll back to.")
+    activate_model(target)
+    model = registry.rollback()
+    swap_model(model["id"], model["file_path"])
+    return model
+
+@app.post("/models/{model_id}/activate")
+def activate_model_version(model_id: int):
+    model = registry.get(model_id)
+    if model is None:
+        raise HTTPException(status_code=404, detail="Model not found.")
+    activate_model(model)
+    model = registry.activate(model_id)
+    swap_model(model_id, model["file_path"])
+    return model
+
+@app.get("/predict/cache")
+def prediction_cache_stats():
+    return prediction_cache.stats()
+
+@app.get("/metrics")
+def metrics():
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
 @app.get("/")
 def read_root():
     return {"message": "Crisis Events One-class Text Classification API is running."}
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -0,0 +1,155 @@
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+# How serving processes hold model weights: "mmap", "copy" or "pickle".
+SERVING_FORMAT = os.environ.get("SERVING_FORMAT", "mmap")
+
+
+def load_bundle(file_path):
+    with open(file_path, "rb") as f:
+        return pickle.load(f)
+
+
+def unsupported_marker(compiled_path):
+    # Left next to models that can't be compiled, so later loads skip straight
+    # to the pickle instead of unpickling it once more to retry the export.
+    return compiled_path + ".unsupported"
+
+
+def _known_uncompilable(file_path, compiled_path):
+    # A marker older than the pickle is stale: the model file was replaced.
+    marker = unsupported_marker(compiled_path)
+    try:
+        return os.path.getmtime(marker) >= os.path.getmtime(file_path)
+    except OSError:
+        return False
+
+
+def _export_compiled(bundle, compiled_path):
+    # Models saved before compiled artifacts existed get one on first load.
+    # Written under a temporary name so concurrent workers never map a
+    # half-written file; whichever rename lands last wins with equal bytes.
+    from compiled import export_bundle
+    tmp_path = f"{compiled_path}.{os.getpid()}.tmp"
+    try:
+        export_bundle(bundle, tmp_path)
+        os.replace(tmp_path, compiled_path)
+    except (ValueError, KeyError) as e:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        try:
+            with open(unsupported_marker(compiled_path), "w") as f:
+                f.write(f"{e}\n")
+        except OSError:
+            pass
+        return False
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+    return True
+
+
+def load_serving_bundle(file_path, serving_format=None):
+    """
+    Loads a model for serving. "mmap" (the default) memory-maps the compiled
+    artifact next to the pickle, so every worker process shares one copy of
+    the weights; "copy" reads it into private memory and "pickle" unpickles
+    the full scikit-learn bundle. Models that can't be compiled are always
+    unpickled, once.
+    """
+    serving_format = serving_format or SERVING_FORMAT
+    compiled_path = os.path.splitext(file_path)[0] + ".npz"
+    if serving_format == "pickle":
+        return load_bundle(file_path)
+    if not os.path.exists(compiled_path):
+        if _known_uncompilable(file_path, compiled_path):
+            return load_bundle(file_path)
+        bundle = load_bundle(file_path)
+        if not _export_compiled(bundle, compiled_path):
+            return bundle
+    from compiled import CompiledScorer
+    return CompiledScorer.load(compiled_path, mmap=serving_format == "mmap")
+
+
+class ModelCache:
+    """
+    Keeps trained model bundles resident in memory so /predict never reads
+    from disk. Holds the active bundle plus an LRU of recently used versions,
+    keyed by the model id from the `models` table.
+    """
+
+    def __init__(self, max_size=3, loader=load_bundle):
+        self.max_size = max(1, max_size)
+        self._loader = loader
+        self._bundles = OrderedDict()
+        self._active = None  # (model_id, bundle)
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "loads": 0, "load_seconds": 0.0, "evictions": 0}
+
+    def _put(self, model_id, bundle):
+        self._bundles[model_id] = bundle
+        self._bundles.move_to_end(model_id)
+        while len(self._bundles) > self.max_size:
+            evicted_id, _ = self._bundles.popitem(last=False)
+            if self._active is not None and evicted_id == self._active[0]:
+                # Never drop the active bundle; push it back to the fresh end.
+                self._bundles[evicted_id] = self._active[1]
+                continue
+            self._stats["evictions"] += 1
+
+    def _load(self, file_path):
+        start = time.perf_counter()
+        bundle = self._loader(file_path)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._stats["loads"] += 1
+            self._stats["load_seconds"] += elapsed
+        return bundle
+
+    def get(self, model_id, file_path):
+        with self._lock:
+            bundle = self._bundles.get(model_id)
+            if bundle is not None:
+                self._bundles.move_to_end(model_id)
+                self._stats["hits"] += 1
+                return bundle
+            self._stats["misses"] += 1
+
+        # Load outside the lock so a slow unpickle doesn't stall other readers.
+        bundle = self._load(file_path)
+        with self._lock:
+            self._put(model_id, bundle)
+        return bundle
+
+    def activate(self, model_id, file_path, bundle=None):
+        if bundle is None:
+            bundle = self.get(model_id, file_path)
+        with self._lock:
+            self._active = (model_id, bundle)
+            self._put(model_id, bundle)
+        return bundle
+
+    def active(self):
+        # Single reference read: callers always see a consistent (id, bundle) pair.
+        active = self._active
+        if active is not None:
+            with self._lock:
+                self._stats["hits"] += 1
+        return active
+
+    def clear(self):
+        with self._lock:
+            self._bundles.clear()
+            self._active = None
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["active_model_id"] = self._active[0] if self._active is not None else None
+            stats["cached_model_ids"] = list(self._bundles.keys())
+            stats["max_size"] = self.max_size
+        return stats
@@ -1,11 +1,77 @@
+import numpy as np
+from sklearn.base import BaseEstimator, OutlierMixin
 from sklearn.svm import OneClassSVM
 from sklearn.ensemble import IsolationForest
+from sklearn.kernel_approximation import Nystroem
+from sklearn.linear_model import SGDOneClassSVM
 
+MODEL_TYPES = ["svm", "iforest", "svm-approx"]
 
-def get_model(model_type='svm'):
+
+class ApproxOneClassSVM(OutlierMixin, BaseEstimator):
+    """
+    Scalable stand-in for the RBF OneClassSVM: a Nystroem map over
+    n_components landmark documents approximates the RBF kernel and a linear
+    One-Class SVM is trained on it with SGD, in mini-batches. Fit time is
+    linear in the number of samples and prediction cost depends only on the
+    number of landmarks, not the size of the training set.
+    """
+
+    def __init__(self, gamma='scale', nu=0.3, n_components=300, batch_size=1024, n_epochs=5,
+                 random_state=42):
+        self.gamma = gamma
+        self.nu = nu
+        self.n_components = n_components
+        self.batch_size = batch_size
+        self.n_epochs = n_epochs
+        self.random_state = random_state
+
+    def _init(self, X):
+        # Same definition as OneClassSVM's gamma='scale', taken from the first batch.
+        gamma = self.gamma
+        if gamma == 'scale':
+            variance = X.var()
+            gamma = 1.0 / (X.shape[1] * variance) if variance > 0 else 1.0
+        self.gamma_ = gamma
+        # Landmarks are sampled from the first batch seen.
+        self.sampler_ = Nystroem(gamma=gamma, n_components=min(self.n_components, X.shape[0]),
+                                 random_state=self.random_state).fit(X)
+        self.svm_ = SGDOneClassSVM(nu=self.nu, random_state=self.random_state)
+
+    def partial_fit(self, X, y=None):
+        X = np.asarray(X)
+        if not hasattr(self, "sampler_"):
+            self._init(X)
+        self.svm_.partial_fit(self.sampler_.transform(X))
+        return self
+
+    def fit(self, X, y=None):
+        X = np.asarray(X)
+        self._init(X)
+        rng = np.random.RandomState(self.random_state)
+        for _ in range(self.n_epochs):
+            order = rng.permutation(X.shape[0])
+            for start in range(0, X.shape[0], self.batch_size):
+                self.svm_.partial_fit(self.sampler_.transform(X[order[start:start + self.batch_size]]))
+        return self
+
+    def decision_function(self, X):
+        return self.svm_.decision_function(self.sampler_.transform(np.asarray(X)))
+
+    def score_samples(self, X):
+        return self.svm_.score_samples(self.sampler_.transform(np.asarray(X)))
+
+    def predict(self, X):
+        return np.where(self.decision_function(X) >= 0, 1, -1)
+
+
+def get_model(model_type='svm', **params):
+    # Keyword arguments override the defaults below (e.g. nu, gamma, contamination).
     if model_type == 'svm':
-        return OneClassSVM(kernel='rbf', gamma='scale', nu=0.3)
+        return OneClassSVM(**{"kernel": 'rbf', "gamma": 'scale', "nu": 0.3, **params})
     elif model_type == 'iforest':
-        return IsolationForest(contamination=0.3, random_state=42)
+        return IsolationForest(**{"contamination": 0.3, "random_state": 42, **params})
+    elif model_type == 'svm-approx':
+        return ApproxOneClassSVM(**params)
     else:
         raise ValueError(f"Unsupported model type: {model_type}")
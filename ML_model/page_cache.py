@@ -0,0 +1,137 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+
+PAGE_CACHE_DIR = os.environ.get("PAGE_CACHE_DIR", "page_cache")
+PAGE_CACHE_TTL = float(os.environ.get("PAGE_CACHE_TTL", 24 * 3600))
+PAGE_CACHE_MAX_BYTES = int(os.environ.get("PAGE_CACHE_MAX_BYTES", 1024 ** 3))
+
+
+def url_key(url):
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+class PageCache:
+    """
+    On-disk cache of scraped pages keyed by URL. Each entry keeps the raw
+    HTML, the cleaned text (and the engine that extracted it), a SHA-256 of
+    the HTML and the ETag/Last-Modified validators, so stale entries can be
+    revalidated with a conditional GET.
+    Entries are evicted least-recently-used once max_bytes is exceeded.
+    """
+
+    def __init__(self, directory=PAGE_CACHE_DIR, ttl=PAGE_CACHE_TTL, max_bytes=PAGE_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._total_bytes = None
+        self.stats = {"hits": 0, "misses": 0, "revalidated": 0, "stores": 0, "evictions": 0}
+
+    def _path(self, url):
+        key = url_key(url)
+        return os.path.join(self.directory, key[:2], f"{key}.json.gz")
+
+    def _entry_files(self):
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".json.gz"):
+                    yield os.path.join(root, name)
+
+    def _count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def get(self, url):
+        path = self._path(url)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                entry = json.load(f)
+            os.utime(path)  # mtime doubles as last-access time for LRU eviction
+        except (OSError, ValueError):
+            self._count("misses")
+            return None
+        self._count("hits")
+        return entry
+
+    def is_fresh(self, entry):
+        return time.time() - entry["fetched_at"] < self.ttl
+
+    def revalidation_headers(self, entry):
+        headers = {}
+        if entry is None:
+            return headers
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def put(self, url, html, text, etag=None, last_modified=None, engine=None):
+        entry = {
+            "url": url,
+            "html": html,
+            "text": text,
+            "engine": engine,
+            "sha256": hashlib.sha256(html.encode("utf-8")).hexdigest(),
+            "etag": etag,
+            "last_modified": last_modified,
+            "fetched_at": time.time(),
+        }
+        self._write(url, entry)
+        self._count("stores")
+        return entry
+
+    def touch(self, url, entry):
+        # A 304 means our copy is current: restart its TTL without refetching.
+        entry = dict(entry, fetched_at=time.time())
+        self._write(url, entry)
+        self._count("revalidated")
+        return entry
+
+    def _write(self, url, entry):
+        path = self._path(url)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        old_size = os.path.getsize(path) if os.path.exists(path) else 0
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as raw, gzip.open(raw, "wt", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp_path, path)
+        new_size = os.path.getsize(path)
+
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(os.path.getsize(p) for p in self._entry_files())
+            else:
+                self._total_bytes += new_size - old_size
+            over_budget = self._total_bytes > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    def evict(self):
+        with self._lock:
+            files = []
+            for path in self._entry_files():
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                files.append((st.st_mtime, st.st_size, path))
+            total = sum(size for _, size, _ in files)
+            # Trim to 90% of the budget so we don't evict on every write.
+            target = self.max_bytes * 0.9
+            for _, size, path in sorted(files):
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
+                self.stats["evictions"] += 1
+            self._total_bytes = total
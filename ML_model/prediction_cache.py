@@ -0,0 +1,96 @@
+import hashlib
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+# Memory budget for memoized scores (0 disables the cache) and entry lifetime.
+PREDICTION_CACHE_MAX_BYTES = int(os.environ.get("PREDICTION_CACHE_MAX_BYTES", 64 * 1024 ** 2))
+PREDICTION_CACHE_TTL = float(os.environ.get("PREDICTION_CACHE_TTL", 3600))
+
+_DIGEST_SIZE = 16
+
+
+def normalize_text(text):
+    # Lowercasing and collapsing whitespace can't change the features: both
+    # scoring paths lowercase and tokenize on word characters only.
+    return " ".join(text.lower().split())
+
+
+def _entry_bytes():
+    # Every entry has the same shape, so one sample gives the per-entry cost:
+    # key tuple + digest, value tuple + two floats, and the OrderedDict slot.
+    key = (2 ** 40, hashlib.blake2b(b"", digest_size=_DIGEST_SIZE).digest())
+    value = (1.5, time.time())
+    sizes = [key, key[0], key[1], value, value[0], value[1]]
+    return sum(sys.getsizeof(obj) for obj in sizes) + 100
+
+
+class PredictionCache:
+    """
+    Bounded LRU of decision scores keyed by (model id, hash of the
+    normalized text), so resubmitted articles skip vectorization entirely.
+    Entries expire after ttl seconds; the model id in the key means a newly
+    activated model never sees another model's scores, and clear() frees
+    the old ones when it is swapped in.
+    """
+
+    def __init__(self, max_bytes=PREDICTION_CACHE_MAX_BYTES, ttl=PREDICTION_CACHE_TTL):
+        self.entry_bytes = _entry_bytes()
+        self.max_entries = max(0, max_bytes // self.entry_bytes)
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def key(self, model_id, text):
+        digest = hashlib.blake2b(normalize_text(text).encode("utf-8"), digest_size=_DIGEST_SIZE).digest()
+        return model_id, digest
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            score, expires_at = entry
+            if expires_at <= now:
+                del self._entries[key]
+                self._stats["expired"] += 1
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return score
+
+    def put(self, key, score):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (float(score), time.time() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["bytes"] = stats["entries"] * self.entry_bytes
+        stats["max_entries"] = self.max_entries
+        return stats
@@ -1,62 +1,191 @@
+import hashlib
+import io
 import zipfile
 import os
-import requests
-from bs4 import BeautifulSoup
 import re 
-from sklearn.feature_extraction.text import TfidfVectorizer
+import threading
+from fetcher import Fetcher
+from extract import EXTRACT_ENGINE, clean_text, extract_text
+
+# Scraping concurrency: total in-flight requests, requests per host, retries per URL.
+SCRAPE_WORKERS = int(os.environ.get("SCRAPE_WORKERS", 16))
+SCRAPE_PER_HOST = int(os.environ.get("SCRAPE_PER_HOST", 4))
+SCRAPE_RETRIES = int(os.environ.get("SCRAPE_RETRIES", 2))
+
+
+# scheme, host, path, query; the fragment is dropped. A regex is several
+# times cheaper than urlsplit/urlunsplit across millions of lines.
+URL_PATTERN = re.compile(r'(https?)://([^/?#\s]+)([^?#\s]*)(\?[^#\s]*)?(?:#\S*)?', re.IGNORECASE)
+
+
+def normalize_url(line):
+    """
+    Canonical form of one line of a URL list: surrounding whitespace and
+    the fragment are dropped and the scheme and host lowercased. Returns
+    None for blank lines, comments and anything that isn't http(s).
+    """
+    match = URL_PATTERN.fullmatch(line.strip())
+    if match is None:
+        return None
+    scheme, host, path, query = match.groups()
+    return f"{scheme.lower()}://{host.lower()}{path or '/'}{query or ''}"
+
+
+def _is_url_member(info):
+    # Skip directories and the resource-fork copies macOS adds to archives.
+    name = info.filename
+    return not info.is_dir() and not name.startswith("__MACOSX/") and not os.path.basename(name).startswith(".")
+
+
+def iter_urls(zip_path):
+    """
+    Streams normalized, de-duplicated URLs straight out of the archive's
+    members, one line at a time, without extracting anything to disk.
+    Only an 8-byte digest per URL is kept to recognise duplicates.
+    """
+    seen = set()
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        for info in zip_ref.infolist():
+            if not _is_url_member(info):
+                continue
+            with zip_ref.open(info) as raw:
+                for line in io.TextIOWrapper(raw, encoding="utf-8", errors="replace"):
+                    url = normalize_url(line)
+                    if url is None:
+                        continue
+                    key = hashlib.blake2b(url.encode(), digest_size=8).digest()
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                    yield url
 
 
-def extract_urls(zip_path, extract_dir="temp_urls"):
-    os.makedirs(extract_dir, exist_ok=True)
-    urls = []
-    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-        zip_ref.extractall(extract_dir)
+def count_urls(zip_path):
+    # A cheap first pass for progress totals: nothing but the digests is kept.
+    return sum(1 for _ in iter_urls(zip_path))
 
-    for item in os.listdir(extract_dir):
-        item_path = os.path.join(extract_dir, item)
-        # Only process if it's a file
-        if os.path.isfile(item_path):
-            with open(item_path, 'r') as f:
-                urls.extend([line.strip() for line in f if line.strip()])
-    return urls
 
+def extract_urls(zip_path):
+    return list(iter_urls(zip_path))
 
-def clean_text(text):
 
-    text = re.sub(r'\s+', ' ', text)                      # Collapse multiple spaces
-    text = re.sub(r'[^a-zA-Z0-9.,!?;:()\'" ]', '', text)   # Remove unecessary symbols
-    text = text.strip()
-    return text
+class ScrapeStats:
+    """Thread-safe tally of scrape outcomes per domain, reported with training results."""
 
+    def __init__(self):
+        self._counts = {}
+        self._lock = threading.Lock()
 
-def scrape_url(url):
-    print(f" Scraping URL: {url}")
-    headers = {
-        'User-Agent': 'Mozilla/5.0'
-                      'Chrome/119.0.0.0'
-    }
+    def record(self, url, outcome):
+        match = URL_PATTERN.match(url)
+        domain = match.group(2).lower() if match else "invalid"
+        with self._lock:
+            outcomes = self._counts.setdefault(domain, {})
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
 
-    try:
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
+    def as_dict(self):
+        with self._lock:
+            return {domain: dict(outcomes) for domain, outcomes in self._counts.items()}
 
-        title = soup.title.string.strip()
-        print(f" Scraped: {title}")
 
-        text = soup.get_text(separator=' ', strip=True)
-        return clean_text(text)
+def parse_html(html, engine=None):
+    return extract_text(html, engine)
 
-    except Exception as e:
-        print(f" Failed to scrape {url}: {e}")
+
+def _cached_text(entry):
+    # Entries extracted by another engine are re-extracted from their stored HTML.
+    if entry.get("engine") == EXTRACT_ENGINE:
+        return entry["text"]
+    try:
+        return parse_html(entry["html"])
+    except Exception:
         return ""
 
 
-def scrape_urls(urls):
-    return [scrape_url(url) for url in urls]
+def scrape_url(url, fetcher=None, cache=None, offline=False, stats=None):
+    print(f" Scraping URL: {url}")
+    record = stats.record if stats is not None else (lambda url, outcome: None)
+    entry = cache.get(url) if cache is not None else None
+    if entry is not None and (offline or cache.is_fresh(entry)):
+        print(f" Cache hit: {url}")
+        record(url, "cache_hit")
+        return _cached_text(entry)
+    if offline:
+        print(f" Offline cache miss: {url}")
+        record(url, "offline_miss")
+        return ""
+
+    own_fetcher = fetcher is None
+    if own_fetcher:
+        fetcher = Fetcher(max_workers=1, retries=0)
 
+    try:
+        headers = cache.revalidation_headers(entry) if cache is not None else None
+        response = fetcher.get(url, headers=headers)
+        if response.status_code == 304 and entry is not None:
+            print(f" Not modified: {url}")
+            cache.touch(url, entry)
+            record(url, "not_modified")
+            return _cached_text(entry)
+        response.raise_for_status()
 
-def encode_texts(texts):
-    vectorizer = TfidfVectorizer(max_features=5000)
-    X = vectorizer.fit_transform(texts)
-    return X, vectorizer
\ No newline at end of file
+        html = response.text
+        engine = EXTRACT_ENGINE
+        try:
+            text = parse_html(html)
+            print(f" Scraped: {url}")
+            record(url, "success")
+        except Exception as e:
+            print(f" Failed to parse {url}: {e}")
+            record(url, "parse_error")
+            text = ""
+            # Cached without an engine, so reads re-parse the HTML rather than
+            # serve "" until the page changes and its ETag no longer matches.
+            engine = None
+        if cache is not None:
+            cache.put(url, html, text,
+                      etag=response.headers.get("ETag"),
+                      last_modified=response.headers.get("Last-Modified"),
+                      engine=engine)
+        return text
+
+    except Exception as e:
+        print(f" Failed to scrape {url}: {e}")
+        record(url, "failure")
+        return ""
+    finally:
+        if own_fetcher:
+            fetcher.close()
+
+
+def iter_scraped(urls, max_workers=SCRAPE_WORKERS, per_host=SCRAPE_PER_HOST, retries=SCRAPE_RETRIES,
+                 cache=None, offline=False, progress=None, total=None, stats=None):
+    """
+    Lazily scrapes an iterable of URLs, yielding texts in input order.
+    URLs are pulled from the iterable only as in-flight slots free up, so
+    a generator of millions of URLs never gets materialized.
+    """
+    if offline and cache is None:
+        raise ValueError("Offline scraping requires a page cache.")
+
+    done = [0]
+    lock = threading.Lock()
+
+    def scrape(url):
+        text = scrape_url(url, fetcher, cache, offline, stats)
+        if progress is not None:
+            with lock:
+                done[0] += 1
+                count = done[0]
+            progress(count, total)
+        return text
+
+    with Fetcher(max_workers=max_workers, per_host=per_host, retries=retries) as fetcher:
+        yield from fetcher.imap(scrape, urls)
+
+
+def scrape_urls(urls, max_workers=SCRAPE_WORKERS, per_host=SCRAPE_PER_HOST, retries=SCRAPE_RETRIES,
+                cache=None, offline=False, progress=None, stats=None):
+    # Fetch concurrently but keep results aligned with the input URL order.
+    return list(iter_scraped(urls, max_workers, per_host, retries, cache=cache, offline=offline,
+                             progress=progress, total=len(urls), stats=stats))
@@ -0,0 +1,302 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from urllib.request import pathname2url
+
+# Absolute so every worker (and any cwd) opens the same database file.
+DATABASE = os.path.abspath(os.environ.get("DATABASE", os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                                   "app.db")))
+# How long a writer waits for another worker's transaction before giving up.
+DATABASE_TIMEOUT = float(os.environ.get("DATABASE_TIMEOUT", 30))
+
+SCHEMA_VERSION = 2
+_JSON_COLUMNS = ("metrics", "feature_config")
+_JOB_COLUMNS = ("id", "status", "created_at", "started_at", "finished_at", "stage", "progress", "stages",
+                "result", "error")
+_JOB_JSON_COLUMNS = ("progress", "stages", "result")
+
+
+def file_checksum(file_path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _json_default(value):
+    # numpy scalars and arrays in job results.
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _migrate_v1(conn, base_dir):
+    # Registry columns on top of the original models table, plus the
+    # activation history used by rollback.
+    columns = {row["name"] for row in conn.execute("PRAGMA table_info(models)")}
+    for name, decl in [("status", "TEXT NOT NULL DEFAULT 'inactive'"), ("version", "INTEGER"),
+                       ("threshold", "REAL"), ("metrics", "TEXT"), ("feature_config", "TEXT"),
+                       ("checksum", "TEXT"), ("compiled_file", "TEXT"), ("n_documents", "INTEGER"),
+                       ("activated_at", "TEXT")]:
+        if name not in columns:
+            conn.execute(f"ALTER TABLE models ADD COLUMN {name} {decl}")
+    conn.execute('''CREATE TABLE IF NOT EXISTS activations (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        model_id INTEGER NOT NULL REFERENCES models(id),
+                        activated_at TEXT NOT NULL,
+                        rolled_back INTEGER NOT NULL DEFAULT 0
+                    )''')
+    # At most one active row, and it is found through the index.
+    conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS models_active ON models(status) WHERE status = 'active'")
+    conn.execute("CREATE INDEX IF NOT EXISTS models_name_version ON models(name, version)")
+    conn.execute("CREATE INDEX IF NOT EXISTS activations_open ON activations(rolled_back, id)")
+
+    # Existing rows: number versions per name and checksum the artifacts still
+    # on disk. Each one was served in turn after training, so replay that as
+    # the activation history and keep serving the latest.
+    rows = conn.execute("SELECT id, name, file_path, training_date FROM models ORDER BY id").fetchall()
+    versions = {}
+    for row in rows:
+        versions[row["name"]] = versions.get(row["name"], 0) + 1
+        path = row["file_path"]
+        if path and not os.path.isabs(path):
+            path = os.path.join(base_dir, path)
+        checksum = file_checksum(path) if path and os.path.exists(path) else None
+        conn.execute("UPDATE models SET version = ?, checksum = COALESCE(checksum, ?) WHERE id = ?",
+                     (versions[row["name"]], checksum, row["id"]))
+        conn.execute("INSERT INTO activations (model_id, activated_at) VALUES (?, ?)",
+                     (row["id"], row["training_date"] or datetime.now().isoformat()))
+    if rows:
+        conn.execute("UPDATE models SET status = 'active', activated_at = training_date WHERE id = ?",
+                     (rows[-1]["id"],))
+
+
+def _migrate_v2(conn, base_dir):
+    # Background jobs, so every API worker can report on a job any of them started.
+    conn.execute('''CREATE TABLE IF NOT EXISTS jobs (
+                        id TEXT PRIMARY KEY,
+                        status TEXT NOT NULL,
+                        created_at REAL NOT NULL,
+                        started_at REAL,
+                        finished_at REAL,
+                        stage TEXT,
+                        progress TEXT,
+                        stages TEXT,
+                        result TEXT,
+                        error TEXT
+                    )''')
+    conn.execute("CREATE INDEX IF NOT EXISTS jobs_created ON jobs(created_at)")
+
+
+_MIGRATIONS = [_migrate_v1, _migrate_v2]
+
+
+class ModelRegistry:
+    """
+    SQLite-backed catalogue of trained models: artifact paths and checksums,
+    threshold, training metrics and feature configuration per version, and
+    which version is active. Each thread keeps one WAL-mode connection, so
+    readers never block on a training job's write and several uvicorn
+    workers can share the file. Writes run in BEGIN IMMEDIATE transactions;
+    the partial unique index on status keeps exactly one model active.
+    """
+
+    def __init__(self, path=DATABASE, timeout=DATABASE_TIMEOUT, readonly=False):
+        self.path = os.path.abspath(path)
+        self.base_dir = os.path.dirname(self.path)
+        self.timeout = timeout
+        self.readonly = readonly
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode: transactions are opened explicitly in _write.
+            if self.readonly:
+                # For tools that only read: never creates the file or changes its schema.
+                conn = sqlite3.connect(f"file:{pathname2url(self.path)}?mode=ro", uri=True, timeout=self.timeout,
+                                       isolation_level=None, check_same_thread=False)
+            else:
+                conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None,
+                                       check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            if not self.readonly:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _write(self, fn, *args):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn, *args)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
+
+    def _resolve(self, path):
+        if path and not os.path.isabs(path):
+            return os.path.join(self.base_dir, path)
+        return path
+
+    def _row(self, row):
+        if row is None:
+            return None
+        model = dict(row)
+        for key in _JSON_COLUMNS:
+            model[key] = json.loads(model[key]) if model.get(key) else None
+        model["file_path"] = self._resolve(model["file_path"])
+        model["compiled_file"] = self._resolve(model.get("compiled_file"))
+        return model
+
+    def schema_version(self):
+        return self._conn().execute("PRAGMA user_version").fetchone()[0]
+
+    def migrate(self):
+        """Creates the schema or upgrades an existing app.db in place."""
+        def run(conn):
+            conn.execute('''CREATE TABLE IF NOT EXISTS models (
+                                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                name TEXT,
+                                model_type TEXT,
+                                file_path TEXT,
+                                training_date TEXT
+                            )''')
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            for step in _MIGRATIONS[version:]:
+                step(conn, self.base_dir)
+            conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self._write(run)
+
+    def register(self, name, model_type, file_path, training_date=None, threshold=None, metrics=None,
+                 feature_config=None, compiled_file=None, n_documents=None, activate=True):
+        # Stored absolute: callers pass paths relative to their own working
+        # directory, which needn't be the database's. Only rows migrated from
+        # the legacy schema are relative (to the database directory).
+        file_path = os.path.abspath(file_path)
+        compiled_file = os.path.abspath(compiled_file) if compiled_file else None
+        checksum = file_checksum(file_path)  # hashed before taking the write lock
+
+        def run(conn):
+            version = conn.execute("SELECT COALESCE(MAX(version), 0) + 1 FROM models WHERE name = ?",
+                                   (name,)).fetchone()[0]
+            cursor = conn.execute(
+                "INSERT INTO models (name, model_type, file_path, training_date, version, threshold, metrics, "
+                "feature_config, checksum, compiled_file, n_documents) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (name, model_type, file_path, training_date or datetime.now().isoformat(), version, threshold,
+                 json.dumps(metrics) if metrics is not None else None,
+                 json.dumps(feature_config) if feature_config is not None else None,
+                 checksum, compiled_file, n_documents))
+            if activate:
+                self._activate(conn, cursor.lastrowid)
+            return cursor.lastrowid
+        return self._write(run)
+
+    def _activate(self, conn, model_id):
+        now = datetime.now().isoformat()
+        conn.execute("UPDATE models SET status = 'inactive' WHERE status = 'active'")
+        conn.execute("UPDATE models SET status = 'active', activated_at = ? WHERE id = ?", (now, model_id))
+        conn.execute("INSERT INTO activations (model_id, activated_at) VALUES (?, ?)", (model_id, now))
+
+    def get(self, model_id):
+        return self._row(self._conn().execute("SELECT * FROM models WHERE id = ?", (model_id,)).fetchone())
+
+    def active(self):
+        return self._row(self._conn().execute("SELECT * FROM models WHERE status = 'active'").fetchone())
+
+    def active_id(self):
+        # Cheap enough to poll: one lookup on the partial index, no JSON decoding.
+        row = self._conn().execute("SELECT id FROM models WHERE status = 'active'").fetchone()
+        return row[0] if row else None
+
+    def list(self, limit=100, offset=0):
+        rows = self._conn().execute("SELECT * FROM models ORDER BY id DESC LIMIT ? OFFSET ?", (limit, offset))
+        return [self._row(row) for row in rows]
+
+    def verify(self, model_id):
+        """True if the artifact on disk still matches the checksum taken at registration."""
+        model = self.get(model_id)
+        if model is None or not os.path.exists(model["file_path"]):
+            return False
+        return model["checksum"] is None or file_checksum(model["file_path"]) == model["checksum"]
+
+    def activate(self, model_id):
+        def run(conn):
+            if conn.execute("SELECT 1 FROM models WHERE id = ?", (model_id,)).fetchone() is None:
+                raise KeyError(model_id)
+            self._activate(conn, model_id)
+        self._write(run)
+        return self.get(model_id)
+
+    def rollback_target(self):
+        """The model rollback() would activate, or None if there is nothing to go back to."""
+        return self._rollback_target(self._conn())
+
+    def _rollback_target(self, conn):
+        history = conn.execute("SELECT id, model_id FROM activations WHERE rolled_back = 0 ORDER BY id DESC").fetchall()
+        current = self.active_id()
+        for row in history[1:]:
+            if row["model_id"] != current:
+                return self.get(row["model_id"])
+        return None
+
+    def rollback(self):
+        """
+        Reactivates the model that was active before the current one. Rolled
+        back activations leave the history, so repeated calls keep walking
+        back rather than toggling between two versions.
+        """
+        def run(conn):
+            target = self._rollback_target(conn)
+            if target is None:
+                raise ValueError("No earlier model to roll back to.")
+            now = datetime.now().isoformat()
+            latest = conn.execute("SELECT id FROM activations WHERE model_id = ? AND rolled_back = 0 "
+                                  "ORDER BY id DESC LIMIT 1", (target["id"],)).fetchone()[0]
+            conn.execute("UPDATE activations SET rolled_back = 1 WHERE rolled_back = 0 AND id > ?", (latest,))
+            conn.execute("UPDATE models SET status = 'inactive' WHERE status = 'active'")
+            conn.execute("UPDATE models SET status = 'active', activated_at = ? WHERE id = ?", (now, target["id"]))
+            return target["id"]
+        return self.get(self._write(run))
+
+    def save_job(self, job):
+        """Inserts or replaces a background job's row (see jobs.JobManager)."""
+        values = [json.dumps(job.get(key), default=_json_default) if key in _JOB_JSON_COLUMNS else job.get(key)
+                  for key in _JOB_COLUMNS]
+        self._write(lambda conn: conn.execute(
+            f"INSERT OR REPLACE INTO jobs ({', '.join(_JOB_COLUMNS)}) VALUES ({', '.join('?' * len(_JOB_COLUMNS))})",
+            values))
+
+    def _job(self, row):
+        if row is None:
+            return None
+        job = dict(row)
+        for key in _JOB_JSON_COLUMNS:
+            job[key] = json.loads(job[key]) if job[key] else None
+        return job
+
+    def get_job(self, job_id):
+        return self._job(self._conn().execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def list_jobs(self, limit=100):
+        rows = self._conn().execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,))
+        return [self._job(row) for row in rows]
+
+    def close(self):
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
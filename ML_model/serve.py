@@ -0,0 +1,46 @@
+"""
+Runs the API under several uvicorn worker processes sharing one listening
+socket. Each worker memory-maps the active model's compiled artifact, so
+the weights are held once in the page cache however many workers run.
+
+    python serve.py --workers 4 --port 8000
+
+Prefer this over `uvicorn --workers`: uvicorn binds that socket without
+IPPROTO_TCP, so asyncio skips TCP_NODELAY on accepted connections and
+small responses wait ~40 ms for delayed ACKs.
+"""
+import argparse
+import socket
+
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+
+def bind_socket(host, port):
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM, socket.IPPROTO_TCP)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.set_inheritable(True)
+    return sock
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the API with several worker processes")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--no-access-log", action="store_true")
+    args = parser.parse_args()
+
+    config = uvicorn.Config("main_api:app", host=args.host, port=args.port, workers=args.workers,
+                            log_level=args.log_level, access_log=not args.no_access_log)
+    if args.workers == 1:
+        uvicorn.Server(config).run()
+    else:
+        Multiprocess(config, sockets=[bind_socket(args.host, args.port)]).run()
+
+
+if __name__ == "__main__":
+    main()
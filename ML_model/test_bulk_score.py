@@ -0,0 +1,92 @@
+import json
+import os
+import sqlite3
+
+import numpy as np
+import pytest
+
+from bulk_score import bulk_score, resolve_model
+from inference import score_matrix
+from model_cache import load_serving_bundle
+from registry import ModelRegistry
+
+MODEL_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "svm_model.pkl")
+TEXTS = ["Flood waters forced evacuations across the county", "Quarterly earnings beat expectations",
+         "Police responded to a shooting near the school", "The recipe calls for two cups of flour",
+         "Wildfire smoke closed highways overnight", "", "Storm damage left thousands without power"]
+
+
+def read_output(output_dir):
+    lines = []
+    for name in sorted(os.listdir(output_dir)):
+        if name.startswith("part-"):
+            with open(os.path.join(output_dir, name)) as f:
+                lines.extend(json.loads(line) for line in f)
+    return lines
+
+
+def write_jsonl(path, rows):
+    with open(path, "w") as f:
+        for row in rows:
+            f.write(json.dumps(row) + "\n")
+    return str(path)
+
+
+def test_scores_texts_in_shards_and_resumes(tmp_path):
+    input_path = write_jsonl(tmp_path / "texts.jsonl", [{"id": f"doc{i}", "text": t} for i, t in enumerate(TEXTS)])
+    output_dir = str(tmp_path / "out")
+    report = bulk_score(input_path, output_dir, model_file=MODEL_FILE, workers=2, shard_size=3)
+
+    assert report["documents"] == 7 and report["errors"] == 1 and report["shards"] == 3
+    assert {"read", "vectorize", "svd", "score", "write"} <= set(report["stage_seconds"])
+    lines = read_output(output_dir)
+    assert [line["id"] for line in lines] == [f"doc{i}" for i in range(7)]
+    assert lines[5] == {"id": "doc5", "status": "error", "error": "empty_text"}
+    expected = score_matrix(load_serving_bundle(MODEL_FILE), [t for t in TEXTS if t])
+    np.testing.assert_allclose([line["score"] for line in lines if line["status"] == "ok"], expected)
+
+    # A crash mid-run: one shard never finished and left a temporary file behind.
+    os.rename(os.path.join(output_dir, "part-00001.jsonl"), os.path.join(output_dir, "part-00001.jsonl.tmp"))
+    report = bulk_score(input_path, output_dir, model_file=MODEL_FILE, workers=1, shard_size=3)
+    assert report["shards"] == 1 and report["skipped_shards"] == 2 and report["documents"] == 3
+    assert read_output(output_dir) == lines
+    assert not any(name.endswith(".tmp") for name in os.listdir(output_dir))
+
+    with pytest.raises(ValueError):
+        bulk_score(input_path, output_dir, model_file=MODEL_FILE, workers=1, shard_size=4)
+
+
+def test_scores_url_lists(tmp_path, server):
+    base_url, _ = server
+    input_path = tmp_path / "urls.txt"
+    input_path.write_text(f"{base_url}/storm\n{base_url}/missing\n\n{base_url}/flood\n")
+    report = bulk_score(str(input_path), str(tmp_path / "out"), model_file=MODEL_FILE, workers=1,
+                        cache_dir=str(tmp_path / "pages"))
+
+    lines = read_output(str(tmp_path / "out"))
+    assert [line["url"] for line in lines] == [f"{base_url}/storm", f"{base_url}/missing", f"{base_url}/flood"]
+    assert [line["status"] for line in lines] == ["ok", "error", "ok"]
+    assert report["scrape_outcomes"] == {"success": 2, "failure": 1}
+    assert "scrape" in report["stage_seconds"]
+
+
+def test_reads_the_registry_without_migrating_it(tmp_path):
+    database = str(tmp_path / "app.db")
+    with pytest.raises(ValueError, match="no registry"):
+        resolve_model(database=database)
+    assert not os.path.exists(database)
+
+    conn = sqlite3.connect(database)
+    conn.execute("CREATE TABLE models (id INTEGER PRIMARY KEY, name TEXT, model_type TEXT, file_path TEXT, "
+                 "training_date TEXT)")
+    conn.commit()
+    with pytest.raises(ValueError, match="migrate"):
+        resolve_model(database=database)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == 0  # left as it was
+    conn.close()
+
+    registry = ModelRegistry(database)
+    registry.migrate()
+    registry.register("svm_model", "svm", MODEL_FILE)
+    registry.close()
+    assert resolve_model(database=database) == MODEL_FILE
@@ -0,0 +1,37 @@
+import asyncio
+
+import pytest
+
+from coalescer import Coalescer
+
+
+def run(coalescer, items):
+    async def main():
+        return await asyncio.gather(*(coalescer.submit(item) for item in items))
+    return asyncio.run(main())
+
+
+def test_concurrent_calls_share_batches():
+    batches = []
+    def batch_fn(items):
+        batches.append(list(items))
+        return [item * 10 for item in items]
+
+    results = run(Coalescer(batch_fn, window=0.01, max_batch=4), list(range(10)))
+    assert results == [item * 10 for item in range(10)]
+    # The first item goes out alone (idle scorer); the rest queue behind it.
+    assert [len(batch) for batch in batches] == [1, 4, 4, 1]
+
+
+def test_errors_reach_every_caller():
+    def batch_fn(items):
+        raise RuntimeError("model missing")
+
+    with pytest.raises(RuntimeError):
+        run(Coalescer(batch_fn, window=0.001), [1, 2, 3])
+
+
+def test_reusable_across_event_loops():
+    coalescer = Coalescer(lambda items: [-item for item in items], window=0.001)
+    assert run(coalescer, [1, 2]) == [-1, -2]
+    assert run(coalescer, [3]) == [-3]
@@ -0,0 +1,132 @@
+import os
+import pickle
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pytest
+
+from compiled import CompiledScorer, export_bundle, load_arrays, write_aligned_npz
+from features import fit_features
+from inference import score_matrix
+import model_cache
+from model_cache import load_bundle as real_load_bundle, load_serving_bundle
+from models import get_model
+from training import normalize_vectors, reduce_dimensionality
+from test_features import CORPUS, NEW_TEXTS
+
+
+def train_bundle(model_type="svm"):
+    texts = CORPUS * 3
+    X, vectorizer, top_terms = fit_features(texts, n_terms=40)
+    X_reduced, svd = reduce_dimensionality(X, n_components=8)
+    model = get_model(model_type)
+    model.fit(normalize_vectors(X_reduced))
+    return {"model": model, "vectorizer": vectorizer, "svd": svd, "top_terms": top_terms, "threshold": -0.25}
+
+
+@pytest.fixture(scope="module")
+def bundle():
+    return train_bundle()
+
+
+@pytest.mark.parametrize("mmap", [True, False])
+def test_compiled_scores_match_sklearn(bundle, tmp_path, mmap):
+    path = export_bundle(bundle, str(tmp_path / "model.npz"))
+    scorer = CompiledScorer.load(path, mmap=mmap)
+    texts = CORPUS + NEW_TEXTS + ["", "STORM Flood!! storm"]
+    np.testing.assert_allclose(scorer.score_texts(texts), score_matrix(bundle, texts), rtol=1e-9, atol=1e-9)
+    assert scorer["threshold"] == -0.25
+
+
+def test_compiled_approx_model_matches_sklearn(tmp_path):
+    bundle = train_bundle("svm-approx")
+    scorer = CompiledScorer.load(export_bundle(bundle, str(tmp_path / "model.npz")))
+    texts = CORPUS + NEW_TEXTS + ["", "STORM Flood!! storm"]
+    np.testing.assert_allclose(scorer.score_texts(texts), score_matrix(bundle, texts), rtol=1e-9, atol=1e-9)
+
+
+def test_vocabulary_lookup(bundle, tmp_path):
+    scorer = CompiledScorer.load(export_bundle(bundle, str(tmp_path / "model.npz")))
+    for term, index in bundle["vectorizer"].vocabulary_.items():
+        assert scorer.lookup(term) == index
+    assert scorer.lookup("notaterm") == -1
+
+
+def test_version_1_artifacts_still_load(bundle, tmp_path):
+    path = export_bundle(bundle, str(tmp_path / "model.npz"))
+    arrays = load_arrays(path, mmap=False)
+    assert int(arrays["format_version"]) == 2 and "hash_table" not in arrays
+    # Version 1 also stored an (unused) term hash table.
+    write_aligned_npz(str(tmp_path / "v1.npz"), dict(arrays, format_version=np.array(1),
+                                                     hash_table=np.full(8, -1, dtype=np.int32)))
+    texts = CORPUS + NEW_TEXTS
+    np.testing.assert_array_equal(CompiledScorer.load(str(tmp_path / "v1.npz")).score_texts(texts),
+                                  CompiledScorer.load(path).score_texts(texts))
+
+
+def test_unsupported_model_is_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        export_bundle(train_bundle("iforest"), str(tmp_path / "model.npz"))
+
+
+@pytest.mark.parametrize("setting", [
+    {"token_pattern": r"(?u)\b\w+\b"}, {"analyzer": "char"}, {"tokenizer": str.split},
+    {"preprocessor": str.lower}, {"strip_accents": "unicode"}, {"binary": True}, {"stop_words": "english"},
+])
+def test_non_default_vectorizer_is_rejected(bundle, tmp_path, setting):
+    # The compiled tokenizer can't reproduce these, so scores would silently differ.
+    vectorizer = pickle.loads(pickle.dumps(bundle["vectorizer"]))
+    vectorizer.set_params(**setting)
+    with pytest.raises(ValueError, match=next(iter(setting))):
+        export_bundle(dict(bundle, vectorizer=vectorizer), str(tmp_path / "model.npz"))
+
+
+def test_scorer_does_not_import_sklearn(bundle, tmp_path):
+    path = export_bundle(bundle, str(tmp_path / "model.npz"))
+    code = (
+        "import sys\n"
+        "from compiled import CompiledScorer\n"
+        f"CompiledScorer.load({path!r}).score_texts(['storm flood'])\n"
+        "assert 'sklearn' not in sys.modules, 'sklearn was imported'\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize("serving_format", ["mmap", "copy", "pickle"])
+def test_serving_formats_export_on_first_load(bundle, tmp_path, serving_format):
+    model_path = tmp_path / "svm_model.pkl"
+    with open(model_path, "wb") as f:
+        pickle.dump(bundle, f)
+    served = load_serving_bundle(str(model_path), serving_format=serving_format)
+
+    if serving_format == "pickle":
+        assert isinstance(served, dict) and not (tmp_path / "svm_model.npz").exists()
+        return
+    # The compiled artifact is written next to the pickle on first load.
+    assert (tmp_path / "svm_model.npz").exists()
+    assert isinstance(served.support_vectors, np.memmap) == (serving_format == "mmap")
+    assert isinstance(served._sv_sq_norms, np.memmap) == (serving_format == "mmap")
+    texts = CORPUS + NEW_TEXTS
+    np.testing.assert_allclose(served.score_texts(texts), score_matrix(bundle, texts), rtol=1e-9, atol=1e-9)
+
+
+def test_uncompilable_model_is_served_from_pickle(tmp_path, monkeypatch):
+    model_path = tmp_path / "iforest_model.pkl"
+    with open(model_path, "wb") as f:
+        pickle.dump(train_bundle("iforest"), f)
+    loads = []
+    monkeypatch.setattr(model_cache, "load_bundle", lambda path: loads.append(path) or real_load_bundle(path))
+    assert isinstance(load_serving_bundle(str(model_path)), dict)
+    assert sorted(os.listdir(tmp_path)) == ["iforest_model.npz.unsupported", "iforest_model.pkl"]
+    assert len(loads) == 1  # the bundle that failed to export is the one served
+
+    # Later loads don't retry the export, until the model file is replaced.
+    exports = []
+    monkeypatch.setattr(model_cache, "_export_compiled", lambda *args: exports.append(args) or False)
+    assert isinstance(load_serving_bundle(str(model_path)), dict)
+    assert len(loads) == 2 and not exports
+    os.utime(model_path, (time.time() + 10, time.time() + 10))
+    load_serving_bundle(str(model_path))
+    assert len(exports) == 1
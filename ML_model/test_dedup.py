@@ -0,0 +1,104 @@
+import os
+import random
+import shutil
+
+from fastapi.testclient import TestClient
+
+import dedup
+import main_api
+from dedup import MinHasher, NearDuplicateIndex, dedup_path
+from registry import ModelRegistry
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+WORDS = ("flood storm shelter rescue county officials residents evacuation damage river levee power outage "
+         "governor emergency crews road closed bridge school students police fire wind rain").split()
+
+
+def article(seed, n_words=200):
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) + str(rng.randint(0, 50)) for _ in range(n_words))
+
+
+def edited(text, fraction, seed=0):
+    # Replaces a fraction of the words, like a lightly rewritten syndicated copy.
+    rng = random.Random(seed)
+    words = text.split()
+    for i in rng.sample(range(len(words)), int(len(words) * fraction)):
+        words[i] = "edited" + str(i)
+    return " ".join(words)
+
+
+def test_signature_ignores_case_and_punctuation():
+    hasher = MinHasher()
+    text = article(0)
+    assert (hasher.signature(text) == hasher.signature(text.upper().replace(" ", ", "))).all()
+    assert hasher.signature("") is None and hasher.signature("a ! ?") is None
+
+
+def test_collapses_near_duplicates_and_keeps_distinct_articles():
+    index = NearDuplicateIndex()
+    originals = [article(i) for i in range(50)]
+    assert all(index.add(text, f"https://news.example/{i}") is None for i, text in enumerate(originals))
+
+    doc_id, similarity = index.add(edited(originals[7], 0.02), "https://copy.example/7")
+    assert index.label(doc_id) == "https://news.example/7" and similarity >= index.threshold
+    assert index.lookup(article(1000)) is None
+    assert index.add("", "https://empty.example") is None
+    assert len(index) == 50
+
+
+def test_save_and_load_roundtrip(tmp_path, monkeypatch):
+    monkeypatch.setattr(dedup, "FREEZE_EVERY", 16)  # exercise both frozen arrays and dicts
+    index = NearDuplicateIndex()
+    texts = [article(i) for i in range(40)]
+    for i, text in enumerate(texts):
+        index.add(text, f"https://news.example/{i}")
+
+    path = index.save(str(tmp_path / "model.dedup.npz"))
+    for mmap in (True, False):
+        loaded = NearDuplicateIndex.load(path, mmap=mmap)
+        assert len(loaded) == 40
+        for i in (0, 20, 39):
+            doc_id, _ = loaded.lookup(edited(texts[i], 0.02))
+            assert loaded.label(doc_id) == f"https://news.example/{i}"
+
+    # A copy loaded into memory keeps growing, as incremental training needs.
+    loaded = NearDuplicateIndex.load(path, mmap=False)
+    assert loaded.add(article(500), "https://news.example/500") is None
+    assert loaded.lookup(article(500)) == (40, 1.0)
+
+
+def test_predict_flags_seen_stories(tmp_path, monkeypatch):
+    model_file = str(tmp_path / "svm_model.pkl")
+    shutil.copy(os.path.join(MODEL_DIR, "svm_model.pkl"), model_file)
+    shutil.copy(os.path.join(MODEL_DIR, "svm_model.npz"), tmp_path / "svm_model.npz")
+    seen = article(3)
+    index = NearDuplicateIndex()
+    index.add(seen, "https://news.example/3")
+    index.save(dedup_path(model_file))
+
+    registry = ModelRegistry(str(tmp_path / "app.db"))
+    registry.migrate()
+    registry.register("svm_model", "svm", model_file)
+    monkeypatch.setattr(main_api, "registry", registry)
+    monkeypatch.setattr(main_api, "_registry_active_id", None)
+    main_api.model_cache.clear()
+    main_api.get_dedup_index.cache_clear()
+    client = TestClient(main_api.app)
+
+    response = client.post("/predict", json={"text": edited(seen, 0.02), "check_duplicate": True}).json()
+    assert response["duplicate"]["url"] == "https://news.example/3"
+    assert "duplicate" not in client.post("/predict", json={"text": seen}).json()
+
+    response = client.post("/predict/batch", json={"texts": [seen, article(4)], "check_duplicates": True}).json()
+    assert [p["duplicate"] and p["duplicate"]["url"] for p in response["predictions"]] == \
+        ["https://news.example/3", None]
+
+    os.remove(dedup_path(model_file))
+    main_api.get_dedup_index.cache_clear()
+    assert client.post("/predict", json={"text": seen, "check_duplicate": True}).status_code == 404
+
+    registry.close()
+    main_api.model_cache.clear()
+    main_api.prediction_cache.clear()
+    main_api.get_dedup_index.cache_clear()
@@ -0,0 +1,45 @@
+import pytest
+
+from extract import clean_chunks, clean_text, extract_text
+
+PAGE = """<!DOCTYPE html>
+<html><head><title>Storm &amp; Flood</title><style>p { color: red; }</style>
+<script>var x = "<p>not text</p>";</script></head>
+<body>
+<header><a href="/">Home</a> | <a href="/news">News</a></header>
+<nav><ul><li>Weather</li><li>Sports</li></ul></nav>
+<main><article>
+  <h1>Flood warnings issued</h1>
+  <p>The storm&nbsp;dropped 10&quot; of rain; residents <b>evac</b>uated &mdash; officials said.</p>
+  <p>Café owners — “shocked” – cleaned up.<br/>More later.</p>
+</article></main>
+<aside>Related: Top 10 recipes</aside>
+<footer>&copy; 2024 Example News. Subscribe!</footer>
+</body></html>"""
+
+
+@pytest.mark.parametrize("text", ["a  -  b", "café\t\n x", " (ok)?! \"q\" 'r' ", "——", ""])
+def test_clean_chunks_matches_clean_text_tokens(text):
+    assert clean_chunks([text]) == " ".join(clean_text(text).split())
+
+
+def test_fast_engine_matches_bs4():
+    assert extract_text(PAGE, "fast").split() == extract_text(PAGE, "bs4").split()
+
+
+def test_content_engine_drops_boilerplate():
+    text = extract_text(PAGE, "content")
+    assert text.startswith("Storm Flood Flood warnings issued")
+    assert "evac uated" in text and "More later." in text
+    for boilerplate in ["Home", "Weather", "recipes", "Subscribe", "not text", "color"]:
+        assert boilerplate not in text
+
+
+def test_content_engine_without_main_keeps_body():
+    html = "<html><body><nav>Menu</nav><p>Wildfire spreads</p><footer>About</footer></body></html>"
+    assert extract_text(html, "content") == "Wildfire spreads"
+
+
+def test_unknown_engine():
+    with pytest.raises(ValueError):
+        extract_text(PAGE, "nope")
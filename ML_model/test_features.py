@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from features import encode_texts, encode_texts_with_selected_terms, fit_features
+from visualizations import get_top_terms_by_tfidf
+
+CORPUS = [
+    "Police said the shooting suspect fled the high school before officers arrived.",
+    "The hurricane forced thousands to evacuate as flood water rose across the county.",
+    "Firefighters battled the wildfire overnight while residents waited in shelters.",
+    "Officials confirmed the earthquake damaged the hospital and cut power to the city.",
+    "The governor declared a state of emergency after the storm destroyed homes.",
+    "Rescue crews searched the collapsed building for survivors after the explosion.",
+    "",
+    "The and of to in",
+    "Students and teachers were evacuated after the school shooting; police investigated.",
+    "Flood warnings remain in effect as the storm moves north toward the coast.",
+]
+NEW_TEXTS = ["A storm and flood hit the coast", "shooting at the school", "unrelated words only"]
+
+
+def two_pass(texts, n_terms):
+    X_raw, vectorizer_full = encode_texts(texts)
+    top_terms = get_top_terms_by_tfidf(X_raw, vectorizer_full, n_terms=n_terms)
+    X, vectorizer = encode_texts_with_selected_terms(texts, top_terms)
+    return X, vectorizer, top_terms
+
+
+@pytest.mark.parametrize("n_terms", [5, 20, 300])
+def test_single_pass_matches_two_pass(n_terms):
+    X_expected, vectorizer_expected, terms_expected = two_pass(CORPUS, n_terms)
+    X, vectorizer, terms = fit_features(CORPUS, n_terms=n_terms)
+
+    assert terms == terms_expected
+    np.testing.assert_allclose(X.toarray(), X_expected.toarray(), atol=1e-12)
+    np.testing.assert_allclose(vectorizer.idf_, vectorizer_expected.idf_, atol=1e-12)
+    np.testing.assert_allclose(vectorizer.transform(NEW_TEXTS).toarray(),
+                               vectorizer_expected.transform(NEW_TEXTS).toarray(), atol=1e-12)
@@ -0,0 +1,57 @@
+import time
+
+from fetcher import Fetcher
+from processor import scrape_urls
+
+
+def test_scrape_urls_preserves_order(server):
+    base, _ = server
+    urls = [f"{base}/slow", f"{base}/a", f"{base}/missing", f"{base}/b"]
+    texts = scrape_urls(urls, max_workers=4, per_host=4, retries=0)
+    assert texts == ["slow Article slow body", "a Article a body", "", "b Article b body"]
+
+
+def test_per_host_limit_is_respected(server):
+    base, state = server
+    urls = [f"{base}/page{i}" for i in range(12)]
+    texts = scrape_urls(urls, max_workers=8, per_host=2, retries=0)
+    assert all(texts)
+    assert state["max_in_flight"] <= 2
+
+
+def test_retries_transient_errors(server):
+    base, state = server
+    with Fetcher(max_workers=1, retries=3, backoff=0.01) as fetcher:
+        response = fetcher.get(f"{base}/flaky")
+    assert response.status_code == 200
+    assert state["hits"]["/flaky"] == 3
+
+
+def test_gives_up_after_retries(server):
+    base, state = server
+    with Fetcher(max_workers=1, retries=1, backoff=0.01) as fetcher:
+        response = fetcher.get(f"{base}/flaky-twice")
+    assert response.status_code == 503
+    assert state["hits"]["/flaky-twice"] == 2
+
+
+def test_concurrent_is_faster_than_sequential(server):
+    base, _ = server
+    urls = [f"{base}/slow{i}" for i in range(8)]
+    start = time.perf_counter()
+    scrape_urls(urls, max_workers=8, per_host=8, retries=0)
+    assert time.perf_counter() - start < 8 * 0.3 / 2
+
+
+def test_imap_consumes_input_lazily():
+    pulled = []
+    def urls():
+        for i in range(100):
+            pulled.append(i)
+            yield f"http://example.invalid/{i}"
+
+    with Fetcher(max_workers=2) as fetcher:
+        results = fetcher.imap(lambda url: url, urls(), max_in_flight=4)
+        assert next(results) == "http://example.invalid/0"
+        assert len(pulled) <= 5
+        assert len(list(results)) == 99
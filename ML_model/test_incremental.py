@@ -0,0 +1,116 @@
+import os
+import pickle
+import random
+import zipfile
+
+import numpy as np
+import pytest
+from sklearn.base import clone
+from sklearn.decomposition import TruncatedSVD
+
+from features import encode_texts_with_selected_terms, fit_features
+import incremental
+from dedup import NearDuplicateIndex, dedup_path
+from incremental import _tfidf, update_bundle, update_from_zip
+from inference import score_matrix
+from models import get_model
+from training import normalize_vectors, reduce_dimensionality
+from test_features import CORPUS, NEW_TEXTS
+
+
+def train_bundle(texts):
+    X, vectorizer, top_terms, counts = fit_features(texts, n_terms=40, return_counts=True)
+    X_reduced, svd = reduce_dimensionality(X, n_components=8)
+    model = get_model("svm").fit(normalize_vectors(X_reduced))
+    return {"model": model, "vectorizer": vectorizer, "svd": svd, "top_terms": top_terms,
+            "threshold": -0.25, "alpha": 6, "counts": counts}
+
+
+def test_fixed_vocabulary_idf_matches_full_refit():
+    bundle = train_bundle(CORPUS)
+    updated, drift = update_bundle(bundle, NEW_TEXTS)
+
+    # IDF over old + new documents, restricted to the same terms, as a full refit would compute it.
+    _, expected = encode_texts_with_selected_terms(CORPUS + NEW_TEXTS, bundle["top_terms"])
+    np.testing.assert_allclose(updated["vectorizer"].idf_, expected.idf_, atol=1e-12)
+    assert updated["counts"].shape == (len(CORPUS) + len(NEW_TEXTS), len(bundle["top_terms"]))
+    assert updated["svd"].components_.shape == bundle["svd"].components_.shape
+    assert np.all(np.isfinite(score_matrix(updated, NEW_TEXTS)))
+    assert drift["added_terms"] == []
+    assert 0.0 <= drift["subspace_overlap"] <= 1.0 + 1e-9
+
+
+def topic_corpus(n_docs, topics, noise=0.1, seed=0):
+    # Eight 5-word topics: a corpus with a clear rank-8 structure plus noise words.
+    rng = random.Random(seed)
+    words = [[f"topic{t}word{i}" for i in range(5)] for t in range(8)]
+    vocabulary = sum(words, [])
+    return [" ".join(rng.choice(vocabulary) if rng.random() < noise else rng.choice(words[topic])
+                     for _ in range(30)) for topic in (topics(i, rng) for i in range(n_docs))]
+
+
+def test_low_rank_update_matches_fresh_svd():
+    old_texts = topic_corpus(160, lambda i, rng: i % 8)
+    # Skewed towards a few topics, so the IDF of every term shifts by up to ~25%.
+    new_texts = topic_corpus(80, lambda i, rng: rng.choice([0, 0, 0, 1, 2]), seed=1)
+    bundle = train_bundle(old_texts)
+    updated, _ = update_bundle(bundle, new_texts)
+
+    X_all = _tfidf(updated["counts"], updated["vectorizer"].idf_)
+    fresh = TruncatedSVD(n_components=8, algorithm="arpack").fit(X_all)
+    components = updated["svd"].components_
+    # Mean squared cosine between the two 8-dimensional subspaces.
+    assert np.sum((components @ fresh.components_.T) ** 2) / 8 > 0.999
+    np.testing.assert_allclose(updated["svd"].singular_values_, fresh.singular_values_, rtol=1e-3)
+
+    reference = dict(updated, svd=fresh,
+                     model=clone(bundle["model"]).fit(normalize_vectors(X_all @ fresh.components_.T)))
+    texts = new_texts + old_texts[:40]
+    assert np.corrcoef(score_matrix(updated, texts), score_matrix(reference, texts))[0, 1] > 0.99
+
+
+def test_extend_vocabulary_adds_new_terms():
+    bundle = train_bundle(CORPUS)
+    new_texts = ["Tornado sirens sounded as the tornado flattened barns", "tornado damage reported"]
+    updated, drift = update_bundle(bundle, new_texts, vocabulary="extend", n_new_terms=3)
+
+    assert "tornado" in drift["added_terms"]
+    assert len(updated["top_terms"]) == len(bundle["top_terms"]) + len(drift["added_terms"])
+    assert updated["svd"].components_.shape[1] == len(updated["top_terms"])
+    assert np.all(np.isfinite(score_matrix(updated, new_texts)))
+
+
+def test_requires_stored_counts():
+    bundle = train_bundle(CORPUS)
+    del bundle["counts"]
+    with pytest.raises(ValueError):
+        update_bundle(bundle, NEW_TEXTS)
+
+
+@pytest.mark.parametrize("base_indexed", [True, False])
+def test_update_keeps_a_corpus_wide_duplicate_index_only(tmp_path, monkeypatch, base_indexed):
+    base_file = str(tmp_path / "svm_model.pkl")
+    with open(base_file, "wb") as f:
+        pickle.dump(dict(train_bundle(CORPUS), urls=[f"http://old.example/{i}" for i in range(len(CORPUS))]), f)
+    if base_indexed:
+        index = NearDuplicateIndex()
+        for i, text in enumerate(CORPUS):
+            index.add(text, f"http://old.example/{i}")
+        index.save(dedup_path(base_file))
+
+    # A copy of a stored article, a copy within the batch, and two new articles.
+    texts = [CORPUS[0], NEW_TEXTS[0] + " today", NEW_TEXTS[0] + " today", NEW_TEXTS[1] + " again"]
+    zip_path = tmp_path / "links.zip"
+    with zipfile.ZipFile(zip_path, "w") as z:
+        z.writestr("urls.txt", "".join(f"http://new.example/{i}\n" for i in range(len(texts))))
+    monkeypatch.setattr(incremental, "scrape_urls", lambda urls, **kwargs: texts[:len(urls)])
+
+    result = update_from_zip(str(zip_path), base_file, cache_dir=None, model_dir=str(tmp_path / "models"))
+    if base_indexed:
+        assert result["dedup_scope"] == "corpus" and result["n_duplicates"] == 2
+        assert os.path.exists(result["dedup_file"])
+    else:
+        # Without the base index only within-batch copies are caught, and no
+        # index of the new articles alone is saved for check_duplicate to trust.
+        assert result["dedup_scope"] == "batch" and result["n_duplicates"] == 1
+        assert result["dedup_file"] is None and not os.path.exists(dedup_path(result["model_file"]))
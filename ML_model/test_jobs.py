@@ -0,0 +1,99 @@
+import os
+import time
+
+import pytest
+
+from jobs import JobManager
+from registry import ModelRegistry
+
+
+def count_to(n, progress):
+    # Job targets run in a spawned worker, imported from here by name.
+    for i in range(n):
+        progress("counting", done=i + 1, total=n)
+    return {"counted": n}
+
+
+def crash(progress):
+    progress("crashing")
+    os._exit(1)
+
+
+def wait_for(manager, job_id, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = manager.get(job_id)
+        if job["status"] not in ("queued", "running"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+@pytest.fixture
+def registries(tmp_path):
+    # Two registries on one file stand in for two uvicorn workers.
+    path = str(tmp_path / "app.db")
+    first, second = ModelRegistry(path), ModelRegistry(path)
+    first.migrate()
+    yield first, second
+    first.close()
+    second.close()
+
+
+def test_jobs_are_visible_from_every_worker(registries):
+    running = JobManager(store=registries[0])
+    other = JobManager(store=registries[1])
+    try:
+        job_id = running.submit("test_jobs:count_to", 3)
+        assert other.get(job_id)["status"] in ("queued", "running", "completed")
+        job = wait_for(running, job_id)
+        assert job["status"] == "completed" and job["result"] == {"counted": 3}
+
+        seen = other.get(job_id)
+        assert seen["status"] == "completed" and seen["result"] == {"counted": 3}
+        assert seen["progress"] == {"done": 3, "total": 3}
+        assert [stage["name"] for stage in seen["stages"]] == ["counting"] and seen["elapsed_seconds"] >= 0
+        assert [job["id"] for job in other.list()] == [job_id]
+        assert other.get("missing") is None
+    finally:
+        running.shutdown()
+
+
+def test_dead_worker_fails_its_job_and_later_jobs_still_run(registries):
+    manager = JobManager(store=registries[0])
+    try:
+        crashed = wait_for(manager, manager.submit("test_jobs:crash"))
+        assert crashed["status"] == "failed" and "Worker process died" in crashed["error"]
+        assert registries[1].get_job(crashed["id"])["status"] == "failed"
+
+        job = wait_for(manager, manager.submit("test_jobs:count_to", 2))
+        assert job["status"] == "completed" and job["result"] == {"counted": 2}
+    finally:
+        manager.shutdown()
+
+
+def test_shutdown_fails_unfinished_jobs(registries):
+    manager = JobManager(store=registries[0])
+    manager.submit("test_jobs:count_to", 1)
+    queued = manager.submit("test_jobs:count_to", 1)  # one worker: still waiting its turn
+    manager.shutdown()
+    job = registries[1].get_job(queued)
+    assert job["status"] == "failed" and "shut down" in job["error"]
+
+
+def test_train_rejects_unknown_settings_before_queuing(monkeypatch, tmp_path):
+    # Imported here: job workers import this module to find their targets.
+    from fastapi.testclient import TestClient
+    import incremental
+    import main_api
+    import models
+
+    assert main_api.TRAIN_CLASSIFIERS == tuple(models.MODEL_TYPES)
+    assert main_api.VOCABULARY_MODES == incremental.VOCABULARY_MODES
+    monkeypatch.chdir(tmp_path)  # the upload would be saved to the working directory
+    monkeypatch.setattr(main_api.job_manager, "submit", lambda *args, **kwargs: pytest.fail("job was queued"))
+    client = TestClient(main_api.app)
+    for form in ({"classifier": "svmm"}, {"vocabulary": "grow"}):
+        response = client.post("/train", data=form, files={"zip_file": ("links.zip", b"PK")})
+        assert response.status_code == 422 and next(iter(form)) in response.json()["detail"]
+    assert os.listdir(tmp_path) == []
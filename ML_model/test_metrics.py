@@ -0,0 +1,29 @@
+from metrics import Registry
+
+
+def test_counter_and_histogram_exposition():
+    registry = Registry()
+    requests = registry.counter("requests_total", "Requests.", ["path"])
+    latency = registry.histogram("latency_seconds", "Latency.", ["stage"], buckets=(0.1, 1.0))
+    requests.inc(path="/predict")
+    requests.inc(2, path="/predict")
+    for value in [0.05, 0.1, 0.5, 3.0]:
+        latency.observe(value, stage="score")
+    registry.callback("entries", "Entries.", lambda: 7)
+
+    lines = registry.render().splitlines()
+    assert "# TYPE requests_total counter" in lines
+    assert 'requests_total{path="/predict"} 3' in lines
+    assert 'latency_seconds_bucket{stage="score",le="0.1"} 2' in lines
+    assert 'latency_seconds_bucket{stage="score",le="1.0"} 3' in lines
+    assert 'latency_seconds_bucket{stage="score",le="+Inf"} 4' in lines
+    assert 'latency_seconds_count{stage="score"} 4' in lines
+    assert 'latency_seconds_sum{stage="score"} 3.65' in lines
+    assert "entries 7" in lines
+
+
+def test_disabled_registry_ignores_observations():
+    registry = Registry(enabled=False)
+    counter = registry.counter("c_total", "C.", ["a"])
+    counter.inc(a='quote"and\\slash')
+    assert registry.render().splitlines() == ["# HELP c_total C.", "# TYPE c_total counter"]
@@ -0,0 +1,65 @@
+import pytest
+
+import processor
+from page_cache import PageCache
+from processor import scrape_urls
+
+
+def test_cache_hit_skips_network(server, tmp_path):
+    base, state = server
+    cache = PageCache(str(tmp_path))
+    urls = [f"{base}/a", f"{base}/b"]
+    first = scrape_urls(urls, retries=0, cache=cache)
+    second = scrape_urls(urls, retries=0, cache=cache)
+    assert first == second == ["a Article a body", "b Article b body"]
+    assert state["hits"] == {"/a": 1, "/b": 1}
+
+
+def test_stale_entry_is_revalidated(server, tmp_path):
+    base, state = server
+    cache = PageCache(str(tmp_path), ttl=0)
+    url = f"{base}/etag"
+    scrape_urls([url], retries=0, cache=cache)
+    assert scrape_urls([url], retries=0, cache=cache) == ["etag Article etag body"]
+    assert state["hits"]["/etag"] == 2
+    assert cache.stats["revalidated"] == 1
+
+
+def test_parse_error_is_not_cached_as_text(server, tmp_path, monkeypatch):
+    base, state = server
+    cache = PageCache(str(tmp_path), ttl=0)
+    url = f"{base}/etag"
+
+    def broken_parser(html, engine=None):
+        raise ValueError("parser bug")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(processor, "parse_html", broken_parser)
+        assert scrape_urls([url], retries=0, cache=cache) == [""]
+    # The 304 revalidation reuses the cached HTML, which now parses.
+    assert scrape_urls([url], retries=0, cache=cache) == ["etag Article etag body"]
+    assert cache.stats["revalidated"] == 1
+    assert scrape_urls([url], cache=cache, offline=True) == ["etag Article etag body"]
+
+
+def test_offline_uses_only_cache(server, tmp_path):
+    base, state = server
+    cache = PageCache(str(tmp_path), ttl=0)
+    scrape_urls([f"{base}/a"], retries=0, cache=cache)
+    texts = scrape_urls([f"{base}/a", f"{base}/never-fetched"], cache=cache, offline=True)
+    assert texts == ["a Article a body", ""]
+    assert "/never-fetched" not in state["hits"]
+
+
+def test_offline_without_cache_is_rejected():
+    with pytest.raises(ValueError):
+        scrape_urls(["http://example.invalid/"], offline=True)
+
+
+def test_eviction_bounds_size(tmp_path):
+    cache = PageCache(str(tmp_path), max_bytes=4000)
+    for i in range(20):
+        cache.put(f"http://example.com/{i}", f"<html>{i}" + "x" * 2000 * (i % 3) + "</html>", f"text {i}")
+    assert cache.stats["evictions"] > 0
+    assert sum(p.stat().st_size for p in tmp_path.rglob("*.json.gz")) <= 4000
+    assert cache.get("http://example.com/19")["text"] == "text 19"
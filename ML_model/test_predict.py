@@ -1,26 +1,9 @@
+import json
+
 import requests
-from bs4 import BeautifulSoup
-import time
 
 BASE_URL = "http://127.0.0.1:8000"
 
-def extract_text_from_url(url):
-    """
-    Fetches the URL and extracts visible text using BeautifulSoup.
-    """
-    try:
-        response = requests.get(url, timeout=10)
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.text, 'html.parser')
-            text = soup.get_text(separator=' ', strip=True)
-            return text
-        else:
-            print(f"Failed to retrieve {url} (status code: {response.status_code})")
-            return None
-    except Exception as e:
-        print(f"Error fetching {url}: {e}")
-        return None
-
 def predict_text(text):
     """
     Sends the given text to the /predict endpoint and prints the prediction result.
@@ -35,6 +18,26 @@ def predict_text(text):
     except Exception as e:
         print("Error during prediction:", e)
 
+def predict_urls(urls):
+    """
+    Lets the API fetch and score the URLs itself; results are printed as
+    they stream back (one JSON object per line), slowest hosts last.
+    """
+    endpoint = f"{BASE_URL}/predict/urls"
+    try:
+        with requests.post(endpoint, json={"urls": urls}, stream=True) as response:
+            print("Status code:", response.status_code)
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                item = json.loads(line)
+                if item["status"] == "ok":
+                    print(f"{item['url']}: {item['prediction']} (score={item['score']:.4f})")
+                else:
+                    print(f"{item['url']}: failed ({item['error']})")
+    except Exception as e:
+        print("Error during URL prediction:", e)
+
 def main():
     # Read URLs from a text file (one URL per line)
     file_path = "links_Nav.txt"
@@ -47,18 +50,9 @@ def main():
 
     print(f"Found {len(urls)} URLs in {file_path}.")
 
-    for url in urls:
-        print(f"\nProcessing URL: {url}")
-        text = extract_text_from_url(url)
-        if text:
-            # Optionally print a snippet of the extracted text
-            print("Extracted text (first 200 chars):", text[:200])
-            print("Sending text to prediction endpoint...")
-            predict_text(text)
-        else:
-            print("No text extracted from this URL.")
-        # Pause between requests to avoid overloading the server
-        time.sleep(2)
+    # The server fetches and extracts each page; no article bodies are uploaded.
+    print(f"\nSending {len(urls)} URLs to the URL prediction endpoint...")
+    predict_urls(urls)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,36 @@
+import asyncio
+import os
+
+from fastapi.testclient import TestClient
+
+import main_api
+from model_cache import load_serving_bundle
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "svm_model.pkl")
+
+
+def in_event_loop():
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def test_batches_are_scored_off_the_event_loop_and_capped(monkeypatch):
+    main_api.model_cache.activate(-1, MODEL_PATH, bundle=load_serving_bundle(MODEL_PATH))
+    client = TestClient(main_api.app)
+    calls = []
+    score_texts = main_api.score_texts
+    monkeypatch.setattr(main_api, "score_texts",
+                        lambda *args, **kwargs: calls.append(in_event_loop()) or score_texts(*args, **kwargs))
+
+    response = client.post("/predict/batch", json={"texts": ["storm damage", "flood warning", "storm damage"]})
+    assert response.status_code == 200 and response.json()["scored"] == 2
+    assert calls == [False]
+
+    too_many = client.post("/predict/batch", json={"texts": ["storm"] * (main_api.MAX_BATCH_TEXTS + 1)})
+    assert too_many.status_code == 422
+
+    main_api.model_cache.clear()
+    main_api.prediction_cache.clear()
@@ -0,0 +1,98 @@
+import json
+import os
+import socket
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main_api
+from extract import EXTRACT_ENGINE
+from model_cache import load_serving_bundle
+from page_cache import PageCache
+from url_scraper import BlockedAddress, UrlScraper
+
+MODEL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models", "svm_model.pkl")
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    # The test server is on loopback, which /predict/urls refuses unless allowlisted.
+    monkeypatch.setattr(main_api, "url_scraper", UrlScraper(retries=0, cache_dir=str(tmp_path / "pages"),
+                                                            allowlist="127.0.0.1"))
+    main_api.model_cache.activate(-1, MODEL_PATH, bundle=load_serving_bundle(MODEL_PATH))
+    yield TestClient(main_api.app)
+    main_api.url_scraper.close()
+    main_api.model_cache.clear()
+    main_api.prediction_cache.clear()
+
+
+def post_urls(client, urls, **extra):
+    response = client.post("/predict/urls", json={"urls": urls, **extra})
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_results_stream_in_completion_order(client, server):
+    base, _ = server
+    lines = post_urls(client, [f"{base}/slow", f"{base}/a", f"{base}/missing", "not a url", f"{base}/a"])
+
+    assert lines[0] == {"url": "not a url", "status": "error", "error": "invalid_url"}
+    assert lines[-1]["url"] == f"{base}/slow"  # the slow host doesn't hold back the others
+    by_url = {line["url"]: line for line in lines}
+    assert len(lines) == 4  # duplicate /a scored once
+    assert by_url[f"{base}/missing"]["status"] == "error"
+    ok = by_url[f"{base}/a"]
+    assert ok["status"] == "ok" and ok["source"] == "success" and ok["model_id"] == -1
+    assert ok["prediction"] in ("Crisis Event", "Non-Crisis Event")
+
+
+def test_reuses_cached_pages(client, server):
+    base, state = server
+    first = post_urls(client, [f"{base}/b"])
+    second = post_urls(client, [f"{base}/b"], offline=True)
+    assert second[0]["source"] == "cache_hit"
+    assert second[0]["score"] == first[0]["score"]
+    assert state["hits"]["/b"] == 1
+
+
+def test_cached_and_offline_reads_skip_the_resolver(client, tmp_path, monkeypatch):
+    def unresolvable(*args, **kwargs):
+        raise socket.gaierror("Name or service not known")
+
+    monkeypatch.setattr(socket, "getaddrinfo", unresolvable)
+    url = "http://gone.example/story"
+    PageCache(str(tmp_path / "pages")).put(url, "<p>Flood waters rose overnight.</p>", "Flood waters rose overnight.",
+                                          engine=EXTRACT_ENGINE)
+    line, = post_urls(client, [url], offline=True)
+    assert line["status"] == "ok" and line["source"] == "cache_hit"
+
+    # A real fetch still needs the host to resolve.
+    line, = post_urls(client, ["http://gone.example/other"])
+    assert line["status"] == "error" and line["error"] == "dns_failure"
+
+
+def test_refuses_non_public_addresses(client, server, tmp_path, monkeypatch):
+    base, state = server
+    monkeypatch.setattr(main_api, "url_scraper", UrlScraper(retries=0, cache_dir=str(tmp_path / "pages2"),
+                                                            allowlist=""))
+    urls = [f"{base}/a", "http://169.254.169.254/latest/meta-data/", "http://10.0.0.1/", "http://[::1]/"]
+    lines = post_urls(client, urls)
+    assert {line["url"]: line["error"] for line in lines} == {url: "blocked_address" for url in urls}
+    assert state["hits"] == {}  # nothing was fetched
+    main_api.url_scraper.close()
+
+
+def test_allowlisted_host_cannot_redirect_to_private_address(client, server):
+    base, state = server
+    lines = post_urls(client, [f"{base}/redirect"])
+    assert lines[0]["status"] == "error" and lines[0]["error"] == "blocked_address"
+    assert state["hits"] == {"/redirect": 1}
+
+
+def test_allowlist_accepts_names_and_networks():
+    with pytest.raises(BlockedAddress):
+        UrlScraper(allowlist="").check_address("http://127.0.0.1:8000/a")
+    UrlScraper(allowlist="127.0.0.0/8").check_address("http://127.0.0.1:8000/a")
+    UrlScraper(allowlist="localhost").check_address("http://LOCALHOST/a")
+    with pytest.raises(BlockedAddress):
+        UrlScraper(allowlist="10.0.0.0/8").check_address("http://127.0.0.1/a")
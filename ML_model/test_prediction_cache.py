@@ -0,0 +1,43 @@
+import time
+
+from prediction_cache import PredictionCache
+
+
+def test_key_ignores_case_and_whitespace_only():
+    cache = PredictionCache()
+    assert cache.key(1, "Storm  hits\nthe COAST ") == cache.key(1, "storm hits the coast")
+    assert cache.key(1, "storm hits the coast") != cache.key(2, "storm hits the coast")
+    assert cache.key(1, "storm-hits") != cache.key(1, "stormhits")
+
+
+def test_lru_is_bounded_by_memory_cap():
+    cache = PredictionCache()
+    cache = PredictionCache(max_bytes=3 * cache.entry_bytes)
+    keys = [cache.key(1, f"text {i}") for i in range(4)]
+    for i, key in enumerate(keys[:3]):
+        cache.put(key, float(i))
+    assert cache.get(keys[0]) == 0.0  # refresh: keys[1] is now least recent
+    cache.put(keys[3], 3.0)
+    assert cache.get(keys[1]) is None
+    assert [cache.get(k) for k in (keys[0], keys[2], keys[3])] == [0.0, 2.0, 3.0]
+    stats = cache.stats()
+    assert stats["entries"] == 3 and stats["evictions"] == 1
+    assert stats["hit_rate"] == 4 / 5
+
+
+def test_entries_expire_and_clear():
+    cache = PredictionCache(ttl=0.01)
+    key = cache.key(1, "flood")
+    cache.put(key, 1.0)
+    time.sleep(0.02)
+    assert cache.get(key) is None and cache.stats()["expired"] == 1
+    cache.put(key, 1.0)
+    cache.clear()
+    assert cache.get(key) is None
+
+
+def test_disabled_with_zero_budget():
+    cache = PredictionCache(max_bytes=0)
+    key = cache.key(1, "flood")
+    cache.put(key, 1.0)
+    assert cache.get(key) is None and cache.stats()["entries"] == 0
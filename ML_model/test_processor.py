@@ -0,0 +1,23 @@
+import zipfile
+
+from processor import count_urls, extract_urls, normalize_url
+
+
+def test_normalize_url():
+    assert normalize_url("  HTTPS://Example.COM/Path?q=1#frag\n") == "https://example.com/Path?q=1"
+    assert normalize_url("http://example.com") == "http://example.com/"
+    for line in ["", "   \n", "# comment", "ftp://example.com/file", "not a url"]:
+        assert normalize_url(line) is None
+
+
+def test_extract_urls_streams_members_and_dedupes(tmp_path):
+    zip_path = tmp_path / "links.zip"
+    with zipfile.ZipFile(zip_path, "w") as z:
+        z.writestr("a.txt", "http://example.com/1\nhttp://EXAMPLE.com/1#top\n\nhttp://example.com/2\n")
+        z.writestr("nested/b.txt", "http://example.com/2\r\nhttp://example.com/3\r\n")
+        z.writestr("__MACOSX/._a.txt", "http://example.com/junk\n")
+        z.writestr("empty/", "")
+
+    assert extract_urls(str(zip_path)) == ["http://example.com/1", "http://example.com/2", "http://example.com/3"]
+    assert count_urls(str(zip_path)) == 3
+    assert not (tmp_path / "temp_urls").exists()
@@ -0,0 +1,189 @@
+import importlib
+import os
+import shutil
+import sqlite3
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main_api
+import registry as registry_module
+from registry import ModelRegistry, file_checksum
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+
+
+@pytest.fixture
+def artifacts(tmp_path):
+    # Two copies of the committed model so versions have distinct files.
+    paths = []
+    for i in range(2):
+        path = tmp_path / "models" / f"svm_model_{i}.pkl"
+        path.parent.mkdir(exist_ok=True)
+        shutil.copy(os.path.join(MODEL_DIR, "svm_model.pkl"), path)
+        shutil.copy(os.path.join(MODEL_DIR, "svm_model.npz"), path.with_suffix(".npz"))
+        paths.append(str(path))
+    return paths
+
+
+def test_migrates_legacy_database(tmp_path, artifacts):
+    db = tmp_path / "app.db"
+    conn = sqlite3.connect(db)
+    conn.execute("CREATE TABLE models (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT, model_type TEXT, "
+                 "file_path TEXT, training_date TEXT)")
+    for path in artifacts:
+        conn.execute("INSERT INTO models (name, model_type, file_path, training_date) VALUES (?, ?, ?, ?)",
+                     ("svm_model", "svm", os.path.relpath(path, tmp_path), "2025-01-01"))
+    conn.commit()
+    conn.close()
+
+    registry = ModelRegistry(str(db))
+    registry.migrate()
+    registry.migrate()  # idempotent
+
+    active = registry.active()
+    assert active["id"] == 2 and active["version"] == 2  # latest row keeps serving
+    assert active["file_path"] == artifacts[1]
+    assert active["checksum"] == file_checksum(artifacts[1])
+    assert [m["status"] for m in registry.list()] == ["active", "inactive"]
+    assert registry.rollback()["id"] == 1
+    registry.close()
+
+
+def test_registers_paths_relative_to_the_caller_not_the_database(tmp_path, artifacts, monkeypatch):
+    # DATABASE elsewhere, API running from the directory that holds models/.
+    monkeypatch.setenv("DATABASE", str(tmp_path / "db" / "app.db"))
+    os.makedirs(tmp_path / "db")
+    monkeypatch.chdir(tmp_path)
+    module = importlib.reload(registry_module)
+    try:
+        registry = module.ModelRegistry()
+        registry.migrate()
+        model_id = registry.register("svm_model", "svm", os.path.join("models", "svm_model_0.pkl"),
+                                     compiled_file=os.path.join("models", "svm_model_0.npz"))
+        model = registry.get(model_id)
+        assert model["file_path"] == artifacts[0]
+        assert model["compiled_file"] == os.path.splitext(artifacts[0])[0] + ".npz"
+        monkeypatch.chdir(tmp_path / "db")  # unaffected by a later working directory
+        assert registry.verify(model_id)
+        registry.close()
+    finally:
+        monkeypatch.delenv("DATABASE")
+        importlib.reload(registry_module)
+
+
+def test_activate_and_rollback_walk_history(tmp_path, artifacts):
+    registry = ModelRegistry(str(tmp_path / "app.db"))
+    registry.migrate()
+    first = registry.register("svm_model", "svm", artifacts[0], threshold=-0.5,
+                              metrics={"stage_seconds": {"fitting": 1.0}}, feature_config={"n_terms": 300})
+    second = registry.register("svm_model", "svm", artifacts[1])
+    third = registry.register("svm_model", "svm", artifacts[0], activate=False)
+
+    assert registry.active_id() == second
+    model = registry.get(first)
+    assert model["version"] == 1 and model["metrics"] == {"stage_seconds": {"fitting": 1.0}}
+    assert model["feature_config"] == {"n_terms": 300}
+    assert registry.get(third)["status"] == "inactive"
+
+    registry.activate(third)
+    assert registry.rollback()["id"] == second
+    assert registry.rollback()["id"] == first
+    assert registry.rollback_target() is None
+    with pytest.raises(ValueError):
+        registry.rollback()
+    with pytest.raises(KeyError):
+        registry.activate(999)
+
+    with open(artifacts[1], "ab") as f:
+        f.write(b"tampered")
+    assert registry.verify(first) and not registry.verify(second)
+    registry.close()
+
+
+def test_concurrent_writers_keep_one_active_model(tmp_path, artifacts):
+    # Separate registries stand in for separate uvicorn workers.
+    path = str(tmp_path / "app.db")
+    ModelRegistry(path).migrate()
+    workers = [ModelRegistry(path) for _ in range(4)]
+    errors = []
+
+    def work(registry, i):
+        try:
+            for j in range(10):
+                registry.register("svm_model", "svm", artifacts[(i + j) % 2])
+                registry.active()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=work, args=(registry, i)) for i, registry in enumerate(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    models = workers[0].list(limit=100)
+    assert len(models) == 40
+    assert sorted(m["version"] for m in models) == list(range(1, 41))
+    assert sum(m["status"] == "active" for m in models) == 1
+    for registry in workers:
+        registry.close()
+
+
+def test_endpoints_and_cross_worker_refresh(tmp_path, artifacts, monkeypatch):
+    registry = ModelRegistry(str(tmp_path / "app.db"))
+    registry.migrate()
+    first = registry.register("svm_model", "svm", artifacts[0])
+    second = registry.register("svm_model", "svm", artifacts[1])
+    monkeypatch.setattr(main_api, "registry", registry)
+    monkeypatch.setattr(main_api, "_registry_active_id", None)
+    main_api.model_cache.clear()
+    client = TestClient(main_api.app)
+
+    assert client.post("/predict", json={"text": "storm damage"}).status_code == 200
+    assert main_api.model_cache.active()[0] == second
+    assert [m["id"] for m in client.get("/models").json()] == [second, first]
+
+    response = client.post(f"/models/{first}/activate")
+    assert response.status_code == 200 and response.json()["status"] == "active"
+    assert main_api.model_cache.active()[0] == first
+    assert client.post("/models/rollback").json()["id"] == second
+    assert main_api.model_cache.active()[0] == second
+    assert client.post("/models/rollback").json()["id"] == first
+    assert client.post("/models/rollback").status_code == 409
+    assert client.post("/models/999/activate").status_code == 404
+
+    # Another worker activates a version; this one follows on its next poll.
+    other_worker = ModelRegistry(registry.path)
+    other_worker.activate(second)
+    main_api.sync_active_model()
+    assert main_api.model_cache.active()[0] == second
+
+    other_worker.close()
+    registry.close()
+    main_api.model_cache.clear()
+    main_api.prediction_cache.clear()
+
+
+def test_starts_with_a_dangling_active_model(tmp_path, artifacts, monkeypatch):
+    registry = ModelRegistry(str(tmp_path / "app.db"))
+    registry.migrate()
+    good = registry.register("svm_model", "svm", artifacts[0])
+    registry.register("svm_model", "svm", artifacts[1])
+    os.remove(artifacts[1])
+    os.remove(os.path.splitext(artifacts[1])[0] + ".npz")
+    monkeypatch.setattr(main_api, "registry", registry)
+    monkeypatch.setattr(main_api, "_registry_active_id", None)
+    main_api.model_cache.clear()
+
+    # Startup survives; /predict fails per request until a good version is activated.
+    with TestClient(main_api.app) as client:
+        assert client.post("/predict", json={"text": "storm damage"}).status_code == 500
+        assert client.post(f"/models/{good}/activate").status_code == 200
+        assert client.post("/predict", json={"text": "storm damage"}).status_code == 200
+
+    registry.close()
+    main_api.model_cache.clear()
+    main_api.prediction_cache.clear()
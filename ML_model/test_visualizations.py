@@ -0,0 +1,89 @@
+import json
+import os
+import shutil
+
+import numpy as np
+import pytest
+import scipy.sparse as sp
+from fastapi.testclient import TestClient
+
+import main_api
+from features import top_term_indices
+from registry import ModelRegistry
+from visualizations import PLOT_KINDS, plot_stats, render_plot
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+FOLDS = [{"precision": 1.0, "recall": 0.9, "f1": 0.95, "threshold": -0.1}] * 5
+
+
+def stats(fold_results=FOLDS):
+    rng = np.random.default_rng(0)
+    X = sp.random(50, 40, density=0.3, random_state=0, format="csr")
+    return plot_stats(X, [f"term{i}" for i in range(40)], rng.standard_normal(50), threshold=-1.0,
+                      fold_results=fold_results, n_terms=10)
+
+
+@pytest.mark.parametrize("n_terms", [0, 1, 10, 40, 100])
+def test_top_term_indices_match_full_sort(n_terms):
+    X = sp.random(30, 40, density=0.3, random_state=1, format="csr")
+    means = np.asarray(X.mean(axis=0)).ravel()
+    np.testing.assert_array_equal(top_term_indices(X, n_terms), means.argsort()[::-1][:n_terms])
+
+
+@pytest.mark.parametrize("n_terms", [1, 3, 4, 6, 9])
+def test_top_term_indices_break_ties_like_full_sort(n_terms):
+    # Among equal means the highest index comes first, including at the cut.
+    means = np.array([0.2, 0.5, 0.2, 0.5, 0.1, 0.2, 0.5, 0.0, 0.2])
+    X = sp.csr_matrix(means[None, :])
+    expected = [6, 3, 1, 8, 5, 2, 0, 4, 7][:n_terms]
+    np.testing.assert_array_equal(np.argsort(means, kind="stable")[::-1][:n_terms], expected)
+    np.testing.assert_array_equal(top_term_indices(X, n_terms), expected)
+
+
+def test_plot_stats_are_small_and_serializable():
+    recorded = stats()
+    assert json.loads(json.dumps(recorded)) == recorded
+    importance = recorded["term_importance"]
+    assert len(importance["terms"]) == 10 and importance["scores"] == sorted(importance["scores"], reverse=True)
+    assert sum(recorded["decision_scores"]["counts"]) == 50
+    assert len(recorded["fold_scores"]) == 5
+
+
+def test_renders_png_without_pyplot():
+    recorded = stats()
+    for kind in PLOT_KINDS:
+        assert render_plot(recorded, kind).startswith(b"\x89PNG")
+    with pytest.raises(ValueError):
+        render_plot(stats(fold_results=None), "fold_scores")
+
+
+def test_plot_endpoint_renders_once_and_caches(tmp_path, monkeypatch):
+    model_file = str(tmp_path / "svm_model.pkl")
+    shutil.copy(os.path.join(MODEL_DIR, "svm_model.pkl"), model_file)
+    registry = ModelRegistry(str(tmp_path / "app.db"))
+    registry.migrate()
+    with_stats = registry.register("svm_model", "svm", model_file, metrics={"plot_stats": stats(None)})
+    without_stats = registry.register("svm_model", "svm", model_file, activate=False)
+    monkeypatch.setattr(main_api, "registry", registry)
+    client = TestClient(main_api.app)
+
+    response = client.get(f"/models/{with_stats}/plots/term_importance")
+    assert response.status_code == 200 and response.headers["content-type"] == "image/png"
+    cached = tmp_path / "svm_model.term_importance.png"
+    assert cached.read_bytes() == response.content
+    mtime = cached.stat().st_mtime_ns
+    assert client.get(f"/models/{with_stats}/plots/term_importance").content == response.content
+    assert cached.stat().st_mtime_ns == mtime
+
+    assert client.get(f"/models/{with_stats}/plots/fold_scores").status_code == 404  # no CV results
+    assert client.get(f"/models/{without_stats}/plots/decision_scores").status_code == 404
+    assert client.get(f"/models/{with_stats}/plots/roc").status_code == 404
+    assert client.get("/models/999/plots/decision_scores").status_code == 404
+
+    # visualize=True renders every available plot in the background after registration.
+    main_api.prerender_plots(registry.get(with_stats))
+    for future in list(main_api._plot_renders.values()):
+        future.result()
+    assert (tmp_path / "svm_model.decision_scores.png").exists()
+    assert not (tmp_path / "svm_model.fold_scores.png").exists()
+    registry.close()
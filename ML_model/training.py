@@ -0,0 +1,224 @@
+import os
+import pickle
+import time
+from datetime import datetime
+import numpy as np
+from sklearn.decomposition import TruncatedSVD
+from sklearn.preprocessing import Normalizer
+
+from processor import ScrapeStats, count_urls, iter_urls, iter_scraped
+from page_cache import PageCache, PAGE_CACHE_DIR
+from models import get_model
+from evaluate import evaluate_model, calibrate as calibrate_model
+from compiled import export_bundle
+from model_cache import unsupported_marker
+from features import count_terms, features_from_counts
+from extract import EXTRACT_ENGINE
+from dedup import NearDuplicateIndex, dedup_path
+from visualizations import plot_stats
+
+# Next to this module, like the registry database, whatever directory the API runs from.
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "models")
+
+
+# --- Text Processing Functions ---
+def reduce_dimensionality(X, n_components=100):
+    svd = TruncatedSVD(n_components=n_components, random_state=42)
+    X_reduced = svd.fit_transform(X)
+    return X_reduced, svd
+
+def normalize_vectors(X):
+    normalizer = Normalizer(norm='l2')
+    return normalizer.fit_transform(X)
+
+
+# --- Training Pipeline ---
+def _no_progress(stage, **info):
+    pass
+
+class StageClock:
+    """Wraps a progress callback and records wall time spent in each stage."""
+
+    def __init__(self, progress=None):
+        self.progress = progress or _no_progress
+        self.seconds = {}
+        self._stage = None
+        self._start = None
+
+    def __call__(self, stage, **info):
+        if stage != self._stage:
+            self.stop()
+            self._stage, self._start = stage, time.perf_counter()
+        self.progress(stage, **info)
+
+    def stop(self):
+        if self._stage is not None:
+            elapsed = time.perf_counter() - self._start
+            self.seconds[self._stage] = self.seconds.get(self._stage, 0.0) + elapsed
+            self._stage = None
+        return self.seconds
+
+def save_bundle(bundle, classifier, model_dir=MODEL_DIR):
+    """
+    Pickles the bundle under a versioned name and exports the compiled .npz
+    next to it when the model supports it. Each training run gets its own
+    file so cached older versions stay valid.
+    """
+    os.makedirs(model_dir, exist_ok=True)
+    version = datetime.now().strftime("%Y%m%d%H%M%S%f")
+    model_filename = os.path.join(model_dir, f"{classifier}_model_{version}.pkl")
+    with open(model_filename, "wb") as f:
+        pickle.dump(bundle, f)
+
+    # Also export the sklearn-free artifact when the model type supports it.
+    compiled_filename = os.path.splitext(model_filename)[0] + ".npz"
+    try:
+        export_bundle(bundle, compiled_filename)
+    except ValueError as e:
+        print(f" Skipping compiled export: {e}")
+        with open(unsupported_marker(compiled_filename), "w") as f:
+            f.write(f"{e}\n")
+        compiled_filename = None
+    return model_filename, compiled_filename
+
+def train_from_zip(zip_path, classifier='svm', offline=False, cache_dir=PAGE_CACHE_DIR,
+                   model_dir=MODEL_DIR, alpha=6, calibrate=False, dedup=True, progress=None):
+    """
+    Runs the full training pipeline on a ZIP of seed URLs and saves the
+    bundle to model_dir. With dedup, near-duplicate articles (syndicated
+    copies of one story) are dropped before vectorizing and the MinHash
+    index is saved next to the model. progress(stage, **info) is called as
+    each stage starts and while scraping advances.
+    """
+    progress = StageClock(progress)
+
+    # 1. Stream URLs out of the archive into the scrapers and scraped texts
+    # into the tokenizer; only URLs and term counts are held in memory.
+    # The archive is read twice: once to count URLs for the progress total,
+    # then again as the stream feeding the scrapers.
+    progress("extracting")
+    n_urls = count_urls(zip_path)
+    if n_urls == 0:
+        raise ValueError("No URLs extracted from the provided ZIP file.")
+
+    urls = []
+    def recorded_urls():
+        for url in iter_urls(zip_path):
+            urls.append(url)
+            yield url
+
+    progress("scraping", done=0, total=n_urls)
+    cache = PageCache(cache_dir) if cache_dir else None
+    scrape_stats = ScrapeStats()
+    texts = iter_scraped(recorded_urls(), cache=cache, offline=offline, stats=scrape_stats, total=n_urls,
+                         progress=lambda done, total: progress("scraping", done=done, total=total))
+
+    # Texts come back in URL order, so position i belongs to urls[i].
+    index = NearDuplicateIndex() if dedup else None
+    kept_urls, duplicate_urls = [], []
+    dedup_seconds = 0.0
+    def unique_texts():
+        nonlocal dedup_seconds
+        for position, text in enumerate(texts):
+            start = time.perf_counter()
+            duplicate = index is not None and index.add(text, urls[position]) is not None
+            dedup_seconds += time.perf_counter() - start
+            if duplicate:
+                duplicate_urls.append(urls[position])
+            else:
+                kept_urls.append(urls[position])
+                yield text
+
+    counts, counter = count_terms(unique_texts())
+
+    # 2. Weight counts with TF-IDF and keep the top terms (single tokenization pass).
+    progress("vectorizing")
+    X, vectorizer, top_terms, counts = features_from_counts(counts, counter, n_terms=300, return_counts=True)
+
+    # 3. Reduce dimensionality and normalize.
+    X_reduced, svd = reduce_dimensionality(X, n_components=100)
+    X_final = normalize_vectors(X_reduced)
+
+    # 4. All training data are inliers.
+    y_true = np.ones(X.shape[0])
+
+    # 5. Initialize the model, train on full data and compute decision scores.
+    progress("fitting")
+    model = get_model(classifier)
+    model.fit(X_final)
+    training_scores = model.decision_function(X_final)
+
+    # --- Adjust threshold using a tunable alpha parameter.
+    # Increase alpha to lower the threshold (make it more negative).
+    threshold = np.mean(training_scores) - alpha * np.std(training_scores)
+
+    # 6. Evaluate the model using this threshold (folds are fitted in parallel).
+    progress("evaluating")
+    results = evaluate_model(X_final, y_true, model, threshold=threshold)
+
+    # Optionally sweep alphas and hyperparameters over the same X_final.
+    calibration = None
+    if calibrate:
+        progress("calibrating")
+        calibration = calibrate_model(X_final, y_true, model_type=classifier)
+
+    # 7. Save model and text processing objects (including threshold) to disk.
+    # Raw term counts and URLs are kept so incremental updates only process new documents.
+    progress("saving")
+    training_date = datetime.now().isoformat()
+    # What the plots need is recorded here, once; they are rendered on request.
+    stats = plot_stats(X, top_terms, training_scores, threshold=threshold, fold_results=results)
+    stage_seconds = progress.stop()
+    # Recorded with the model so the registry can tell which pipeline built it.
+    feature_config = {"max_features": counter.max_features, "n_terms": len(top_terms),
+                      "n_components": svd.n_components, "extract_engine": EXTRACT_ENGINE}
+    bundle = {
+        "model": model,
+        "vectorizer": vectorizer,
+        "svd": svd,
+        "top_terms": top_terms,
+        "threshold": threshold,
+        "classifier": classifier,
+        "alpha": alpha,
+        "urls": kept_urls,
+        "duplicate_urls": duplicate_urls,
+        "counts": counts,
+        "feature_config": feature_config,
+        "plot_stats": stats,
+        "training_stats": {"n_documents": len(kept_urls), "stage_seconds": stage_seconds}
+    }
+    model_filename, compiled_filename = save_bundle(bundle, classifier, model_dir)
+    dedup_filename = index.save(dedup_path(model_filename)) if index is not None else None
+
+    return {
+        "classifier": classifier,
+        "model_file": model_filename,
+        "compiled_file": compiled_filename,
+        "training_date": training_date,
+        "n_documents": len(kept_urls),
+        "n_duplicates": len(duplicate_urls),
+        "dedup_scope": "corpus" if dedup else None,
+        "dedup_seconds": dedup_seconds,
+        "dedup_file": dedup_filename,
+        "cross_validation_results": results,
+        "threshold": float(threshold),
+        "alpha": alpha,
+        "calibration": calibration,
+        "feature_config": feature_config,
+        "plot_stats": stats,
+        "stage_seconds": stage_seconds,
+        "scrape_stats": scrape_stats.as_dict()
+    }
+
+
+def train_job(zip_path, classifier='svm', offline=False, alpha=6, calibrate=False, dedup=True, visualize=False,
+              progress=None):
+    # Entry point for background jobs: the uploaded ZIP is ours to clean up.
+    # visualize only asks the API to pre-render plots once the model is registered.
+    try:
+        result = train_from_zip(zip_path, classifier=classifier, offline=offline, alpha=alpha,
+                                calibrate=calibrate, dedup=dedup, progress=progress)
+        return dict(result, visualize=visualize)
+    finally:
+        if os.path.exists(zip_path):
+            os.remove(zip_path)
@@ -0,0 +1,145 @@
+import asyncio
+import ipaddress
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from urllib.parse import urlsplit
+
+# Hosts /predict/urls may fetch although they resolve to loopback, private,
+# link-local or reserved addresses: comma-separated names, IPs or networks
+# (e.g. "intranet.example,10.1.0.0/16"). Everything else must be public.
+PREDICT_URL_ALLOWLIST = os.environ.get("PREDICT_URL_ALLOWLIST", "")
+
+
+class BlockedAddress(ValueError):
+    """The URL's host is not a public address and isn't allowlisted."""
+
+
+def parse_allowlist(entries):
+    if isinstance(entries, str):
+        entries = entries.split(",")
+    hosts, networks = set(), []
+    for entry in (e.strip().lower() for e in entries):
+        if not entry:
+            continue
+        try:
+            networks.append(ipaddress.ip_network(entry, strict=False))
+        except ValueError:
+            hosts.add(entry)
+    return hosts, networks
+
+
+def _is_public(ip):
+    if ip.version == 6 and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+class UrlScraper:
+    """
+    Request-time counterpart of processor.scrape_urls for the API: one
+    pooled Fetcher, the shared page cache and a thread pool, created on
+    first use so the scraping stack stays out of the API's import time.
+    Results are yielded as each URL finishes rather than in input order.
+    """
+
+    def __init__(self, max_workers=None, per_host=None, retries=None, cache_dir=None, allowlist=None):
+        self.max_workers = max_workers
+        self.per_host = per_host
+        self.retries = retries
+        self.cache_dir = cache_dir
+        self._allowed_hosts, self._allowed_networks = parse_allowlist(
+            PREDICT_URL_ALLOWLIST if allowlist is None else allowlist)
+        self._local = threading.local()  # set when a redirect hop gets blocked mid-fetch
+        self._executor = None
+        self._fetcher = None
+        self._cache = None
+
+    def _start(self):
+        if self._executor is not None:
+            return
+        from fetcher import Fetcher
+        from page_cache import PageCache, PAGE_CACHE_DIR
+        from processor import SCRAPE_WORKERS, SCRAPE_PER_HOST, SCRAPE_RETRIES
+
+        max_workers = self.max_workers or SCRAPE_WORKERS
+        self._fetcher = Fetcher(max_workers=max_workers, per_host=self.per_host or SCRAPE_PER_HOST,
+                                retries=SCRAPE_RETRIES if self.retries is None else self.retries,
+                                guard=self.check_address)
+        cache_dir = PAGE_CACHE_DIR if self.cache_dir is None else self.cache_dir
+        self._cache = PageCache(cache_dir) if cache_dir else None
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def normalize(self, url):
+        from processor import normalize_url
+        return normalize_url(url)
+
+    def check_address(self, url):
+        """
+        Raises BlockedAddress unless every address the URL's host resolves to
+        is public or allowlisted, so clients can't make the server reach its
+        own network (loopback, RFC 1918, link-local cloud metadata, ...).
+        The fetcher calls this again for each redirect hop.
+        """
+        parts = urlsplit(url)
+        host = (parts.hostname or "").lower()
+        if not host:
+            raise BlockedAddress(f"No host in {url}")
+        if host in self._allowed_hosts:
+            return
+        try:
+            port = parts.port or (443 if parts.scheme == "https" else 80)
+        except ValueError:
+            raise BlockedAddress(f"Invalid port in {url}")
+        try:
+            addresses = socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)
+        except OSError:
+            self._local.dns_failure = True
+            raise
+        for info in addresses:
+            ip = ipaddress.ip_address(info[4][0].split("%")[0])
+            if not _is_public(ip) and not any(ip in network for network in self._allowed_networks):
+                self._local.blocked = True
+                raise BlockedAddress(f"{host} resolves to non-public address {ip}")
+
+    def _scrape(self, url, offline):
+        from processor import scrape_url
+
+        outcomes = []
+        recorder = SimpleNamespace(record=lambda url, outcome: outcomes.append(outcome))
+        start = time.perf_counter()
+        # Addresses are checked by the fetcher on every request it actually
+        # sends (redirect hops included), so cache hits and offline reads never
+        # wait on the resolver.
+        self._local.blocked = False
+        self._local.dns_failure = False
+        text = scrape_url(url, self._fetcher, self._cache, offline, stats=recorder)
+        if self._local.blocked:
+            outcome = "blocked_address"
+        elif self._local.dns_failure:
+            outcome = "dns_failure"
+        else:
+            outcome = outcomes[-1] if outcomes else "failure"
+        return url, text, outcome, time.perf_counter() - start
+
+    async def as_completed(self, urls, offline=False):
+        """Yields (url, text, outcome, seconds) for each URL in completion order."""
+        self._start()
+        loop = asyncio.get_running_loop()
+        futures = [loop.run_in_executor(self._executor, self._scrape, url, offline) for url in urls]
+        try:
+            for future in asyncio.as_completed(futures):
+                yield await future
+        finally:
+            # Client went away: drop fetches that haven't started yet.
+            for future in futures:
+                future.cancel()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._fetcher.close()
+            self._executor = None
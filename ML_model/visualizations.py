@@ -1,59 +1,106 @@
-import matplotlib.pyplot as plt
-from sklearn.decomposition import TruncatedSVD
+import io
+import os
 import numpy as np
 
-def plot_fold_scores(results):
-    folds = list(range(1, len(results) + 1))
-    precision = [r["precision"] for r in results]
-    recall = [r["recall"] for r in results]
-    f1 = [r["f1"] for r in results]
-
-    plt.figure(figsize=(10, 5))
-    plt.plot(folds, precision, label="Precision", marker='o')
-    plt.plot(folds, recall, label="Recall", marker='o')
-    plt.plot(folds, f1, label="F1 Score", marker='o')
-    plt.xlabel("Fold")
-    plt.ylabel("Score")
-    plt.title("Cross-Validation Performance per Fold")
-    plt.legend()
-    plt.grid(True)
-    plt.tight_layout()
-    plt.savefig("fold_scores.png")
-    print("Saved fold_scores.png")
-
-def plot_decision_scores(model, X):
-    try:
-        scores = model.decision_function(X)
-    except AttributeError:
-        scores = model.score_samples(X)
-
-    plt.figure(figsize=(8, 5))
-    plt.hist(scores, bins=30, edgecolor='black')
-    plt.title("Anomaly Score Distribution")
-    plt.xlabel("Score")
-    plt.ylabel("Frequency")
-    plt.tight_layout()
-    plt.savefig("decision_scores.png")
-    print("Saved decision_scores.png")
+# Plots served per model version; each is drawn from statistics training records once.
+PLOT_KINDS = ("fold_scores", "decision_scores", "term_importance")
 
 def get_top_terms_by_tfidf(X_tfidf, vectorizer, n_terms=100):
-    tfidf_means = np.asarray(X_tfidf.mean(axis=0)).ravel()
-    top_indices = tfidf_means.argsort()[::-1][:n_terms]
+    from features import top_term_indices
+    top_indices = top_term_indices(X_tfidf, n_terms)
     terms = vectorizer.get_feature_names_out()
     return [terms[i] for i in top_indices]
 
-def plot_tfidf_term_importance(X_tfidf, vectorizer, n_terms=30):
-    tfidf_means = np.asarray(X_tfidf.mean(axis=0)).ravel()
-    top_indices = tfidf_means.argsort()[::-1][:n_terms]
+def plot_stats(X_tfidf, terms, scores, threshold=None, fold_results=None, n_terms=30, bins=30):
+    """
+    Everything the plots need, computed in one pass at training time: mean
+    TF-IDF of the top n_terms columns of X_tfidf (named by terms), a
+    histogram of the training decision scores and the per-fold metrics.
+    Small and JSON-serializable, so it is stored with the model version.
+    """
+    from features import term_means, top_term_indices
+    means = term_means(X_tfidf)
+    top_indices = top_term_indices(X_tfidf, n_terms, means=means)
+    counts, edges = np.histogram(scores, bins=bins)
+    return {
+        "term_importance": {"terms": [str(terms[i]) for i in top_indices],
+                            "scores": means[top_indices].tolist()},
+        "decision_scores": {"counts": counts.tolist(), "edges": edges.tolist(),
+                            "threshold": None if threshold is None else float(threshold)},
+        "fold_scores": [{key: float(fold[key]) for key in ("precision", "recall", "f1")}
+                        for fold in fold_results or []],
+    }
 
-    terms = vectorizer.get_feature_names_out()
-    top_terms = [terms[i] for i in top_indices]
-    top_scores = [tfidf_means[i] for i in top_indices]
-
-    plt.figure(figsize=(12, 6))
-    bars = plt.barh(top_terms[::-1], top_scores[::-1])  # reverse to get highest at top
-    plt.xlabel("Average TF-IDF Score")
-    plt.title(f"Top {n_terms} Most Informative Terms (TF-IDF)")
-    plt.tight_layout()
-    plt.savefig("tfidf_term_importance.png")
-    print(" Saved tfidf_term_importance.png")
\ No newline at end of file
+def _draw_fold_scores(fig, folds):
+    if not folds:
+        raise ValueError("No cross-validation results recorded for this model.")
+    ax = fig.add_subplot()
+    x = list(range(1, len(folds) + 1))
+    ax.plot(x, [f["precision"] for f in folds], label="Precision", marker='o')
+    ax.plot(x, [f["recall"] for f in folds], label="Recall", marker='o')
+    ax.plot(x, [f["f1"] for f in folds], label="F1 Score", marker='o')
+    ax.set_xlabel("Fold")
+    ax.set_ylabel("Score")
+    ax.set_title("Cross-Validation Performance per Fold")
+    ax.legend()
+    ax.grid(True)
+
+def _draw_decision_scores(fig, histogram):
+    ax = fig.add_subplot()
+    edges = np.asarray(histogram["edges"])
+    ax.bar(edges[:-1], histogram["counts"], width=np.diff(edges), align="edge", edgecolor='black')
+    if histogram.get("threshold") is not None:
+        ax.axvline(histogram["threshold"], color="red", linestyle="--", label="Threshold")
+        ax.legend()
+    ax.set_title("Anomaly Score Distribution")
+    ax.set_xlabel("Score")
+    ax.set_ylabel("Frequency")
+
+def _draw_term_importance(fig, importance):
+    ax = fig.add_subplot()
+    terms = importance["terms"]
+    ax.barh(terms[::-1], importance["scores"][::-1])  # reverse to get highest at top
+    ax.set_xlabel("Average TF-IDF Score")
+    ax.set_title(f"Top {len(terms)} Most Informative Terms (TF-IDF)")
+
+_PLOTS = {
+    "fold_scores": (_draw_fold_scores, (10, 5)),
+    "decision_scores": (_draw_decision_scores, (8, 5)),
+    "term_importance": (_draw_term_importance, (12, 6)),
+}
+
+def render_plot(stats, kind):
+    """
+    PNG bytes of one plot. Uses a standalone Figure rather than pyplot, so
+    nothing touches matplotlib's global state and renders can run side by side.
+    """
+    from matplotlib.figure import Figure
+    if kind not in _PLOTS:
+        raise ValueError(f"Unknown plot: {kind}")
+    draw, figsize = _PLOTS[kind]
+    fig = Figure(figsize=figsize)
+    draw(fig, stats[kind])
+    fig.tight_layout()
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png")
+    return buffer.getvalue()
+
+def render_plot_file(stats, kind, path):
+    # Process-pool entry point: written under a temporary name so readers
+    # never see a partial PNG.
+    png = render_plot(stats, kind)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(png)
+    os.replace(tmp_path, path)
+    return path
+
+def save_plots(stats, directory="."):
+    # Writes every plot the statistics allow, as the CLI's --visualize does.
+    for kind in PLOT_KINDS:
+        try:
+            path = render_plot_file(stats, kind, os.path.join(directory, f"{kind}.png"))
+        except ValueError as e:
+            print(f" Skipping {kind}: {e}")
+            continue
+        print(f" Saved {path}")